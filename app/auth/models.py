@@ -1,5 +1,5 @@
 from email_validator import EmailNotValidError, validate_email
-from sqlalchemy import Boolean, ForeignKey, String, text
+from sqlalchemy import Boolean, ForeignKey, Index, String, text
 from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy.orm import Mapped, mapped_column, relationship, validates
 
@@ -19,6 +19,9 @@ class Role(BaseModel):
 
 class User(BaseModel):
     __tablename__ = 'users'
+    __table_args__ = (
+        Index('ix_users_create_ts_id', 'create_ts', 'id'),
+        )
 
     username: Mapped[str] = mapped_column(
         String(50), nullable=False, unique=True
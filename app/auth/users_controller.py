@@ -1,14 +1,16 @@
-from typing import List
-from fastapi import APIRouter, Response, Depends
+from typing import List, Optional
+from fastapi import APIRouter, Response, Depends, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.auth.models import User
 from app.auth.utils import authenticate_user, set_tokens
 from app.dependencies.auth_dep import \
     get_current_user, get_current_admin_user, check_refresh_token
-from app.db.session import get_db_session
+from app.core.config import settings
+from app.db.session import get_db_session, get_read_db_session, mark_read_after_write
 from app.exceptions import \
-    UserAlreadyExistsException, IncorrectEmailOrPasswordException
+    UserAlreadyExistsException, IncorrectEmailOrPasswordException, \
+    InvalidCursorException
 from app.dao.auth_dao import UsersDAO
 from app.dto.auth_dto import \
     SUserRegister, SUserAuth, SUserInfo
@@ -19,6 +21,7 @@ router = APIRouter(tags=['Authorization'])
 
 @router.post('/register/')
 async def register_user(
+    response: Response,
     user_data: SUserRegister,
     session: AsyncSession = Depends(get_db_session)
         ) -> dict:
@@ -34,6 +37,7 @@ async def register_user(
     user_data_dict.pop('confirm_password', None)
 
     await UsersDAO.add(session, **user_data_dict)
+    mark_read_after_write(response)
 
     return {'message': 'Вы успешно зарегистрированы!'}
 
@@ -79,14 +83,30 @@ async def get_me(user_data: User = Depends(get_current_user)) -> SUserInfo:
 
 @router.get('/all_users/')
 async def get_all_users(
-    session: AsyncSession = Depends(get_db_session),
+    response: Response,
+    limit: int = Query(settings.PAGE_SIZE_DEFAULT, ge=1, le=settings.PAGE_SIZE_MAX),
+    cursor: Optional[str] = None,
+    session: AsyncSession = Depends(get_read_db_session),
     user_data: User = Depends(get_current_admin_user)
         ) -> List[SUserInfo]:
     """
-    Получение списка всех пользователей (только для администратора).
+    Получение страницы списка пользователей (только для администратора).
+    Курсор следующей страницы передается в заголовке X-Next-Cursor.
     """
-    users = await UsersDAO.find_all(session)
-    return [SUserInfo.model_validate(user) for user in users]
+    try:
+        users, next_cursor = await UsersDAO.find_page_rows(
+            session, limit=limit, columns=UsersDAO.LIST_COLUMNS, cursor=cursor
+            )
+    except ValueError:
+        raise InvalidCursorException
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return [
+        SUserInfo.model_validate({
+            **user._mapping, 'role': {'id': user.role_id, 'name': user.role_name}
+            })
+        for user in users
+        ]
 
 
 @router.post('/refresh')
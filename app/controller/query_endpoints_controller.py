@@ -1,28 +1,169 @@
 import asyncio
+import json
 import random
-from typing import List
-from fastapi import APIRouter, Depends 
+from datetime import datetime
+from typing import List, Literal, Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, \
+    WebSocket, WebSocketDisconnect, status
+from fastapi.responses import JSONResponse, StreamingResponse
+from httpx import AsyncClient
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db.session import get_db_session
-from app.dto.query_endpoints_dto import \
-    QueryCreate, QueryResponse, ResultCreate, ResultResponse
+from app.core.config import settings
+from app.core.fast_json import ListSerializer
+from app.db.session import get_read_db_session, mark_read_after_write
+from app.dependencies.services_dep import get_http_client, get_lookup_pool
+from app.dto.query_endpoints_dto import DATETIME_FORMAT, \
+    AnalyticsBucket, CadastralSummaryResponse, NearestQueryResponse, QueryAccepted, \
+    QueryBatchItemResult, QueryCreate, QueryResponse, ResultCreate, ResultResponse
 from app.services.query_endpoints_service import \
-    add_query_in_bd, get_status_result, find_all_histories, \
-    find_detail_histories
-    
+    add_query_in_bd, add_queries_batch, all_histories_etag, detail_histories_etag, \
+    enqueue_query, get_status_result, find_all_histories, \
+    find_detail_histories, get_cadastral_summary, get_lookup_stats, deadline_from_ms, \
+    ensure_query_exists, wait_query_result
+from app.services.analytics_service import get_bucket_counts
+from app.services.etag import etag_matches
+from app.services.geo_service import find_nearest_queries, find_queries_in_bbox
+from app.services.export_service import EXPORT_MEDIA_TYPES, export_histories
+from app.services.lookup_workers import LookupWorkerPool
+
 
 router = APIRouter(tags=['Requests for cadastral numbers'])
 
+# Списки отдаются через ListSerializer, response_model остается для схемы OpenAPI
+query_list = ListSerializer(QueryResponse, DATETIME_FORMAT)
+nearest_list = ListSerializer(NearestQueryResponse, DATETIME_FORMAT)
+result_list = ListSerializer(ResultResponse, DATETIME_FORMAT)
+
 
-@router.post('/query', response_model=ResultCreate)
+@router.post(
+    '/query',
+    response_model=ResultCreate,
+    responses={status.HTTP_202_ACCEPTED: {'model': QueryAccepted}}
+    )
 async def create_query(
     query: QueryCreate,
-    session: AsyncSession = Depends(get_db_session)
+    response: Response,
+    background: bool = False,
+    cache_control: Optional[str] = Header(None),
+    x_request_deadline_ms: Optional[int] = Header(None, gt=0),
+    client: AsyncClient = Depends(get_http_client),
+    lookup_pool: LookupWorkerPool = Depends(get_lookup_pool)
+        ):
+    """
+    Создает новый запрос и сохраняет его в базе данных.
+    С background=true сразу отвечает 202 с ID запроса,
+    результат забирается через /query/{query_id}/result.
+    Заголовок Cache-Control: no-cache запрашивает результат мимо кэша,
+    X-Request-Deadline-Ms ограничивает время ожидания результата.
+    """
+    if background:
+        accepted = await enqueue_query(lookup_pool=lookup_pool, query=query)
+        accepted_response = JSONResponse(
+            status_code=status.HTTP_202_ACCEPTED, content=accepted
+            )
+        mark_read_after_write(accepted_response)
+        return accepted_response
+    use_cache = 'no-cache' not in (cache_control or '').lower()
+    result = await add_query_in_bd(
+        client=client, query=query, use_cache=use_cache,
+        deadline=deadline_from_ms(x_request_deadline_ms)
+        )
+    mark_read_after_write(response)
+    return result
+
+
+@router.post('/query/batch', response_model=List[QueryBatchItemResult])
+async def create_queries_batch(
+    queries: List[QueryCreate],
+    response: Response,
+    cache_control: Optional[str] = Header(None),
+    x_request_deadline_ms: Optional[int] = Header(None, gt=0),
+    client: AsyncClient = Depends(get_http_client)
         ):
-    """Создает новый запрос и сохраняет его в базе данных."""
-    response = await add_query_in_bd(session=session, query=query)
-    return response
+    """
+    Создает пакет запросов одним обращением к базе данных.
+    Результаты возвращаются в порядке входных элементов, ошибка указывается для каждого элемента.
+    """
+    use_cache = 'no-cache' not in (cache_control or '').lower()
+    results = await add_queries_batch(
+        client=client, queries=queries, use_cache=use_cache,
+        deadline=deadline_from_ms(x_request_deadline_ms)
+        )
+    mark_read_after_write(response)
+    return results
+
+
+@router.get('/query/{query_id}/result', response_model=ResultCreate)
+async def get_query_result(
+    query_id: int,
+    session: AsyncSession = Depends(get_read_db_session)
+        ):
+    """Возвращает результат запроса или 404, пока он еще обрабатывается."""
+    result = await get_status_result(session=session, query_id=query_id)
+    return result
+
+
+@router.get('/query/{query_id}/events')
+async def stream_query_result(query_id: int):
+    """
+    Server-Sent Events: присылает событие result, как только результат запроса записан.
+    Пока результата нет, раз в несколько секунд приходит комментарий-пинг.
+    """
+    await ensure_query_exists(query_id)
+
+    async def events():
+        async for result in wait_query_result(query_id):
+            if result is None:
+                yield ': ping\n\n'
+            else:
+                yield f'event: result\ndata: {json.dumps(result)}\n\n'
+
+    return StreamingResponse(
+        events(),
+        media_type='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+        )
+
+
+async def _wait_for_disconnect(websocket: WebSocket):
+    """Читает сообщения клиента (они не нужны) до его отключения."""
+    while True:
+        message = await websocket.receive()
+        if message['type'] == 'websocket.disconnect':
+            return
+
+
+@router.websocket('/query/{query_id}/ws')
+async def websocket_query_result(websocket: WebSocket, query_id: int):
+    """
+    WebSocket: отправляет результат запроса одним сообщением и закрывает соединение.
+    Ожидание результата идет наперегонки с чтением сокета: при отключении клиента
+    ожидание сразу прекращается и подписка на результат снимается.
+    """
+    await websocket.accept()
+    try:
+        await ensure_query_exists(query_id)
+    except HTTPException as e:
+        await websocket.close(code=4404, reason=e.detail)
+        return
+
+    async def send_result():
+        async for result in wait_query_result(query_id):
+            if result is not None:
+                await websocket.send_json(result)
+        await websocket.close()
+
+    sender = asyncio.create_task(send_result())
+    disconnect = asyncio.create_task(_wait_for_disconnect(websocket))
+    try:
+        await asyncio.wait({sender, disconnect}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        sender.cancel()
+        disconnect.cancel()
+        error, _ = await asyncio.gather(sender, disconnect, return_exceptions=True)
+    if isinstance(error, Exception) and not isinstance(error, WebSocketDisconnect):
+        raise error
 
 
 @router.get('/ping')
@@ -31,25 +172,158 @@ async def ping():
     return {'status': 'Сервер запущен!'}
 
 
+@router.get('/stats/lookups')
+async def lookup_stats():
+    """Возвращает статистику обращений к внешнему сервису в текущем процессе."""
+    return get_lookup_stats()
+
+
 @router.get('/history/all', response_model=List[QueryResponse])
 async def get_all_history(
-    session: AsyncSession = Depends(get_db_session)
+    limit: int = Query(settings.PAGE_SIZE_DEFAULT, ge=1, le=settings.PAGE_SIZE_MAX),
+    cursor: Optional[str] = None,
+    if_none_match: Optional[str] = Header(None),
+    session: AsyncSession = Depends(get_read_db_session)
+        ):
+    """
+    Возвращает страницу истории запросов в порядке создания.
+    Курсор следующей страницы передается в заголовке X-Next-Cursor.
+    Если страница не изменилась с ETag из If-None-Match, отвечает 304 без тела.
+    """
+    etag = await all_histories_etag(session=session, limit=limit, cursor=cursor)
+    if etag and etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
+    history_page, next_cursor = await find_all_histories(
+        session=session, limit=limit, cursor=cursor
+        )
+    headers = {}
+    if etag:
+        headers['ETag'] = etag
+    if next_cursor:
+        headers['X-Next-Cursor'] = next_cursor
+    return query_list.response(history_page, headers=headers)
+
+
+@router.get('/history/bbox', response_model=List[QueryResponse])
+async def get_history_in_bbox(
+    min_latitude: float = Query(..., ge=-90, le=90),
+    max_latitude: float = Query(..., ge=-90, le=90),
+    min_longitude: float = Query(..., ge=-180, le=180),
+    max_longitude: float = Query(..., ge=-180, le=180),
+    limit: int = Query(settings.PAGE_SIZE_DEFAULT, ge=1, le=settings.PAGE_SIZE_MAX),
+    session: AsyncSession = Depends(get_read_db_session)
+        ):
+    """
+    Возвращает запросы, координаты которых попадают в прямоугольник.
+    min_longitude больше max_longitude — прямоугольник через антимеридиан.
+    """
+    queries = await find_queries_in_bbox(
+        session=session,
+        min_latitude=min_latitude,
+        max_latitude=max_latitude,
+        min_longitude=min_longitude,
+        max_longitude=max_longitude,
+        limit=limit
+        )
+    return query_list.response(queries)
+
+
+@router.get('/history/nearest', response_model=List[NearestQueryResponse])
+async def get_nearest_history(
+    latitude: float = Query(..., ge=-90, le=90),
+    longitude: float = Query(..., ge=-180, le=180),
+    k: int = Query(10, ge=1, le=settings.GEO_KNN_MAX),
+    session: AsyncSession = Depends(get_read_db_session)
+        ):
+    """Возвращает k ближайших к точке запросов с расстоянием в метрах."""
+    nearest = await find_nearest_queries(
+        session=session, latitude=latitude, longitude=longitude, k=k
+        )
+    return nearest_list.response(nearest)
+
+
+@router.get('/history/export')
+async def export_history(
+    export_format: Literal['ndjson', 'csv'] = Query('ndjson', alias='format'),
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    cadastral_number: Optional[str] = None
         ):
-    """Возвращает всю историю запросов."""
-    history_all = await find_all_histories(session=session)
-    return history_all
+    """
+    Потоковая выгрузка запросов вместе с результатами в NDJSON или CSV.
+    Необязательные фильтры: период создания запроса [date_from, date_to) и кадастровый номер.
+    """
+    return StreamingResponse(
+        export_histories(
+            export_format=export_format,
+            date_from=date_from,
+            date_to=date_to,
+            cadastral_number=cadastral_number
+            ),
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers={
+            'Content-Disposition': f'attachment; filename="histories.{export_format}"'
+            }
+        )
+
+
+@router.get('/history/analytics', response_model=List[AnalyticsBucket])
+async def get_history_analytics(
+    bucket: Literal['minute', 'hour', 'day'] = 'hour',
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    cadastral_prefix: List[str] = Query([], pattern=r'^\d{1,14}$'),
+    session: AsyncSession = Depends(get_read_db_session)
+        ):
+    """
+    Возвращает количество запросов и положительных/отрицательных результатов
+    по интервалам времени (минута, час или день) за период [date_from, date_to).
+    cadastral_prefix можно передать несколько раз для фильтра по префиксам номера.
+    """
+    buckets = await get_bucket_counts(
+        session=session,
+        bucket=bucket,
+        date_from=date_from,
+        date_to=date_to,
+        prefixes=cadastral_prefix
+        )
+    return buckets
 
 
 @router.get('/history/detail', response_model=List[ResultResponse])
 async def get_detail_history(
     cadastral_number: str,
-    session: AsyncSession = Depends(get_db_session)
+    if_none_match: Optional[str] = Header(None),
+    session: AsyncSession = Depends(get_read_db_session)
         ):
-    """Возвращает детальную историю запросов по кадастровому номеру."""
+    """
+    Возвращает детальную историю запросов по кадастровому номеру.
+    Если история не изменилась с ETag из If-None-Match, отвечает 304 без тела.
+    """
+    etag = await detail_histories_etag(session=session, cadastral_number=cadastral_number)
+    if etag and etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
     history_detail = await find_detail_histories(
         session=session, cadastral_number=cadastral_number
         )
-    return history_detail
+    return result_list.response(history_detail, headers={'ETag': etag} if etag else None)
+
+
+@router.get('/history/summary', response_model=CadastralSummaryResponse)
+async def get_history_summary(
+    cadastral_number: str,
+    session: AsyncSession = Depends(get_read_db_session)
+        ):
+    """
+    Возвращает сводку по кадастровому номеру: последний результат, время последней
+    проверки, количество проверок и долю положительных результатов.
+    """
+    summary = await get_cadastral_summary(
+        session=session, cadastral_number=cadastral_number
+        )
+    return summary
 
 
 @router.get('/history')
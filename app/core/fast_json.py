@@ -0,0 +1,96 @@
+import json
+from collections.abc import Mapping
+from datetime import datetime
+from operator import attrgetter
+from typing import Iterable, Optional, Union, get_args, get_origin
+
+import orjson
+from fastapi import Response
+from pydantic import BaseModel
+from sqlalchemy import Row
+
+
+# orjson и json.dumps пишут float одинаково, кроме экспоненциальной записи:
+# json.dumps дает 1e-05 и 1e+16, orjson — 1e-5 и 1e16
+_ORJSON_FLOAT_MIN = 1e-4
+_ORJSON_FLOAT_MAX = 1e16
+
+_DATETIME = 'datetime'
+_FLOAT = 'float'
+
+_MINUTES_FORMAT = '%Y-%m-%d %H:%M'
+
+
+def _format_minutes(value: datetime) -> str:
+    """strftime('%Y-%m-%d %H:%M') без разбора шаблона на каждый вызов."""
+    if value.tzinfo is None and value.year >= 1000:
+        return value.isoformat(' ', 'minutes')
+    return value.strftime(_MINUTES_FORMAT)
+
+
+def _field_kind(annotation) -> Optional[str]:
+    if get_origin(annotation) is Union:
+        annotation = next(arg for arg in get_args(annotation) if arg is not type(None))
+    if annotation is datetime:
+        return _DATETIME
+    if annotation is float:
+        return _FLOAT
+    return None
+
+
+class ListSerializer:
+    """
+    Быстрая сериализация списков для ответов API в обход валидации response_model.
+    План полей (имя, геттер, вид значения) строится один раз по DTO, JSON пишет orjson.
+    У ORM-объектов загруженные значения читаются прямо из __dict__, минуя дескрипторы,
+    у строк проекций (Row) — из их _mapping.
+    Вывод побайтно совпадает с JSONResponse по response_model=List[dto]:
+    даты форматируются datetime_format, как field_serializer в DTO, а при float,
+    которые orjson записал бы иначе (или NaN/inf), используется json.dumps.
+    """
+
+    def __init__(self, dto: type[BaseModel], datetime_format: str):
+        if dto.model_computed_fields:
+            raise TypeError(f'{dto.__name__}: вычисляемые поля не поддерживаются')
+        if datetime_format == _MINUTES_FORMAT:
+            self._format_datetime = _format_minutes
+        else:
+            self._format_datetime = lambda value: value.strftime(datetime_format)
+        self._plan = tuple(
+            (name, attrgetter(name), _field_kind(field.annotation))
+            for name, field in dto.model_fields.items()
+            )
+
+    def dumps(self, objects: Iterable) -> bytes:
+        """Сериализует ORM-объекты или словари в JSON-массив."""
+        rows = []
+        orjson_safe = True
+        format_datetime = self._format_datetime
+        for obj in objects:
+            if isinstance(obj, Row):
+                values = obj._mapping
+            else:
+                values = obj if isinstance(obj, Mapping) else obj.__dict__
+            row = {}
+            for name, getter, kind in self._plan:
+                value = values[name] if name in values else getter(obj)
+                if value is not None:
+                    if kind is _DATETIME:
+                        value = format_datetime(value)
+                    elif kind is _FLOAT:
+                        value = float(value)
+                        if value and not _ORJSON_FLOAT_MIN <= abs(value) < _ORJSON_FLOAT_MAX:
+                            orjson_safe = False
+                row[name] = value
+            rows.append(row)
+
+        if orjson_safe:
+            return orjson.dumps(rows)
+        return json.dumps(
+            rows, ensure_ascii=False, allow_nan=False, indent=None, separators=(',', ':')
+            ).encode('utf-8')
+
+    def response(self, objects: Iterable, headers: Optional[dict] = None) -> Response:
+        return Response(
+            content=self.dumps(objects), media_type='application/json', headers=headers
+            )
@@ -0,0 +1,32 @@
+import httpx
+
+from app.core.config import settings
+
+
+def _origin(url: str) -> str:
+    """Возвращает схему и хост URL в формате, который принимает mounts у httpx."""
+    parsed = httpx.URL(url)
+    return f'{parsed.scheme}://{parsed.netloc.decode()}'
+
+
+def create_http_client() -> httpx.AsyncClient:
+    """
+    Создает общий для приложения HTTP-клиент с пулом keep-alive соединений.
+    Для сервиса результатов используется отдельный транспорт со своим лимитом соединений на хост.
+    """
+    result_service_transport = httpx.AsyncHTTPTransport(
+        limits=httpx.Limits(
+            max_connections=settings.HTTP_MAX_CONNECTIONS_PER_HOST,
+            max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY
+            )
+        )
+    return httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=settings.HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY
+            ),
+        timeout=settings.RESULT_SERVICE_TIMEOUT,
+        mounts={_origin(settings.RESULT_SERVICE_URL): result_service_transport}
+        )
@@ -1,3 +1,5 @@
+from sqlalchemy import select
+
 from app.auth.models import User, Role
 from app.dao.base_dao import BaseDAO
 
@@ -7,6 +9,12 @@ from app.dao.base_dao import BaseDAO
 class UsersDAO(BaseDAO):
     model = User
 
+    # Колонки списка пользователей: название роли читается подзапросом, без загрузки Role
+    LIST_COLUMNS = (
+        'id', 'email', 'username', 'first_name', 'last_name', 'role_id',
+        select(Role.name).where(Role.id == User.role_id).scalar_subquery().label('role_name'),
+        )
+
 
 class RoleDAO(BaseDAO):
     model = Role
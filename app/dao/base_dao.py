@@ -1,10 +1,15 @@
 import logging
-from typing import List
+from typing import List, Optional, Sequence, Tuple
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.future import select
-from sqlalchemy import func, update as sqlalchemy_update, delete as sqlalchemy_delete
+from sqlalchemy import Row, and_, func, insert, literal, tuple_, update as sqlalchemy_update, \
+    delete as sqlalchemy_delete
+from sqlalchemy.dialects.postgresql import ARRAY, insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.config import settings
+from app.dao.pagination import decode_cursor, encode_cursor
+
 
 class BaseDAO:
     """
@@ -57,10 +62,138 @@ class BaseDAO:
             logging.error(f'Ошибка при получение всей таблицы: {e}')
             raise
 
+    @classmethod
+    def projection_query(cls, columns: Sequence, **filter_by):
+        """
+        Строит SELECT только указанных колонок модели.
+        columns: Имена атрибутов модели или готовые выражения с label (например, подзапрос).
+        """
+        return select(*[
+            getattr(cls.model, column) if isinstance(column, str) else column
+            for column in columns
+            ]).filter_by(**filter_by)
+
+    @classmethod
+    async def find_all_rows(
+        cls, session: AsyncSession, columns: Sequence, **filter_by
+            ) -> List[Row]:
+        """
+        Асинхронно находит записи и возвращает только указанные колонки.
+        Строки — компактные кортежи с доступом по имени (row.id): ORM-объекты не создаются
+        и не попадают в identity map сессии, связи не загружаются.
+        Аргументы: columns: Колонки, как в projection_query.
+        **filter_by: Критерии фильтрации в виде именованных параметров.
+        Возвращает: Список строк.
+        """
+        try:
+            result = await session.execute(cls.projection_query(columns, **filter_by))
+            return result.all()
+        except SQLAlchemyError as e:
+            logging.error(f'Ошибка при получение колонок таблицы: {e}')
+            raise
+
+    @classmethod
+    def page_query(
+        cls,
+        limit: int,
+        cursor: Optional[str] = None,
+        columns: Optional[Sequence] = None,
+        **filter_by
+            ):
+        """
+        Строит SELECT страницы записей после ключа (create_ts, id) из курсора.
+        С columns выбираются только эти колонки, как в projection_query.
+        """
+        order_key = (cls.model.create_ts, cls.model.id)
+        query = (
+            (cls.projection_query(columns) if columns else select(cls.model))
+            .filter_by(**filter_by)
+            .order_by(*order_key)
+            .limit(limit)
+            )
+        if cursor:
+            query = query.where(tuple_(*order_key) > tuple_(*decode_cursor(cursor)))
+        return query
+
+    @classmethod
+    async def find_page(
+        cls,
+        session: AsyncSession,
+        limit: int,
+        cursor: Optional[str] = None,
+        **filter_by
+            ) -> Tuple[List, Optional[str]]:
+        """
+        Асинхронно возвращает страницу записей с keyset-пагинацией по (create_ts, id).
+        Время выборки не зависит от глубины страницы: следующая страница начинается
+        сразу за ключом из курсора, без OFFSET.
+        Аргументы: limit: Размер страницы. cursor: Курсор из предыдущей страницы или None.
+        **filter_by: Критерии фильтрации в виде именованных параметров.
+        Возвращает: (список экземпляров модели, курсор следующей страницы или None).
+        Raises: ValueError: Если курсор поврежден.
+        """
+        query = cls.page_query(limit + 1, cursor, **filter_by)
+        try:
+            result = await session.execute(query)
+            items = result.scalars().all()
+        except SQLAlchemyError as e:
+            logging.error(f'Ошибка при получении страницы записей: {e}')
+            raise
+        return _split_page(items, limit)
+
+    @classmethod
+    async def find_page_rows(
+        cls,
+        session: AsyncSession,
+        limit: int,
+        columns: Sequence,
+        cursor: Optional[str] = None,
+        **filter_by
+            ) -> Tuple[List[Row], Optional[str]]:
+        """
+        Страница, как в find_page, но из строк только с указанными колонками (find_all_rows).
+        create_ts и id для курсора добавляются к колонкам, если их там нет.
+        Возвращает: (список строк, курсор следующей страницы или None).
+        Raises: ValueError: Если курсор поврежден.
+        """
+        columns = [*columns, *[key for key in ('create_ts', 'id') if key not in columns]]
+        query = cls.page_query(limit + 1, cursor, columns=columns, **filter_by)
+        try:
+            result = await session.execute(query)
+            rows = result.all()
+        except SQLAlchemyError as e:
+            logging.error(f'Ошибка при получении страницы записей: {e}')
+            raise
+        return _split_page(rows, limit)
+
+    @classmethod
+    async def fingerprint(cls, session: AsyncSession, query) -> Optional[tuple]:
+        """
+        Асинхронно возвращает метаданные выборки для условных ответов (ETag), не загружая строки:
+        количество строк, наибольший update_ts и сумму id.
+        Любая вставка или изменение строки меняет update_ts, удаление — количество или сумму id.
+        Аргументы: query: SELECT экземпляров модели.
+        Возвращает: (count, max(update_ts), sum(id)) или None, если выборка пуста.
+        """
+        rows = query.subquery()
+        try:
+            result = await session.execute(
+                select(func.count(), func.max(rows.c.update_ts), func.sum(rows.c.id))
+                )
+            count, max_update_ts, id_sum = result.one()
+        except SQLAlchemyError as e:
+            logging.error(f'Ошибка при получении метаданных выборки: {e}')
+            raise
+        if not count:
+            return None
+        return count, max_update_ts, id_sum
+
     @classmethod
     async def add(cls, session: AsyncSession, **values):
         """
         Асинхронно создает новый экземпляр модели с указанными значениями.
+        Один INSERT ... RETURNING: id и серверные значения по умолчанию заполняются
+        при flush (eager_defaults в BaseModel), без повторного чтения строки.
         Аргументы: **values: Именованные параметры для создания нового экземпляра модели.
         Возвращает: Созданный экземпляр модели.
         """
@@ -69,7 +202,6 @@ class BaseDAO:
             new_instance = cls.model(**values)
             session.add(new_instance)
             await session.flush()
-            await session.refresh(new_instance)
             return new_instance
         except SQLAlchemyError as e:
             logging.error(f'Ошибка при добавлении в таблицу: {e}')
@@ -77,47 +209,133 @@ class BaseDAO:
             raise e
 
     @classmethod
-    async def add_many(cls, session: AsyncSession, instances: list[dict]):
+    async def add_many(
+        cls,
+        session: AsyncSession,
+        rows: list[dict],
+        chunk_size: int = settings.BULK_INSERT_CHUNK_SIZE
+            ) -> list[int]:
         """
-        Добавляет несколько записей в базу данных.
-        instances: Список словарей, каждый из которых содержит данные для создания нового экземпляра модели.
-        return: Список созданных экземпляров модели.
+        Добавляет записи Core-вставкой INSERT ... RETURNING id пачками по chunk_size строк.
+        ORM-объекты не создаются, транзакция не открывается и не коммитится:
+        вставка идет в текущей транзакции сессии. Валидаторы модели не вызываются,
+        строки должны быть проверены заранее.
+        Возвращает: Список ID в порядке входных строк.
         """
-        async with session.begin():
-            new_instances = [cls.model(**values) for values in instances]
-            session.add_all(new_instances)
-            try:
-                await session.commit()
-            except SQLAlchemyError as e:
-                logging.error(f'Ошибка при добавление нескольких записей в таблицу: {e}')
-                await session.rollback()
-                raise e
-            return new_instances
+        table = cls.model.__table__
+        query = insert(table).returning(table.c.id, sort_by_parameter_order=True)
+        ids = []
+        try:
+            for start in range(0, len(rows), chunk_size):
+                result = await session.execute(query, rows[start:start + chunk_size])
+                ids.extend(result.scalars())
+            return ids
+        except SQLAlchemyError as e:
+            logging.error(f'Ошибка при добавление нескольких записей в таблицу: {e}')
+            raise
+
+    @classmethod
+    async def upsert_many(
+        cls,
+        session: AsyncSession,
+        rows: list[dict],
+        conflict_cols: Sequence[str],
+        update_cols: Sequence[str],
+        chunk_size: int = settings.BULK_INSERT_CHUNK_SIZE
+            ) -> list[int]:
+        """
+        Вставляет или обновляет записи одной командой INSERT ... ON CONFLICT DO UPDATE
+        на каждые chunk_size строк, в текущей транзакции сессии.
+        conflict_cols: Колонки уникального ограничения, по которому ищется существующая запись
+        (для секционированных таблиц оно включает create_ts).
+        update_cols: Колонки, которые перезаписываются у существующей записи;
+        update_ts, если он есть у модели, обновляется всегда.
+        Строки с одинаковым ключом объединяются, побеждает последняя: одна команда
+        не может изменить запись дважды. Валидаторы модели не вызываются.
+        Возвращает: ID вставленных или обновленных записей в порядке входных строк.
+        """
+        if not update_cols:
+            raise ValueError('Нужна хотя бы одна колонка для обновления.')
+
+        ids = []
+        try:
+            for start in range(0, len(rows), chunk_size):
+                result = await session.execute(
+                    cls._upsert_chunk_query(rows[start:start + chunk_size], conflict_cols, update_cols)
+                    )
+                ids.extend(result.scalars())
+            return ids
+        except SQLAlchemyError as e:
+            logging.error(f'Ошибка при вставке с обновлением записей: {e}')
+            raise
+
+    @classmethod
+    def _upsert_chunk_query(cls, rows: list[dict], conflict_cols: Sequence[str], update_cols: Sequence[str]):
+        """
+        Одна команда upsert_many: строки передаются массивами по колонкам (unnest с номером строки),
+        повторы ключа схлопываются в базе, а ID возвращаются сопоставлением с входными строками
+        по ключу конфликта тоже в базе. Ключи сравниваются уже приведенными к типам колонок,
+        поэтому значения, которые база хранит иначе, чем их передали, не теряют свою строку.
+        """
+        table = cls.model.__table__
+        columns = list(rows[0])
+        batch = (
+            func.unnest(*[
+                literal([row[column] for row in rows], ARRAY(table.c[column].type))
+                for column in columns
+                ])
+            .table_valued(*columns, with_ordinality='ordinal')
+            .render_derived()
+            )
+        batch = select(batch).cte('batch')
+        keys = [batch.c[column] for column in conflict_cols]
+        latest = (
+            select(*[batch.c[column] for column in columns])
+            .distinct(*keys)
+            .order_by(*keys, batch.c.ordinal.desc())
+            )
+
+        upsert = pg_insert(table).from_select(columns, latest)
+        set_ = {column: upsert.excluded[column] for column in update_cols}
+        if 'update_ts' in table.c and 'update_ts' not in set_:
+            set_['update_ts'] = func.now()
+        upserted = (
+            upsert.on_conflict_do_update(index_elements=list(conflict_cols), set_=set_)
+            .returning(table.c.id, *[table.c[column] for column in conflict_cols])
+            .cte('upserted')
+            )
+        return (
+            select(upserted.c.id)
+            .join(batch, and_(*[
+                upserted.c[column].is_not_distinct_from(batch.c[column]) for column in conflict_cols
+                ]))
+            .order_by(batch.c.ordinal)
+            )
 
     @classmethod
     async def update(cls, session: AsyncSession, filter_by, **values):
         """
-        Обновляет записи в базе данных по заданным условиям.
+        Обновляет записи в базе данных по заданным условиям в текущей транзакции сессии,
+        без коммита: транзакцией управляет вызывающий код.
+        Загруженные в сессию объекты синхронизируются вычислением условия в Python,
+        без дополнительного SELECT.
         Args: filter_by (dict): Словарь с условиями фильтрации {column_name: value}
         **values: Значения для обновления в формате column_name=value
         Returns: int: Количество обновленных записей
         Raises: SQLAlchemyError: При ошибке обновления данных
         """
-        async with session.begin():
-            query = (
-                sqlalchemy_update(cls.model)
-                .where(*[getattr(cls.model, k) == v for k, v in filter_by.items()])
-                .values(**values)
-                .execution_options(synchronize_session='fetch')
-            )
-            try:
-                history = await session.execute(query)
-                await session.commit()
-            except SQLAlchemyError as e:
-                logging.error(f'Ошибка при обновление записи в таблице: {e}')
-                await session.rollback()
-                raise e
+        query = (
+            sqlalchemy_update(cls.model)
+            .where(*[getattr(cls.model, k) == v for k, v in filter_by.items()])
+            .values(**values)
+            .execution_options(synchronize_session='evaluate')
+        )
+        try:
+            history = await session.execute(query)
             return history.rowcount
+        except SQLAlchemyError as e:
+            logging.error(f'Ошибка при обновление записи в таблице: {e}')
+            raise
 
     @classmethod
     async def delete(cls, session: AsyncSession, delete_all: bool = False, **filter_by):
@@ -140,4 +358,12 @@ class BaseDAO:
                 logging.error(f'Ошибка при удаление записей: {e}')
                 await session.rollback()
                 raise e
-            return history.rowcount
\ No newline at end of file
+            return history.rowcount
+
+
+def _split_page(items: list, limit: int) -> Tuple[list, Optional[str]]:
+    """Отделяет лишнюю (limit + 1)-ю запись и строит по последней записи страницы курсор."""
+    if len(items) <= limit:
+        return items, None
+    last = items[limit - 1]
+    return items[:limit], encode_cursor(last.create_ts, last.id)
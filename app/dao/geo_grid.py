@@ -0,0 +1,99 @@
+import math
+
+
+# Сетка 0.01° x 0.01°: номер ячейки = строка по широте * GRID_COLUMNS + столбец по долготе.
+# Формула совпадает с SQL-функцией query_grid_cell, которая заполняет queries.grid_cell.
+CELL_DEGREES = 0.01
+GRID_ROWS = 18000
+GRID_COLUMNS = 36000
+EARTH_RADIUS_M = 6371008.8
+
+
+def cell_row(latitude: float) -> int:
+    return min(max(math.floor((latitude + 90) / CELL_DEGREES), 0), GRID_ROWS - 1)
+
+
+def cell_column(longitude: float) -> int:
+    return min(max(math.floor((longitude + 180) / CELL_DEGREES), 0), GRID_COLUMNS - 1)
+
+
+def grid_cell(latitude: float, longitude: float) -> int:
+    return cell_row(latitude) * GRID_COLUMNS + cell_column(longitude)
+
+
+def cell_ranges(
+    first_row: int, last_row: int, first_column: int, last_column: int, max_ranges: int
+        ) -> list[tuple[int, int]]:
+    """
+    Диапазоны номеров ячеек [from, to], покрывающие прямоугольник строк и столбцов сетки.
+    Строки обрезаются по полюсам, столбцы переходят через антимеридиан.
+    Если диапазонов больше max_ranges, возвращается один охватывающий диапазон
+    (точки вне прямоугольника отсекаются условием на координаты).
+    """
+    first_row, last_row = max(first_row, 0), min(last_row, GRID_ROWS - 1)
+    if last_column - first_column + 1 >= GRID_COLUMNS:
+        return [(first_row * GRID_COLUMNS, last_row * GRID_COLUMNS + GRID_COLUMNS - 1)]
+
+    first_column, last_column = first_column % GRID_COLUMNS, last_column % GRID_COLUMNS
+    if first_column <= last_column:
+        segments = [(first_column, last_column)]
+    else:
+        segments = [(first_column, GRID_COLUMNS - 1), (0, last_column)]
+
+    if (last_row - first_row + 1) * len(segments) > max_ranges:
+        if len(segments) > 1:
+            first_column, last_column = 0, GRID_COLUMNS - 1
+        return [(
+            first_row * GRID_COLUMNS + first_column,
+            last_row * GRID_COLUMNS + last_column
+            )]
+    return [
+        (row * GRID_COLUMNS + start, row * GRID_COLUMNS + end)
+        for row in range(first_row, last_row + 1)
+        for start, end in segments
+        ]
+
+
+def bbox_ranges(
+    min_latitude: float,
+    max_latitude: float,
+    min_longitude: float,
+    max_longitude: float,
+    max_ranges: int
+        ) -> list[tuple[int, int]]:
+    """Диапазоны ячеек прямоугольника; min_longitude > max_longitude — переход через антимеридиан."""
+    last_column = cell_column(max_longitude)
+    if min_longitude > max_longitude:
+        last_column += GRID_COLUMNS
+    return cell_ranges(
+        cell_row(min_latitude), cell_row(max_latitude),
+        cell_column(min_longitude), last_column,
+        max_ranges
+        )
+
+
+def square_ranges(
+    latitude: float, longitude: float, radius: int, max_ranges: int
+        ) -> list[tuple[int, int]]:
+    """Диапазоны ячеек квадрата (2 * radius + 1) x (2 * radius + 1) с центром в ячейке точки."""
+    row, column = cell_row(latitude), cell_column(longitude)
+    return cell_ranges(
+        row - radius, row + radius, column - radius, column + radius, max_ranges
+        )
+
+
+def covered_distance(latitude: float, radius: int) -> float:
+    """
+    Нижняя оценка расстояния в метрах от точки до границы квадрата square_ranges:
+    любая точка ближе этого расстояния гарантированно лежит внутри квадрата.
+    """
+    degrees = radius * CELL_DEGREES
+    latitude_cover = EARTH_RADIUS_M * math.radians(degrees)
+    if 2 * radius + 1 >= GRID_COLUMNS:
+        return latitude_cover
+    # Расстояние до меридиана, отстоящего на degrees по долготе
+    longitude_cover = EARTH_RADIUS_M * math.asin(
+        math.cos(math.radians(latitude)) * math.sin(math.radians(min(degrees, 90)))
+        )
+    return min(latitude_cover, longitude_cover)
+
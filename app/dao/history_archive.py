@@ -0,0 +1,219 @@
+import base64
+import fcntl
+import gzip
+import hashlib
+import json
+import math
+import os
+import uuid
+from datetime import datetime, timezone
+from typing import Dict, List, Sequence, Set, Tuple
+
+
+# Колонки строки архива, совпадают с HistoryDAO.export_query
+ARCHIVE_COLUMNS = (
+    'query_id',
+    'cadastral_number',
+    'latitude',
+    'longitude',
+    'query_ts',
+    'history_id',
+    'history',
+    'history_ts',
+    )
+_TIMESTAMP_COLUMNS = ('query_ts', 'history_ts')
+
+INDEX_FILE = 'index.jsonl'
+
+
+def _encode(row: Sequence) -> dict:
+    record = dict(zip(ARCHIVE_COLUMNS, row))
+    for column in _TIMESTAMP_COLUMNS:
+        if record[column] is not None:
+            record[column] = record[column].isoformat()
+    return record
+
+
+def _decode(line: str) -> dict:
+    record = json.loads(line)
+    for column in _TIMESTAMP_COLUMNS:
+        if record[column] is not None:
+            record[column] = datetime.fromisoformat(record[column])
+    return record
+
+
+def _bloom_positions(value: str, size: int, hashes: int) -> List[int]:
+    """Номера битов фильтра Блума для значения (двойное хеширование одного blake2b)."""
+    digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+    first = int.from_bytes(digest[:8], 'little')
+    step = int.from_bytes(digest[8:], 'little') | 1
+    return [(first + index * step) % size for index in range(hashes)]
+
+
+def _build_bloom(values: Set[str], bits_per_key: int, hashes: int) -> bytes:
+    bits = bytearray(max(1, math.ceil(len(values) * bits_per_key / 8)))
+    for value in values:
+        for position in _bloom_positions(value, len(bits) * 8, hashes):
+            bits[position >> 3] |= 1 << (position & 7)
+    return bytes(bits)
+
+
+def _may_contain(entry: dict, value: str) -> bool:
+    """Может ли в сегменте быть номер; у сегментов без фильтра проверяется только префикс."""
+    bits = entry.get('bloom')
+    if bits is None:
+        return True
+    return all(
+        bits[position >> 3] & (1 << (position & 7))
+        for position in _bloom_positions(value, len(bits) * 8, entry['bloom_hashes'])
+        )
+
+
+def _write_durably(path: str, data: bytes):
+    with open(path, 'wb') as file:
+        file.write(data)
+        file.flush()
+        os.fsync(file.fileno())
+
+
+def _sync_directory(path: str):
+    """Сохраняет на диск запись каталога (создание и переименование файлов в нем)."""
+    descriptor = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(descriptor)
+    finally:
+        os.close(descriptor)
+
+
+def _append_line(path: str, line: bytes):
+    """
+    Дописывает строку в файл под эксклюзивной блокировкой: параллельные архивации
+    не перемешивают строки. Недописанный хвост, оставшийся после сбоя, сначала отрезается,
+    чтобы новая строка не склеилась с ним.
+    """
+    with open(path, 'a+b') as file:
+        fcntl.flock(file, fcntl.LOCK_EX)
+        try:
+            end = file.seek(0, os.SEEK_END)
+            file.seek(max(0, end - 1))
+            if end and file.read(1) != b'\n':
+                while end > 0:
+                    start = max(0, end - 65536)
+                    file.seek(start)
+                    newline = file.read(end - start).rfind(b'\n')
+                    if newline >= 0:
+                        end = start + newline + 1
+                        break
+                    end = start
+                file.truncate(end)
+            file.write(line)
+            file.flush()
+            os.fsync(file.fileno())
+        finally:
+            fcntl.flock(file, fcntl.LOCK_UN)
+
+
+class HistoryArchive:
+    """
+    Архив старых запросов и результатов в каталоге: append-only сегменты gzip JSONL
+    и индекс index.jsonl, по строке на сегмент (имя, число строк, период, множество
+    префиксов кадастровых номеров и фильтр Блума по самим номерам). Поиск по номеру
+    читает только сегменты, в индексе которых есть его префикс и фильтр которых
+    не исключает номер: номер, которого нет в архиве, почти никогда не распаковывает
+    ни одного сегмента. Работа с файлами блокирующая: из async-кода вызывать
+    через asyncio.to_thread.
+    """
+
+    def __init__(self, directory: str, prefix_length: int, bloom_bits_per_key: int = 10):
+        self._directory = directory
+        self._prefix_length = prefix_length
+        self._bloom_bits_per_key = bloom_bits_per_key
+        # Оптимальное число хешей для заданного числа бит на номер
+        self._bloom_hashes = max(1, round(bloom_bits_per_key * math.log(2)))
+        self._index: List[dict] = []
+        self._index_size = 0
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self._directory, name)
+
+    def segments(self) -> List[dict]:
+        """Записи индекса; перечитывается только дописанный с прошлого раза хвост файла."""
+        try:
+            size = os.path.getsize(self._path(INDEX_FILE))
+        except FileNotFoundError:
+            return []
+        if size < self._index_size:
+            self._index, self._index_size = [], 0
+        if size > self._index_size:
+            with open(self._path(INDEX_FILE), 'rb') as file:
+                file.seek(self._index_size)
+                tail = file.read(size - self._index_size)
+            # Незавершенная последняя строка (запись индекса еще идет) дочитается в следующий раз
+            complete = tail[:tail.rfind(b'\n') + 1]
+            for line in complete.splitlines():
+                entry = json.loads(line)
+                entry['prefixes'] = frozenset(entry['prefixes'])
+                if 'bloom' in entry:
+                    entry['bloom'] = base64.b64decode(entry['bloom'])
+                self._index.append(entry)
+            self._index_size += len(complete)
+        return self._index
+
+    def write_segment(self, rows: Sequence[Sequence]) -> str:
+        """
+        Записывает строки (в порядке ARCHIVE_COLUMNS) новым сегментом и добавляет его в индекс.
+        Имя сегмента уникально (время и случайный суффикс), поэтому параллельная архивация
+        или повтор после сбоя не перезаписывают уже записанный сегмент. Сегмент сначала
+        пишется во временный файл и переименовывается, индекс дописывается последним,
+        поэтому при сбое в индексе не бывает ссылок на неполные сегменты.
+        """
+        os.makedirs(self._directory, exist_ok=True)
+        created = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S')
+        name = f'segment-{created}-{uuid.uuid4().hex}.jsonl.gz'
+        records = [_encode(row) for row in rows]
+        payload = ''.join(json.dumps(record, ensure_ascii=False) + '\n' for record in records)
+
+        temporary = self._path(name + '.tmp')
+        _write_durably(temporary, gzip.compress(payload.encode()))
+        os.replace(temporary, self._path(name))
+        _sync_directory(self._directory)
+
+        timestamps = [record['query_ts'] for record in records]
+        numbers = {record['cadastral_number'] for record in records}
+        bloom = _build_bloom(numbers, self._bloom_bits_per_key, self._bloom_hashes)
+        entry = {
+            'segment': name,
+            'rows': len(records),
+            'min_ts': min(timestamps),
+            'max_ts': max(timestamps),
+            'prefixes': sorted({number[:self._prefix_length] for number in numbers}),
+            'bloom': base64.b64encode(bloom).decode(),
+            'bloom_hashes': self._bloom_hashes,
+            }
+        _append_line(self._path(INDEX_FILE), (json.dumps(entry) + '\n').encode())
+        return name
+
+    def find_histories(self, cadastral_number: str) -> List[dict]:
+        """
+        Результаты по кадастровому номеру в формате строк архива, по времени записи.
+        Повторно архивированные строки (сбой между записью сегмента и удалением из базы)
+        отдаются один раз.
+        """
+        prefix = cadastral_number[:self._prefix_length]
+        needle = json.dumps({'cadastral_number': cadastral_number})[1:-1]
+        found: Dict[int, dict] = {}
+        for entry in self.segments():
+            if prefix not in entry['prefixes'] or not _may_contain(entry, cadastral_number):
+                continue
+            with gzip.open(self._path(entry['segment']), 'rt') as segment:
+                for line in segment:
+                    if needle not in line:
+                        continue
+                    record = _decode(line)
+                    if record['history_id'] is not None:
+                        found[record['history_id']] = record
+        return sorted(found.values(), key=_history_order)
+
+
+def _history_order(record: dict) -> Tuple:
+    return record['history_ts'], record['history_id']
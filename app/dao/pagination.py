@@ -0,0 +1,21 @@
+import base64
+from datetime import datetime
+
+
+def encode_cursor(create_ts: datetime, id: int) -> str:
+    """Упаковывает ключ последней записи страницы (create_ts, id) в непрозрачную строку."""
+    raw = f'{create_ts.isoformat()}|{id}'.encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """
+    Распаковывает курсор обратно в (create_ts, id).
+    Raises: ValueError: Если курсор поврежден.
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        create_ts, id = base64.urlsafe_b64decode(padded).decode().split('|')
+        return datetime.fromisoformat(create_ts), int(id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f'Некорректный курсор: {cursor}') from e
@@ -1,12 +1,43 @@
 import logging
+from datetime import datetime, timedelta
+from typing import Optional, Sequence
 from sqlalchemy.orm import joinedload
 from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy import select
+from sqlalchemy import Boolean, DateTime, Integer, String, and_, any_, case, delete, exists, \
+    func, insert, literal, or_, select, text, update
+from sqlalchemy.dialects.postgresql import ARRAY, aggregate_order_by, array_agg, \
+    insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
 
-from app.db.models.models import Query, History
+from app.db.models.models import CadastralSummary, History, JobStatus, LookupClaim, Query
 from app.dao.base_dao import BaseDAO
+from app.dao.geo_grid import EARTH_RADIUS_M
+
+
+def _in_ranges(column, ranges: Sequence[tuple]):
+    """Условие попадания column в один из полуинтервалов [start, end)."""
+    return or_(*[and_(column >= start, column < end) for start, end in ranges])
+
+
+def _with_prefixes(prefixes: Sequence[str]):
+    """Условие: кадастровый номер начинается с одного из префиксов."""
+    return or_(*[Query.cadastral_number.startswith(prefix) for prefix in prefixes])
+
+
+def _in_cells(ranges: Sequence[tuple]):
+    """Условие: ячейка сетки запроса попадает в один из диапазонов [from, to]."""
+    return or_(*[Query.grid_cell.between(first, last) for first, last in ranges])
+
+
+def _distance_to(latitude: float, longitude: float):
+    """Расстояние в метрах от координат запроса до точки (формула гаверсинусов)."""
+    half_chord = (
+        func.power(func.sin(func.radians(Query.latitude - latitude) / 2), 2)
+        + func.cos(func.radians(latitude)) * func.cos(func.radians(Query.latitude))
+        * func.power(func.sin(func.radians(Query.longitude - longitude) / 2), 2)
+        )
+    return 2 * EARTH_RADIUS_M * func.asin(func.least(1.0, func.sqrt(half_chord)))
 
 
 #Возможно для нашего не большого проекта это избыточно, \ 
@@ -14,10 +45,298 @@ from app.dao.base_dao import BaseDAO
 class QueryDAO(BaseDAO):
     model = Query
 
+    # Колонки списков запросов (QueryResponse)
+    LIST_COLUMNS = ('id', 'cadastral_number', 'latitude', 'longitude', 'create_ts')
+
+    @classmethod
+    def _claimable(cls, lease: float):
+        """Условие: фоновая задача ждет обработчика или ее обработчик молчит дольше lease секунд."""
+        return or_(
+            cls.model.job_status == JobStatus.PENDING.value,
+            and_(
+                cls.model.job_status == JobStatus.RUNNING.value,
+                cls.model.job_claimed_ts < func.localtimestamp() - timedelta(seconds=lease)
+                )
+            )
+
+    @classmethod
+    async def find_job_ids(
+        cls, session: AsyncSession, after_id: int, limit: int, lease: float
+            ) -> list[int]:
+        """
+        Находит следующие после after_id limit фоновых задач, которые можно взять в обработку.
+        Запросы без job_status (синхронные и загруженные ingest.py) не возвращаются.
+        """
+        try:
+            query = (
+                select(cls.model.id)
+                .where(cls._claimable(lease), cls.model.id > after_id)
+                .order_by(cls.model.id)
+                .limit(limit)
+                )
+            result = await session.execute(query)
+            return result.scalars().all()
+        except SQLAlchemyError as e:
+            logging.error(f'Ошибка при получении необработанных запросов: {e}')
+            raise
+
+    @classmethod
+    async def claim_job(
+        cls, session: AsyncSession, query_id: int, lease: float
+            ) -> Optional[str]:
+        """
+        Берет фоновую задачу в обработку: переводит ее в running, если ее можно взять.
+        Строку, которую сейчас берет другой обработчик, пропускает (FOR UPDATE SKIP LOCKED),
+        поэтому задачу, поставленную в очереди нескольких процессов, обрабатывает один.
+        Возвращает: Кадастровый номер взятой задачи или None.
+        """
+        locked = (
+            select(cls.model.id)
+            .where(cls.model.id == query_id, cls._claimable(lease))
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+            )
+        query = (
+            update(cls.model)
+            .where(cls.model.id == locked)
+            .values(job_status=JobStatus.RUNNING.value, job_claimed_ts=func.localtimestamp())
+            .returning(cls.model.cadastral_number)
+            .execution_options(synchronize_session=False)
+            )
+        try:
+            result = await session.execute(query)
+            return result.scalar_one_or_none()
+        except SQLAlchemyError as e:
+            logging.error(f'Ошибка при взятии запроса {query_id} в обработку: {e}')
+            raise
+
+    @classmethod
+    async def finish_job(cls, session: AsyncSession, query_id: int, status: JobStatus):
+        """Отмечает фоновую задачу выполненной (DONE) или возвращает в очередь (PENDING)."""
+        query = (
+            update(cls.model)
+            .where(cls.model.id == query_id, cls.model.job_status.is_not(None))
+            .values(job_status=status.value)
+            .execution_options(synchronize_session=False)
+            )
+        try:
+            await session.execute(query)
+        except SQLAlchemyError as e:
+            logging.error(f'Ошибка при обновлении состояния запроса {query_id}: {e}')
+            raise
+
+    @classmethod
+    def count_by_bucket_query(
+        cls, bucket: str, ranges: Sequence[tuple], prefixes: Sequence[str] = ()
+            ):
+        """Строит SELECT количества запросов по интервалам date_trunc(bucket, create_ts)."""
+        bucket_start = func.date_trunc(bucket, cls.model.create_ts).label('bucket_start')
+        query = (
+            select(bucket_start, func.count())
+            .where(_in_ranges(cls.model.create_ts, ranges))
+            .group_by(bucket_start)
+            )
+        if prefixes:
+            query = query.where(_with_prefixes(prefixes))
+        return query
+
+    @classmethod
+    async def count_by_bucket(
+        cls,
+        session: AsyncSession,
+        bucket: str,
+        ranges: Sequence[tuple],
+        prefixes: Sequence[str] = ()
+            ) -> dict:
+        """
+        Считает запросы по интервалам времени внутри заданных полуинтервалов [start, end).
+        Возвращает: Словарь {начало интервала: количество запросов}.
+        """
+        try:
+            query = cls.count_by_bucket_query(bucket, ranges, prefixes)
+            result = await session.execute(query)
+            return dict(result.all())
+        except SQLAlchemyError as e:
+            logging.error(f'Ошибка при подсчете запросов по интервалам: {e}')
+            raise
+
+    @classmethod
+    def in_bbox_query(
+        cls,
+        ranges: Sequence[tuple],
+        min_latitude: float,
+        max_latitude: float,
+        min_longitude: float,
+        max_longitude: float,
+        limit: int
+            ):
+        """
+        Строит SELECT запросов внутри прямоугольника координат.
+        Кандидаты отбираются по индексу ячеек сетки, затем точно по координатам.
+        """
+        if min_longitude <= max_longitude:
+            longitude = cls.model.longitude.between(min_longitude, max_longitude)
+        else:
+            longitude = or_(
+                cls.model.longitude >= min_longitude, cls.model.longitude <= max_longitude
+                )
+        return (
+            select(cls.model)
+            .where(
+                _in_cells(ranges),
+                cls.model.latitude.between(min_latitude, max_latitude),
+                longitude
+                )
+            .order_by(cls.model.id)
+            .limit(limit)
+            )
+
+    @classmethod
+    async def find_in_bbox(cls, session: AsyncSession, ranges: Sequence[tuple], **bbox):
+        """
+        Находит запросы внутри прямоугольника координат.
+        Аргументы: ranges: Диапазоны ячеек сетки, покрывающие прямоугольник.
+        **bbox: Границы прямоугольника и limit, как в in_bbox_query.
+        """
+        try:
+            query = cls.in_bbox_query(ranges, **bbox)
+            result = await session.execute(query)
+            return result.scalars().all()
+        except SQLAlchemyError as e:
+            logging.error(f'Ошибка при поиске запросов в прямоугольнике: {e}')
+            raise
+
+    @classmethod
+    def nearest_query(
+        cls, ranges: Sequence[tuple], latitude: float, longitude: float, limit: int
+            ):
+        """Строит SELECT ближайших к точке запросов среди ячеек сетки из ranges."""
+        distance = _distance_to(latitude, longitude).label('distance')
+        return (
+            select(cls.model, distance)
+            .where(_in_cells(ranges))
+            .order_by(distance, cls.model.id)
+            .limit(limit)
+            )
+
+    @classmethod
+    async def find_nearest(
+        cls,
+        session: AsyncSession,
+        ranges: Sequence[tuple],
+        latitude: float,
+        longitude: float,
+        limit: int
+            ):
+        """
+        Находит до limit ближайших к точке запросов среди ячеек сетки из ranges.
+        Возвращает: Список пар (запрос, расстояние в метрах) по возрастанию расстояния.
+        """
+        try:
+            query = cls.nearest_query(ranges, latitude, longitude, limit)
+            result = await session.execute(query)
+            return result.all()
+        except SQLAlchemyError as e:
+            logging.error(f'Ошибка при поиске ближайших запросов: {e}')
+            raise
+
 
 class HistoryDAO(BaseDAO):
     model = History
 
+    # Пространство ключей advisory-блокировок записи результатов: двухключевая форма
+    # pg_advisory_xact_lock(int, int) не пересекается с одноключевой (bigint)
+    RESULT_LOCK_SPACE = 1
+
+    @classmethod
+    async def find_result(cls, session: AsyncSession, query_id: int):
+        """
+        Находит результат запроса; если их несколько (записаны до add_results), первый.
+        Возвращает: Экземпляр модели или None, если результата еще нет.
+        """
+        try:
+            query = (
+                select(cls.model)
+                .where(cls.model.query_id == query_id)
+                .order_by(cls.model.id)
+                .limit(1)
+                )
+            result = await session.execute(query)
+            return result.scalars().first()
+        except SQLAlchemyError as e:
+            logging.error(f'Ошибка при получении результата запроса {query_id}: {e}')
+            raise
+
+    @classmethod
+    async def add_results(cls, session: AsyncSession, rows: Sequence[tuple]) -> list[tuple]:
+        """
+        Записывает результаты (query_id, history), не больше одного на запрос,
+        как INSERT ... ON CONFLICT (query_id) DO NOTHING. Уникальный индекс только по query_id
+        в секционированной по create_ts таблице невозможен, поэтому записи по одному запросу
+        упорядочиваются транзакционными advisory-блокировками по query_id (берутся
+        по возрастанию, без взаимных блокировок), а вставляются только строки запросов,
+        у которых результата еще нет. Из повторов query_id в пачке берется первый.
+        Возвращает: (id результата, записан ли он сейчас) в порядке строк; для пропущенных
+        строк — id уже записанного результата.
+        """
+        first = {}
+        for query_id, history in rows:
+            first.setdefault(query_id, history)
+        query_ids = sorted(first)
+        table = cls.model.__table__
+        batch = func.unnest(
+            literal(query_ids, ARRAY(Integer)),
+            literal([first[query_id] for query_id in query_ids], ARRAY(Boolean))
+            ).table_valued('query_id', 'history').render_derived()
+        new_results = (
+            select(batch.c.query_id, batch.c.history)
+            .where(~exists().where(table.c.query_id == batch.c.query_id))
+            )
+        try:
+            # Блокировки берутся отдельной командой: проверка NOT EXISTS в следующей команде
+            # получает снимок уже после их получения и видит результаты, записанные до нас
+            await session.execute(
+                text(
+                    'SELECT pg_advisory_xact_lock(:space, query_id) '
+                    'FROM unnest(CAST(:query_ids AS integer[])) AS query_id'
+                    ),
+                {'space': cls.RESULT_LOCK_SPACE, 'query_ids': query_ids}
+                )
+            result = await session.execute(
+                insert(table)
+                .from_select(['query_id', 'history'], new_results)
+                .returning(table.c.query_id, table.c.id)
+                )
+            ids = dict(result.all())
+            inserted = set(ids)
+            skipped = [query_id for query_id in query_ids if query_id not in inserted]
+            if skipped:
+                result = await session.execute(
+                    select(table.c.query_id, func.min(table.c.id))
+                    .where(table.c.query_id == any_(literal(skipped, ARRAY(Integer))))
+                    .group_by(table.c.query_id)
+                    )
+                ids.update(result.all())
+        except SQLAlchemyError as e:
+            logging.error(f'Ошибка при записи результатов запросов: {e}')
+            raise
+        seen = set()
+        written = []
+        for query_id, _ in rows:
+            written.append((ids[query_id], query_id in inserted and query_id not in seen))
+            seen.add(query_id)
+        return written
+
+    @classmethod
+    def histories_by_cadastral_number_query(cls, cadastral_number: str):
+        """Строит SELECT всех историй по кадастровому номеру."""
+        return (
+            select(cls.model)
+            .join(cls.model.query)
+            .options(joinedload(cls.model.query))
+            .where(Query.cadastral_number == cadastral_number)
+            )
+
     @classmethod
     async def find_histories_by_cadastral_number(
         cls, session: AsyncSession, cadastral_number: str
@@ -26,16 +345,467 @@ class HistoryDAO(BaseDAO):
         Находит все истории, связанные с кадастровым номером.
         """
         try:
-            query = (
-                select(cls.model)
-                .join(Query)
-                .options(joinedload(cls.model.query))
-                .where(Query.cadastral_number == cadastral_number)
-                )
+            query = cls.histories_by_cadastral_number_query(cadastral_number)
             result = await session.execute(query)
             histories = result.scalars().all()
 
             return histories
         except SQLAlchemyError as e:
             logging.error(f'Ошибка при получении всех историй запросов: {e}')
-            raise
\ No newline at end of file
+            raise
+
+    @classmethod
+    def latest_by_cadastral_number_query(cls, cadastral_number: str, since):
+        """Строит SELECT самого свежего результата по кадастровому номеру не раньше since."""
+        return (
+            select(cls.model)
+            .join(cls.model.query)
+            .where(
+                Query.cadastral_number == cadastral_number,
+                cls.model.create_ts >= since
+                )
+            .order_by(cls.model.create_ts.desc(), cls.model.id.desc())
+            .limit(1)
+            )
+
+    @classmethod
+    async def find_latest_by_cadastral_number(
+        cls, session: AsyncSession, cadastral_number: str, since
+        ):
+        """
+        Находит самый свежий результат по кадастровому номеру, записанный не раньше since.
+        """
+        try:
+            query = cls.latest_by_cadastral_number_query(cadastral_number, since)
+            result = await session.execute(query)
+            return result.scalars().first()
+        except SQLAlchemyError as e:
+            logging.error(f'Ошибка при получении последнего результата: {e}')
+            raise
+
+    @classmethod
+    def count_results_by_bucket_query(
+        cls, bucket: str, ranges: Sequence[tuple], prefixes: Sequence[str] = ()
+            ):
+        """Строит SELECT количества положительных и отрицательных результатов по интервалам."""
+        bucket_start = func.date_trunc(bucket, cls.model.create_ts).label('bucket_start')
+        query = (
+            select(
+                bucket_start,
+                func.count().filter(cls.model.history.is_(True)),
+                func.count().filter(cls.model.history.is_(False)),
+                )
+            .where(_in_ranges(cls.model.create_ts, ranges))
+            .group_by(bucket_start)
+            )
+        if prefixes:
+            query = query.join(cls.model.query).where(_with_prefixes(prefixes))
+        return query
+
+    @classmethod
+    async def count_results_by_bucket(
+        cls,
+        session: AsyncSession,
+        bucket: str,
+        ranges: Sequence[tuple],
+        prefixes: Sequence[str] = ()
+            ) -> dict:
+        """
+        Считает результаты по времени их записи внутри полуинтервалов [start, end).
+        Возвращает: Словарь {начало интервала: (положительных, отрицательных)}.
+        """
+        try:
+            query = cls.count_results_by_bucket_query(bucket, ranges, prefixes)
+            result = await session.execute(query)
+            return {
+                bucket_start: (positive, negative)
+                for bucket_start, positive, negative in result.all()
+                }
+        except SQLAlchemyError as e:
+            logging.error(f'Ошибка при подсчете результатов по интервалам: {e}')
+            raise
+
+    @classmethod
+    def export_query(
+        cls,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None,
+        cadastral_number: Optional[str] = None
+            ):
+        """Строит SELECT запросов с результатами для выгрузки с необязательными фильтрами."""
+        on_clause = cls.model.query_id == Query.id
+        if date_from is not None:
+            # Результат всегда записывается после запроса: условие ничего не меняет
+            # в выборке, но позволяет отсечь старые партиции histories
+            on_clause = and_(on_clause, cls.model.create_ts >= date_from)
+        query = (
+            select(
+                Query.id.label('query_id'),
+                Query.cadastral_number,
+                Query.latitude,
+                Query.longitude,
+                Query.create_ts.label('query_ts'),
+                cls.model.id.label('history_id'),
+                cls.model.history,
+                cls.model.create_ts.label('history_ts'),
+                )
+            .select_from(Query)
+            .outerjoin(cls.model, on_clause)
+            .order_by(Query.id, cls.model.id)
+            )
+        if date_from is not None:
+            query = query.where(Query.create_ts >= date_from)
+        if date_to is not None:
+            query = query.where(Query.create_ts < date_to)
+        if cadastral_number is not None:
+            query = query.where(Query.cadastral_number == cadastral_number)
+        return query
+
+    @classmethod
+    async def stream_with_queries(
+        cls,
+        session: AsyncSession,
+        chunk_size: int,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None,
+        cadastral_number: Optional[str] = None
+            ):
+        """
+        Потоково отдает запросы вместе с результатами пачками по chunk_size строк.
+        Строки читаются серверным курсором, в памяти одновременно держится только одна пачка.
+        Фильтры применяются к дате создания запроса [date_from, date_to) и кадастровому номеру.
+        """
+        query = cls.export_query(
+            date_from=date_from, date_to=date_to, cadastral_number=cadastral_number
+            ).execution_options(yield_per=chunk_size)
+        try:
+            result = await session.stream(query)
+            async for rows in result.partitions(chunk_size):
+                yield rows
+        except SQLAlchemyError as e:
+            logging.error(f'Ошибка при выгрузке истории запросов: {e}')
+            raise
+
+    @classmethod
+    async def find_archive_batch(cls, session: AsyncSession, before: datetime, limit: int):
+        """
+        Находит limit самых старых запросов, созданных раньше before, вместе с их результатами.
+        Возвращает: строки в порядке колонок export_query.
+        """
+        try:
+            oldest = (
+                select(Query.id)
+                .where(Query.create_ts < before)
+                .order_by(Query.create_ts, Query.id)
+                .limit(limit)
+                )
+            query = cls.export_query(date_to=before).where(Query.id.in_(oldest))
+            result = await session.execute(query)
+            return result.all()
+        except SQLAlchemyError as e:
+            logging.error(f'Ошибка при выборке истории для архивации: {e}')
+            raise
+
+    @classmethod
+    async def delete_archived(
+        cls,
+        session: AsyncSession,
+        query_ids: Sequence[int],
+        history_ids: Sequence[int],
+        before: datetime
+            ) -> set[int]:
+        """
+        Удаляет заархивированные результаты и запросы.
+        Результаты удаляются по своим id, а не по query_id, а запрос с оставшимися
+        результатами не удаляется: записанный после выборки результат не пропадет,
+        не попав в архив, и не останется без запроса.
+        Возвращает: id действительно удаленных результатов.
+        """
+        try:
+            result = await session.execute(
+                delete(cls.model)
+                .where(cls.model.id == any_(literal(list(history_ids), ARRAY(Integer))))
+                .returning(cls.model.id)
+                )
+            deleted = set(result.scalars())
+            await session.execute(
+                delete(Query).where(
+                    Query.id == any_(literal(list(query_ids), ARRAY(Integer))),
+                    Query.create_ts < before,
+                    ~exists().where(cls.model.query_id == Query.id)
+                    )
+                )
+            return deleted
+        except SQLAlchemyError as e:
+            logging.error(f'Ошибка при удалении заархивированной истории: {e}')
+            raise
+
+
+class LookupClaimDAO(BaseDAO):
+    model = LookupClaim
+
+    @classmethod
+    async def try_claim(
+        cls, session: AsyncSession, cadastral_number: str, owner: str, lease: float
+            ) -> tuple:
+        """
+        Берет номер на время проверки: вставляет запись или перехватывает запись,
+        владелец которой не снял ее дольше lease секунд.
+        Возвращает: (взят ли номер, с какого времени его проверяет текущий владелец;
+        None, если владелец только что снял запись).
+        """
+        query = pg_insert(cls.model).values(
+            cadastral_number=cadastral_number, owner=owner, claimed_ts=func.localtimestamp()
+            )
+        query = query.on_conflict_do_update(
+            index_elements=[cls.model.cadastral_number],
+            set_={
+                'owner': query.excluded.owner,
+                'claimed_ts': query.excluded.claimed_ts,
+                'update_ts': func.now(),
+                },
+            where=cls.model.claimed_ts < func.localtimestamp() - timedelta(seconds=lease)
+            ).returning(cls.model.claimed_ts)
+        try:
+            claimed_ts = await session.scalar(query)
+            if claimed_ts is not None:
+                return True, claimed_ts
+            holder_ts = await session.scalar(
+                select(cls.model.claimed_ts)
+                .where(cls.model.cadastral_number == cadastral_number)
+                )
+            return False, holder_ts
+        except SQLAlchemyError as e:
+            logging.error(f'Ошибка при взятии номера {cadastral_number} на проверку: {e}')
+            raise
+
+    @classmethod
+    async def release(cls, session: AsyncSession, cadastral_number: str, owner: str):
+        """Снимает запись, если номер все еще принадлежит owner."""
+        try:
+            await session.execute(
+                delete(cls.model).where(
+                    cls.model.cadastral_number == cadastral_number, cls.model.owner == owner
+                    )
+                )
+        except SQLAlchemyError as e:
+            logging.error(f'Ошибка при освобождении номера {cadastral_number}: {e}')
+            raise
+
+
+class CadastralSummaryDAO(BaseDAO):
+    model = CadastralSummary
+
+    SUMMARY_COLUMNS = (
+        'cadastral_number', 'last_result', 'last_checked_ts', 'total_count', 'positive_count'
+        )
+    ARCHIVED_COLUMNS = (
+        'archived_count', 'archived_positive_count', 'archived_last_result',
+        'archived_last_checked_ts'
+        )
+
+    @classmethod
+    async def apply_histories(cls, session: AsyncSession, rows: Sequence[tuple]):
+        """
+        Учитывает пачку результатов (query_id, history) одним INSERT ... ON CONFLICT.
+        Результаты предварительно сводятся по кадастровому номеру: одна команда не может
+        обновить строку сводки дважды. Последним считается результат, стоящий в пачке позже.
+        """
+        if not rows:
+            return
+        query_ids, histories = zip(*rows)
+        batch = func.unnest(
+            literal(list(query_ids), ARRAY(Integer)), literal(list(histories), ARRAY(Boolean))
+            ).table_valued('query_id', 'history', with_ordinality='position').render_derived()
+        checked = (
+            select(
+                Query.cadastral_number,
+                array_agg(aggregate_order_by(batch.c.history, batch.c.position.desc()))[1],
+                func.now(),
+                func.count(),
+                func.count().filter(batch.c.history),
+                )
+            .select_from(batch)
+            .join(Query, Query.id == batch.c.query_id)
+            .group_by(Query.cadastral_number)
+            )
+        try:
+            await session.execute(cls._upsert_query(checked))
+        except SQLAlchemyError as e:
+            logging.error(f'Ошибка при обновлении сводки по кадастровым номерам: {e}')
+            raise
+
+    @classmethod
+    async def apply_archived(cls, session: AsyncSession, rows: Sequence[tuple]):
+        """
+        Учитывает в колонках archived_* сводки результаты (cadastral_number, history, history_ts),
+        перенесенные в архив. Вызывается в той же транзакции, что и их удаление из histories,
+        поэтому повторная архивация после сбоя не учитывает результаты дважды.
+        total_count и positive_count не меняются: архивные проверки в них уже учтены.
+        """
+        if not rows:
+            return
+        numbers, histories, checked_ts = zip(*rows)
+        batch = func.unnest(
+            literal(list(numbers), ARRAY(String)),
+            literal(list(histories), ARRAY(Boolean)),
+            literal(list(checked_ts), ARRAY(DateTime))
+            ).table_valued('cadastral_number', 'history', 'checked_ts').render_derived()
+        last_result = array_agg(aggregate_order_by(batch.c.history, batch.c.checked_ts.desc()))[1]
+        total, positive = func.count(), func.count().filter(batch.c.history)
+        archived = (
+            select(
+                batch.c.cadastral_number, last_result, func.max(batch.c.checked_ts), total,
+                positive, total, positive, last_result, func.max(batch.c.checked_ts),
+                )
+            .group_by(batch.c.cadastral_number)
+            )
+        query = pg_insert(cls.model).from_select(
+            cls.SUMMARY_COLUMNS + cls.ARCHIVED_COLUMNS, archived
+            )
+        excluded = query.excluded
+        query = query.on_conflict_do_update(
+            index_elements=[cls.model.cadastral_number],
+            set_={
+                'archived_count': cls.model.archived_count + excluded.archived_count,
+                'archived_positive_count':
+                    cls.model.archived_positive_count + excluded.archived_positive_count,
+                'archived_last_result': case(
+                    (
+                        or_(
+                            cls.model.archived_last_checked_ts.is_(None),
+                            excluded.archived_last_checked_ts >= cls.model.archived_last_checked_ts
+                            ),
+                        excluded.archived_last_result
+                        ),
+                    else_=cls.model.archived_last_result
+                    ),
+                'archived_last_checked_ts': func.greatest(
+                    cls.model.archived_last_checked_ts, excluded.archived_last_checked_ts
+                    ),
+                'update_ts': func.now(),
+                }
+            )
+        try:
+            await session.execute(query)
+        except SQLAlchemyError as e:
+            logging.error(f'Ошибка при учете архивных результатов в сводке: {e}')
+            raise
+
+    @classmethod
+    def _upsert_query(cls, checked):
+        """INSERT ... SELECT в сводку, прибавляющий проверки checked к существующим строкам."""
+        query = pg_insert(cls.model).from_select(cls.SUMMARY_COLUMNS, checked)
+        excluded = query.excluded
+        query = query.on_conflict_do_update(
+            index_elements=[cls.model.cadastral_number],
+            set_={
+                'last_result': case(
+                    (excluded.last_checked_ts >= cls.model.last_checked_ts, excluded.last_result),
+                    else_=cls.model.last_result
+                    ),
+                'last_checked_ts': func.greatest(
+                    cls.model.last_checked_ts, excluded.last_checked_ts
+                    ),
+                'total_count': cls.model.total_count + excluded.total_count,
+                'positive_count': cls.model.positive_count + excluded.positive_count,
+                'update_ts': func.now(),
+                }
+            )
+        return query
+
+    @classmethod
+    async def rebuild_batch(
+        cls, session: AsyncSession, after: Optional[str], batch_size: int
+            ) -> Optional[str]:
+        """
+        Пересчитывает сводку для следующих batch_size кадастровых номеров после after
+        по результатам в базе и архивным итогам из колонок archived_*. Строки сводки номеров,
+        по которым больше нет результатов ни в базе, ни в архиве, удаляются, а номера,
+        полностью перенесенные в архив, получают только архивные итоги.
+        На время пачки таблица сводки блокируется от записи, поэтому результаты,
+        записанные параллельно, не теряются и не учитываются дважды.
+        Возвращает: Последний обработанный номер или None, если номеров больше нет.
+        """
+        in_range = []
+        if after is not None:
+            in_range.append(Query.cadastral_number > after)
+        try:
+            numbers = (
+                select(Query.cadastral_number)
+                .where(*in_range)
+                .distinct()
+                .order_by(Query.cadastral_number)
+                .limit(batch_size)
+                .subquery()
+                )
+            last = await session.scalar(select(func.max(numbers.c.cadastral_number)))
+            await session.execute(
+                text(f'LOCK TABLE {cls.model.__tablename__} IN SHARE ROW EXCLUSIVE MODE')
+                )
+
+            summary_range = [] if after is None else [cls.model.cadastral_number > after]
+            if last is not None:
+                in_range.append(Query.cadastral_number <= last)
+                summary_range.append(cls.model.cadastral_number <= last)
+
+            no_histories = ~exists().where(
+                Query.cadastral_number == cls.model.cadastral_number,
+                History.query_id == Query.id
+                )
+            await session.execute(
+                delete(cls.model).where(*summary_range, no_histories, cls.model.archived_count == 0)
+                )
+            await session.execute(
+                update(cls.model)
+                .where(*summary_range, no_histories, cls.model.archived_count > 0)
+                .values(
+                    last_result=cls.model.archived_last_result,
+                    last_checked_ts=cls.model.archived_last_checked_ts,
+                    total_count=cls.model.archived_count,
+                    positive_count=cls.model.archived_positive_count,
+                    update_ts=func.now(),
+                    )
+                )
+            if last is None:
+                return None
+
+            aggregated = (
+                select(
+                    Query.cadastral_number,
+                    array_agg(aggregate_order_by(
+                        History.history, History.create_ts.desc(), History.id.desc()
+                        ))[1],
+                    func.max(History.create_ts),
+                    func.count(History.id),
+                    func.count(History.id).filter(History.history.is_(True)),
+                    )
+                .join(History, History.query_id == Query.id)
+                .where(*in_range)
+                .group_by(Query.cadastral_number)
+                )
+            query = pg_insert(cls.model).from_select(cls.SUMMARY_COLUMNS, aggregated)
+            excluded = query.excluded
+            # Последний результат берется из архива, только если архивная проверка новее
+            # оставшихся в базе
+            archived_is_last = cls.model.archived_last_checked_ts > excluded.last_checked_ts
+            query = query.on_conflict_do_update(
+                index_elements=[cls.model.cadastral_number],
+                set_={
+                    'last_result': case(
+                        (archived_is_last, cls.model.archived_last_result),
+                        else_=excluded.last_result
+                        ),
+                    'last_checked_ts': func.greatest(
+                        excluded.last_checked_ts, cls.model.archived_last_checked_ts
+                        ),
+                    'total_count': excluded.total_count + cls.model.archived_count,
+                    'positive_count': excluded.positive_count + cls.model.archived_positive_count,
+                    'update_ts': func.now(),
+                    }
+                )
+            await session.execute(query)
+            return last
+        except SQLAlchemyError as e:
+            logging.error(f'Ошибка при пересборке сводки по кадастровым номерам: {e}')
+            raise
@@ -1,5 +1,7 @@
 from datetime import datetime
 from decimal import Decimal
+from operator import attrgetter
+from typing import Dict, Tuple
 import uuid
 
 from sqlalchemy import Integer, func, inspect
@@ -12,6 +14,9 @@ class BaseModel(AsyncAttrs, DeclarativeBase):
     Класс Base будет использоваться для создания моделей таблиц, которые автоматически добавляют поля create_ts и update_ts для отслеживания времени создания и обновления записей.
     """
     __abstract__ = True
+    # Серверные значения (id, create_ts, update_ts, ...) возвращаются тем же INSERT/UPDATE
+    # через RETURNING, без отдельного SELECT
+    __mapper_args__ = {'eager_defaults': True}
 
     # Так же мы можем использовать UUID если мы этого хотим TODO
     id: Mapped[str] = mapped_column(Integer(), primary_key=True)
@@ -19,6 +24,10 @@ class BaseModel(AsyncAttrs, DeclarativeBase):
     update_ts: Mapped[datetime] = mapped_column(server_default=func.now(),
                                                 onupdate=func.now())
 
+    def column_values(self) -> dict:
+        """Значения колонок модели без преобразования типов."""
+        return {key: getter(self) for key, getter in _column_plan(self.__class__)}
+
     def to_dict(self, exclude_none: bool = False):
         """
         Преобразует объект модели в словарь.
@@ -39,4 +48,19 @@ class BaseModel(AsyncAttrs, DeclarativeBase):
             if not exclude_none or value is not None:
                 history[column.key] = value
 
-        return history
\ No newline at end of file
+        return history
+
+
+# План колонок на класс модели: (ключ, геттер), чтобы не обходить inspect(...).columns
+# при каждом вызове column_values
+_column_plans: Dict[type, Tuple] = {}
+
+
+def _column_plan(model: type) -> Tuple:
+    plan = _column_plans.get(model)
+    if plan is None:
+        plan = tuple(
+            (column.key, attrgetter(column.key)) for column in inspect(model).columns
+            )
+        _column_plans[model] = plan
+    return plan
@@ -1,41 +1,147 @@
-from typing import List
-from sqlalchemy import Boolean, Float, ForeignKey, Integer, String
+from datetime import datetime
+from enum import Enum
+from typing import List, Optional
+from sqlalchemy import BigInteger, Boolean, DateTime, FetchedValue, Float, Index, Integer, \
+    String, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship, validates
 
 from app.db.database import BaseModel
 
 
+def validate_cadastral_number(value: str) -> str:
+    """Проверяет формат кадастрового номера: 13 или 14 цифр."""
+    if not value.isdigit() or len(value) not in (13, 14):
+        raise ValueError('Кадастровый номер должен содержать 13 или 14 цифр')
+    return value
+
+
+class JobStatus(str, Enum):
+    """Состояние фоновой обработки запроса (POST /query?background=true)."""
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+
+
 class Query(BaseModel):
+    """
+    Запрос на проверку кадастрового номера.
+    Таблица секционирована по месяцам create_ts (manage_partitions.py), поэтому в базе
+    первичный ключ — (id, create_ts), а внешнего ключа из histories нет.
+    """
     __tablename__ = 'queries'
+    __table_args__ = (
+        Index('ix_queries_create_ts_id', 'create_ts', 'id'),
+        Index('ix_queries_cadastral_number_create_ts', 'cadastral_number', 'create_ts'),
+        Index('ix_queries_grid_cell', 'grid_cell'),
+        Index(
+            'ix_queries_job_status_id', 'id',
+            postgresql_where=text("job_status IN ('pending', 'running')")
+            ),
+        )
 
     cadastral_number: Mapped[str] = mapped_column(
         String(14), nullable=False
         )
     latitude: Mapped[float] = mapped_column(Float, nullable=False)
     longitude: Mapped[float] = mapped_column(Float, nullable=False)
+    # Ячейка сетки 0.01° (app/dao/geo_grid.py), заполняется триггером при вставке и изменении координат
+    grid_cell: Mapped[Optional[int]] = mapped_column(
+        BigInteger, server_default=FetchedValue(), server_onupdate=FetchedValue()
+        )
+    # Только у фоновых задач (JobStatus); у синхронных и загруженных ingest.py запросов — None
+    job_status: Mapped[Optional[str]] = mapped_column(String(10))
+    # Когда обработчик взял задачу; задача без отчета дольше LOOKUP_JOB_LEASE берется заново
+    job_claimed_ts: Mapped[Optional[datetime]] = mapped_column(DateTime)
 
-    history: Mapped[List['History']] = relationship('History', back_populates='query')
+    history: Mapped[List['History']] = relationship(
+        'History', back_populates='query', primaryjoin='Query.id == foreign(History.query_id)'
+        )
 
     @validates('cadastral_number')
     def validate_cadastral_number(cls, key, value):
-        if not value.isdigit() or len(value) not in (13, 14):
-            raise ValueError('Кадастровый номер должен содержать 13 или 14 цифр')
-        return value
+        return validate_cadastral_number(value)
 
     def __repr__(self) -> str:
         return f'Cadastral number: {self.cadastral_number}, History: {self.history}'
 
 
 class History(BaseModel):
+    """Результат проверки запроса; таблица секционирована по месяцам create_ts, как и queries."""
     __tablename__ = 'histories'
-
-    query_id: Mapped[int] = mapped_column(
-        Integer, ForeignKey('queries.id'), index=True
+    __table_args__ = (
+        Index('ix_histories_create_ts', 'create_ts'),
         )
+
+    query_id: Mapped[int] = mapped_column(Integer, index=True)
     history: Mapped[bool] = mapped_column(
         Boolean, nullable=False)
 
-    query: Mapped['Query'] = relationship('Query', back_populates='history')
+    query: Mapped['Query'] = relationship(
+        'Query', back_populates='history', primaryjoin='Query.id == foreign(History.query_id)'
+        )
 
     def __repr__(self) -> str:
         return f'Query id: {self.query_id}, History: {self.history}'
+
+
+class CadastralSummary(BaseModel):
+    """
+    Сводка по кадастровому номеру: последний результат и счетчики проверок.
+    Обновляется в той же транзакции, что и запись каждого результата в histories.
+    Счетчики учитывают и проверки, перенесенные в архив (archive_history.py): их итоги
+    хранятся в колонках archived_*, и пересборка сводки добавляет их к оставшимся в базе.
+    """
+    __tablename__ = 'cadastral_summaries'
+
+    cadastral_number: Mapped[str] = mapped_column(
+        String(14), nullable=False, unique=True
+        )
+    last_result: Mapped[bool] = mapped_column(Boolean, nullable=False)
+    last_checked_ts: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    total_count: Mapped[int] = mapped_column(Integer, nullable=False)
+    positive_count: Mapped[int] = mapped_column(Integer, nullable=False)
+    archived_count: Mapped[int] = mapped_column(Integer, nullable=False, server_default=text('0'))
+    archived_positive_count: Mapped[int] = mapped_column(
+        Integer, nullable=False, server_default=text('0')
+        )
+    archived_last_result: Mapped[Optional[bool]] = mapped_column(Boolean)
+    archived_last_checked_ts: Mapped[Optional[datetime]] = mapped_column(DateTime)
+
+    def __repr__(self) -> str:
+        return f'Cadastral number: {self.cadastral_number}, Checks: {self.total_count}'
+
+
+class LookupClaim(BaseModel):
+    """
+    Кадастровый номер, который сейчас проверяет во внешнем сервисе один из процессов.
+    Запись живет только на время проверки и пишется короткими транзакциями: соединение
+    с базой на время проверки не держится. Запись, не снятая за LOOKUP_CLAIM_LEASE
+    (процесс упал), перехватывается следующим.
+    """
+    __tablename__ = 'lookup_claims'
+
+    cadastral_number: Mapped[str] = mapped_column(
+        String(14), nullable=False, unique=True
+        )
+    owner: Mapped[str] = mapped_column(String(32), nullable=False)
+    claimed_ts: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+
+    def __repr__(self) -> str:
+        return f'Cadastral number: {self.cadastral_number}, Owner: {self.owner}'
+
+
+class IngestProgress(BaseModel):
+    """
+    Сколько записей файла загрузки (ingest.py) уже обработано.
+    Обновляется в той же транзакции, что и COPY пачки: после сбоя загрузка
+    продолжается ровно с первой незагруженной записи.
+    """
+    __tablename__ = 'ingest_progress'
+
+    source: Mapped[str] = mapped_column(String(255), nullable=False, unique=True)
+    processed: Mapped[int] = mapped_column(Integer, nullable=False)
+    loaded: Mapped[int] = mapped_column(Integer, nullable=False)
+    rejected: Mapped[int] = mapped_column(Integer, nullable=False)
+
+    def __repr__(self) -> str:
+        return f'Source: {self.source}, Processed: {self.processed}'
@@ -0,0 +1,120 @@
+import logging
+import re
+from datetime import date
+from typing import List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+
+# Таблицы, секционированные по месяцам create_ts
+PARTITIONED_TABLES = ('queries', 'histories')
+
+PARTITIONS_QUERY = text(
+    'SELECT child.relname FROM pg_inherits '
+    'JOIN pg_class parent ON parent.oid = pg_inherits.inhparent '
+    'JOIN pg_class child ON child.oid = pg_inherits.inhrelid '
+    'WHERE parent.relname = :table'
+    )
+
+
+def add_months(month: date, months: int) -> date:
+    """Первое число месяца, отстоящего от month на months месяцев."""
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table: str, month: date) -> str:
+    return f'{table}_p{month:%Y_%m}'
+
+
+def default_partition_name(table: str) -> str:
+    return f'{table}_default'
+
+
+def partition_month(table: str, name: str) -> Optional[date]:
+    """Месяц партиции по ее имени или None для DEFAULT и чужих таблиц."""
+    match = re.fullmatch(rf'{table}_p(\d{{4}})_(\d{{2}})', name)
+    if match is None:
+        return None
+    return date(int(match.group(1)), int(match.group(2)), 1)
+
+
+async def monthly_partitions(connection: AsyncConnection, table: str) -> List[date]:
+    """Месяцы присоединенных партиций таблицы по возрастанию."""
+    result = await connection.execute(PARTITIONS_QUERY, {'table': table})
+    months = (partition_month(table, name) for name in result.scalars())
+    return sorted(month for month in months if month is not None)
+
+
+async def create_partition(connection: AsyncConnection, table: str, month: date):
+    """
+    Создает партицию за месяц. Строки этого месяца, успевшие попасть в DEFAULT,
+    переносятся в новую партицию: без этого PostgreSQL не даст ее создать.
+    """
+    name, default = partition_name(table, month), default_partition_name(table)
+    bounds = {'start': month, 'end': add_months(month, 1)}
+    stray = await connection.scalar(
+        text(
+            f'SELECT EXISTS (SELECT 1 FROM {default} '
+            'WHERE create_ts >= :start AND create_ts < :end)'
+            ),
+        bounds
+        )
+    if stray:
+        await connection.execute(text(f'ALTER TABLE {table} DETACH PARTITION {default}'))
+    await connection.execute(
+        text(
+            f'CREATE TABLE {name} PARTITION OF {table} '
+            f"FOR VALUES FROM ('{bounds['start'].isoformat()}') "
+            f"TO ('{bounds['end'].isoformat()}')"
+            )
+        )
+    if stray:
+        await connection.execute(
+            text(
+                f'WITH moved AS (DELETE FROM {default} '
+                'WHERE create_ts >= :start AND create_ts < :end RETURNING *) '
+                f'INSERT INTO {table} SELECT * FROM moved'
+                ),
+            bounds
+            )
+        await connection.execute(text(f'ALTER TABLE {table} ATTACH PARTITION {default} DEFAULT'))
+        logging.warning(f'Строки за {month:%Y-%m} перенесены из {default} в {name}')
+
+
+async def ensure_partitions(
+    connection: AsyncConnection, table: str, today: date, months_ahead: int
+        ) -> List[str]:
+    """Создает недостающие партиции от текущего месяца до months_ahead месяцев вперед."""
+    existing = set(await monthly_partitions(connection, table))
+    current = today.replace(day=1)
+    created = []
+    for offset in range(months_ahead + 1):
+        month = add_months(current, offset)
+        if month not in existing:
+            await create_partition(connection, table, month)
+            created.append(partition_name(table, month))
+    return created
+
+
+async def expire_partitions(
+    connection: AsyncConnection, table: str, today: date, retention_months: int, drop: bool
+        ) -> List[str]:
+    """
+    Отсоединяет партиции, целиком старше retention_months месяцев от текущего.
+    Отсоединенная партиция остается обычной таблицей (ее можно выгрузить или удалить вручную),
+    при drop=True она удаляется сразу.
+    """
+    oldest_kept = add_months(today.replace(day=1), -retention_months)
+    expired = []
+    for month in await monthly_partitions(connection, table):
+        if month >= oldest_kept:
+            break
+        name = partition_name(table, month)
+        if drop:
+            await connection.execute(text(f'DROP TABLE {name}'))
+        else:
+            await connection.execute(text(f'ALTER TABLE {table} DETACH PARTITION {name}'))
+        expired.append(name)
+    return expired
@@ -0,0 +1,125 @@
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, \
+    create_async_engine
+
+
+# Отставание реплики в секундах; 0, если она догнала основную базу или это не реплика
+REPLICA_LAG_QUERY = text(
+    'SELECT CASE WHEN pg_is_in_recovery() '
+    'AND pg_last_wal_receive_lsn() IS DISTINCT FROM pg_last_wal_replay_lsn() '
+    'THEN extract(epoch FROM now() - pg_last_xact_replay_timestamp()) ELSE 0 END'
+    )
+
+
+def is_connection_error(error: BaseException) -> bool:
+    """Ошибка соединения с базой, а не ошибка самого запроса."""
+    if isinstance(error, DBAPIError):
+        return error.connection_invalidated
+    return isinstance(error, (OSError, asyncio.TimeoutError))
+
+
+@dataclass
+class Replica:
+    url: str
+    engine: AsyncEngine
+    session_maker: async_sessionmaker
+    healthy: bool = False
+    lag: Optional[float] = None
+    failures: int = field(default=0)
+
+
+class ReplicaRouter:
+    """
+    Распределяет чтения по репликам по кругу, пропуская неисправные и отстающие.
+    Состояние реплик обновляет фоновая проверка раз в check_interval секунд;
+    до первой проверки и без исправных реплик чтения идут в основную базу.
+    """
+
+    def __init__(
+        self, urls: List[str], check_interval: float, check_timeout: float, max_lag: float
+            ):
+        self.replicas = []
+        for url in urls:
+            engine = create_async_engine(url=url, pool_pre_ping=True)
+            self.replicas.append(Replica(
+                url=url,
+                engine=engine,
+                session_maker=async_sessionmaker(engine, class_=AsyncSession)
+                ))
+        self._check_interval = check_interval
+        self._check_timeout = check_timeout
+        self._max_lag = max_lag
+        self._next = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def choose(self) -> Optional[Replica]:
+        """Следующая исправная реплика или None."""
+        for _ in range(len(self.replicas)):
+            replica = self.replicas[self._next % len(self.replicas)]
+            self._next += 1
+            if replica.healthy:
+                return replica
+        return None
+
+    def mark_unhealthy(self, replica: Replica, error: BaseException):
+        if replica.healthy:
+            logging.warning(f'Реплика {replica.engine.url!r} исключена из чтения: {error}')
+        replica.healthy = False
+        replica.failures += 1
+
+    async def check(self, replica: Replica):
+        """Проверяет доступность и отставание реплики."""
+        try:
+            async with replica.engine.connect() as connection:
+                lag = await asyncio.wait_for(
+                    connection.scalar(REPLICA_LAG_QUERY), self._check_timeout
+                    )
+        except Exception as e:
+            self.mark_unhealthy(replica, e)
+            return
+        replica.lag = None if lag is None else float(lag)
+        if replica.lag is None or replica.lag > self._max_lag:
+            self.mark_unhealthy(replica, f'отставание {replica.lag} с')
+            return
+        if not replica.healthy:
+            logging.info(f'Реплика {replica.engine.url!r} снова принимает чтения')
+        replica.healthy = True
+
+    async def check_all(self):
+        await asyncio.gather(*[self.check(replica) for replica in self.replicas])
+
+    async def _check_loop(self):
+        while True:
+            await asyncio.sleep(self._check_interval)
+            await self.check_all()
+
+    async def start(self):
+        if not self.replicas:
+            return
+        await self.check_all()
+        self._task = asyncio.create_task(self._check_loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        for replica in self.replicas:
+            await replica.engine.dispose()
+
+    def stats(self) -> list[dict]:
+        return [
+            {
+                'url': replica.engine.url.render_as_string(hide_password=True),
+                'healthy': replica.healthy,
+                'lag': replica.lag,
+                'failures': replica.failures,
+                }
+            for replica in self.replicas
+            ]
@@ -1,14 +1,30 @@
 import logging
+import time
+from contextlib import asynccontextmanager
+from fastapi import Request, Response
 from sqlalchemy.ext.asyncio import (
     async_sessionmaker, create_async_engine, AsyncSession
     )
 
 from app.core.config import settings
+from app.db.replicas import ReplicaRouter, is_connection_error
 
 
 engine = create_async_engine(url=settings.get_database_url())
 async_session_maker = async_sessionmaker(engine, class_=AsyncSession)
 
+replica_router = ReplicaRouter(
+    urls=settings.POSTGRES_REPLICA_URLS,
+    check_interval=settings.REPLICA_CHECK_INTERVAL,
+    check_timeout=settings.REPLICA_CHECK_TIMEOUT,
+    max_lag=settings.REPLICA_MAX_LAG
+    )
+
+# Cookie со временем (unix), до которого клиент читает с основной базы после своей записи
+READ_AFTER_WRITE_COOKIE = 'read_primary_until'
+# Заголовок, которым клиент явно запрашивает чтение с основной базы
+READ_PRIMARY_HEADER = 'X-Read-Primary'
+
 
 async def get_db_session():
     """Асинхронный контекстный менеджер для работы с сессией БД."""
@@ -19,4 +35,74 @@ async def get_db_session():
         except Exception as e:
             await session.rollback()
             logging.error(f"Database error: {str(e)}")
-            raise
\ No newline at end of file
+            raise
+
+
+def mark_read_after_write(response: Response):
+    """Следующие READ_AFTER_WRITE_SECONDS секунд чтения этого клиента идут в основную базу."""
+    response.set_cookie(
+        READ_AFTER_WRITE_COOKIE,
+        str(time.time() + settings.READ_AFTER_WRITE_SECONDS),
+        max_age=int(settings.READ_AFTER_WRITE_SECONDS) + 1,
+        httponly=True,
+        samesite='lax'
+        )
+
+
+def _reads_from_primary(request: Request) -> bool:
+    if request.headers.get(READ_PRIMARY_HEADER, '').lower() in ('1', 'true'):
+        return True
+    try:
+        return float(request.cookies.get(READ_AFTER_WRITE_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+async def get_read_db_session(request: Request):
+    """
+    Сессия только для чтения: с одной из исправных реплик или с основной базы,
+    если реплик нет, все они недоступны или клиент недавно писал сам (read-after-write).
+    Соединение с репликой открывается до передачи сессии: при ошибке запрос
+    сразу переключается на основную базу, а реплика исключается до следующей проверки.
+    """
+    replica = None if _reads_from_primary(request) else replica_router.choose()
+    session = None
+    if replica is not None:
+        session = replica.session_maker()
+        try:
+            await session.connection()
+        except Exception as e:
+            await session.close()
+            if not is_connection_error(e):
+                raise
+            replica_router.mark_unhealthy(replica, e)
+            session, replica = None, None
+    if session is None:
+        session = async_session_maker()
+
+    async with session:
+        try:
+            yield session
+        except Exception as e:
+            await session.rollback()
+            if replica is not None and is_connection_error(e):
+                replica_router.mark_unhealthy(replica, e)
+            logging.error(f"Database error: {str(e)}")
+            raise
+
+
+@asynccontextmanager
+async def session_scope():
+    """
+    Короткая транзакция вне жизненного цикла запроса.
+    Коммитит при успешном выходе, откатывает при ошибке и сразу возвращает соединение в пул.
+    """
+    async with async_session_maker() as session:
+        try:
+            yield session
+            await session.commit()
+        except Exception as e:
+            await session.rollback()
+            logging.error(f"Database error: {str(e)}")
+            raise
+
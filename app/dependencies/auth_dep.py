@@ -6,7 +6,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.dao.auth_dao import UsersDAO
 from app.auth.models import User
 from app.core.config import settings
-from app.db.session import get_db_session
+from app.db.session import get_db_session, get_read_db_session
 from app.exceptions import \
     TokenNoFound, NoJwtException, TokenExpiredException, NoUserIdException, \
           ForbiddenException, UserNotFoundException
@@ -57,7 +57,7 @@ async def check_refresh_token(
 
 async def get_current_user(
     token: str = Depends(get_access_token),
-    session: AsyncSession = Depends(get_db_session)
+    session: AsyncSession = Depends(get_read_db_session)
         ):
     """Проверяем access_token и возвращаем пользователя."""
     try:
@@ -0,0 +1,14 @@
+import httpx
+from fastapi import Request
+
+from app.services.lookup_workers import LookupWorkerPool
+
+
+def get_http_client(request: Request) -> httpx.AsyncClient:
+    """Возвращает общий HTTP-клиент, созданный при старте приложения."""
+    return request.app.state.http_client
+
+
+def get_lookup_pool(request: Request) -> LookupWorkerPool:
+    """Возвращает пул фоновых обработчиков запросов."""
+    return request.app.state.lookup_pool
@@ -1,7 +1,12 @@
-from pydantic import BaseModel, Field
+from typing import Optional
+from pydantic import BaseModel, Field, computed_field, field_serializer
 from datetime import datetime
 
 
+# Формат дат в ответах API
+DATETIME_FORMAT = '%Y-%m-%d %H:%M'
+
+
 class QueryCreate(BaseModel):
     cadastral_number: str = Field(..., description='Кадастровый номер')
     latitude: float = Field(..., description='Широта')
@@ -24,6 +29,10 @@ class QueryResponse(QueryCreate):
     longitude: float = Field(..., description='Долгота')
     create_ts: datetime = Field(..., description='Дата и время')
 
+    @field_serializer('create_ts', when_used='json')
+    def serialize_create_ts(self, value: datetime) -> str:
+        return value.strftime(DATETIME_FORMAT)
+
     class Config:
         from_attributes=True
         json_schema_extra = {
@@ -35,8 +44,21 @@ class QueryResponse(QueryCreate):
                 'create_ts': '2023-10-01 12:34',
             }
         }
-        json_encoders = {
-            datetime: lambda v: v.strftime('%Y-%m-%d %H:%M')
+
+
+class NearestQueryResponse(QueryResponse):
+    distance: float = Field(..., description='Расстояние до точки в метрах')
+
+    class Config:
+        from_attributes=True
+        json_schema_extra = {
+            'example': {
+                'cadastral_number': '1234567890123',
+                'latitude': 55.7558,
+                'longitude': 37.6173,
+                'create_ts': '2023-10-01 12:34',
+                'distance': 152.4,
+            }
         }
 
 
@@ -53,11 +75,41 @@ class ResultCreate(BaseModel):
         }
 
 
+class QueryAccepted(BaseModel):
+    query_id: int = Field(..., description='ID запроса, поставленного в очередь')
+
+    class Config:
+        json_schema_extra = {
+            'example': {
+                'query_id': 1,
+            }
+        }
+
+
+class QueryBatchItemResult(BaseModel):
+    query_id: Optional[int] = Field(None, description='ID сохраненного запроса')
+    history: Optional[bool] = Field(None, description='Результат запроса true/false')
+    error: Optional[str] = Field(None, description='Ошибка обработки элемента')
+
+    class Config:
+        json_schema_extra = {
+            'example': {
+                'query_id': 1,
+                'history': True,
+                'error': None,
+            }
+        }
+
+
 class ResultResponse(ResultCreate):
     id: int = Field(..., description='ID результата')
     history: bool = Field(..., description='Результат запроса true/false')
     create_ts: datetime = Field(..., description='Дата и время')
 
+    @field_serializer('create_ts', when_used='json')
+    def serialize_create_ts(self, value: datetime) -> str:
+        return value.strftime(DATETIME_FORMAT)
+
     class Config:
         from_attributes=True
         json_schema_extra = {
@@ -68,6 +120,54 @@ class ResultResponse(ResultCreate):
                 'created_at': '2023-10-01 12:35',
             }
         }
-        json_encoders = {
-            datetime: lambda v: v.strftime('%Y-%m-%d %H:%M')
-        }
\ No newline at end of file
+
+
+class CadastralSummaryResponse(BaseModel):
+    cadastral_number: str = Field(..., description='Кадастровый номер')
+    last_result: bool = Field(..., description='Последний результат true/false')
+    last_checked_ts: datetime = Field(..., description='Дата и время последней проверки')
+    total_count: int = Field(..., description='Количество проверок')
+    positive_count: int = Field(..., description='Количество положительных результатов')
+
+    @computed_field(description='Доля положительных результатов')
+    @property
+    def positive_share(self) -> float:
+        return self.positive_count / self.total_count if self.total_count else 0.0
+
+    @field_serializer('last_checked_ts', when_used='json')
+    def serialize_last_checked_ts(self, value: datetime) -> str:
+        return value.strftime(DATETIME_FORMAT)
+
+    class Config:
+        from_attributes=True
+        json_schema_extra = {
+            'example': {
+                'cadastral_number': '1234567890123',
+                'last_result': True,
+                'last_checked_ts': '2023-10-01 12:35',
+                'total_count': 4,
+                'positive_count': 3,
+                'positive_share': 0.75,
+            }
+        }
+
+
+class AnalyticsBucket(BaseModel):
+    bucket_start: datetime = Field(..., description='Начало интервала')
+    queries: int = Field(..., description='Количество запросов')
+    positive: int = Field(..., description='Количество положительных результатов')
+    negative: int = Field(..., description='Количество отрицательных результатов')
+
+    @field_serializer('bucket_start', when_used='json')
+    def serialize_bucket_start(self, value: datetime) -> str:
+        return value.strftime(DATETIME_FORMAT)
+
+    class Config:
+        json_schema_extra = {
+            'example': {
+                'bucket_start': '2023-10-01 12:00',
+                'queries': 42,
+                'positive': 30,
+                'negative': 10,
+            }
+        }
@@ -64,4 +64,72 @@ ForbiddenException = HTTPException(
 TokenInvalidFormatException = HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail='Неверный формат токена. Ожидается "Bearer <токен>"'
-        )
\ No newline at end of file
+        )
+
+# Очередь фоновой обработки переполнена
+LookupQueueFullException = HTTPException(
+    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+    detail='Очередь обработки запросов переполнена, повторите позже'
+        )
+
+
+# Ошибка базы данных при сохранении запроса
+DatabaseErrorException = HTTPException(
+    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+    detail='Ошибка базы данных'
+        )
+
+
+# Слишком много элементов в пакетном запросе
+BatchTooLargeException = HTTPException(
+    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+    detail='Слишком много элементов в пакетном запросе'
+        )
+
+
+# Сервис результатов временно отключен автоматическим выключателем
+ResultServiceUnavailableException = HTTPException(
+    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+    detail='Сервис результатов временно недоступен, повторите позже'
+        )
+
+# Превышен лимит одновременных обращений к сервису результатов
+LookupOverloadedException = HTTPException(
+    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+    detail='Слишком много одновременных запросов, повторите позже'
+        )
+
+
+# Истек бюджет времени, переданный клиентом в X-Request-Deadline-Ms
+DeadlineExceededException = HTTPException(
+    status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+    detail='Истек срок ожидания запроса'
+        )
+
+
+# Запрос по кадастровому номеру не найден
+QueryNotFoundException = HTTPException(
+    status_code=status.HTTP_404_NOT_FOUND,
+    detail='Запрос не найден'
+        )
+
+
+# Поврежденный курсор пагинации
+InvalidCursorException = HTTPException(
+    status_code=status.HTTP_400_BAD_REQUEST,
+    detail='Некорректный курсор пагинации'
+        )
+
+
+# Запрошено слишком много интервалов аналитики
+AnalyticsRangeTooLargeException = HTTPException(
+    status_code=status.HTTP_400_BAD_REQUEST,
+    detail='Слишком большой период для выбранного интервала'
+        )
+
+
+# Нижняя граница широты прямоугольника больше верхней
+InvalidBoundingBoxException = HTTPException(
+    status_code=status.HTTP_400_BAD_REQUEST,
+    detail='Некорректные границы прямоугольника'
+        )
@@ -1,13 +1,47 @@
+import asyncio
+from contextlib import asynccontextmanager
+from functools import partial
 from fastapi import FastAPI
 from sqladmin import Admin
 
-from app.db.session import engine
+from app.core.config import settings
+from app.core.http_client import create_http_client
+from app.db.session import engine, replica_router
 from app.auth.users_controller import router as auth_user_router
 from app.controller.query_endpoints_controller import router as query_endpoints_router
 from app.admin_panel import QueryAdmin, HistoryAdmin, UserAdmin, RoleAdmin
+from app.services.lookup_workers import LookupWorkerPool
+from app.services.query_endpoints_service import \
+    history_writer, process_query, requeue_pending_queries
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Создание общих ресурсов приложения при старте и их освобождение при остановке."""
+    http_client = create_http_client()
+    lookup_pool = LookupWorkerPool(
+        handler=partial(process_query, http_client),
+        workers=settings.LOOKUP_WORKERS,
+        queue_size=settings.LOOKUP_QUEUE_SIZE,
+        retry_base_delay=settings.LOOKUP_RETRY_BASE_DELAY,
+        retry_max_delay=settings.LOOKUP_RETRY_MAX_DELAY
+        )
+    app.state.http_client = http_client
+    app.state.lookup_pool = lookup_pool
+
+    await replica_router.start()
+    await lookup_pool.start()
+    requeue_task = asyncio.create_task(requeue_pending_queries(lookup_pool))
+    yield
+    requeue_task.cancel()
+    await lookup_pool.stop()
+    await history_writer.close()
+    await http_client.aclose()
+    await replica_router.stop()
 
 
 app = FastAPI(
+    lifespan=lifespan,
     title='Antipoff',
     description="""
     **Antipoff** — это веб-приложение для управления пользователями, ролями и запросами кадастровых номеров.
@@ -7,7 +7,7 @@ from alembic import context
 
 from app.db.database import BaseModel
 from app.core.config import settings
-from app.db.models.models import Query, History
+from app.db.models.models import CadastralSummary, Query, History
 from app.auth.models import User, Role
 
 config = context.config
@@ -0,0 +1,28 @@
+"""Keyset pagination indexes
+
+Revision ID: 5b2e9d4c7a10
+Revises: 3c7fa57e751f
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b2e9d4c7a10'
+down_revision: Union[str, None] = '3c7fa57e751f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_queries_create_ts_id', 'queries', ['create_ts', 'id'], unique=False)
+    op.create_index('ix_users_create_ts_id', 'users', ['create_ts', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_users_create_ts_id', table_name='users')
+    op.drop_index('ix_queries_create_ts_id', table_name='queries')
@@ -0,0 +1,32 @@
+"""Cadastral lookup indexes
+
+Revision ID: 8d41c2f0b7e3
+Revises: 5b2e9d4c7a10
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d41c2f0b7e3'
+down_revision: Union[str, None] = '5b2e9d4c7a10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Составной индекс покрывает и поиск только по cadastral_number (ведущая колонка)
+    op.create_index(
+        'ix_queries_cadastral_number_create_ts',
+        'queries',
+        ['cadastral_number', 'create_ts'],
+        unique=False
+        )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_queries_cadastral_number_create_ts', table_name='queries')
@@ -0,0 +1,118 @@
+"""Partition queries and histories by create_ts
+
+Revision ID: a9d3e6f1c207
+Revises: f6c3a8d1e475
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from datetime import date
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a9d3e6f1c207'
+down_revision: Union[str, None] = 'f6c3a8d1e475'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# На сколько месяцев вперед создаются партиции; дальше их ведет manage_partitions.py
+MONTHS_AHEAD = 3
+
+TABLE_INDEXES = {
+    'queries': {
+        'ix_queries_create_ts_id': ('create_ts', 'id'),
+        'ix_queries_cadastral_number_create_ts': ('cadastral_number', 'create_ts'),
+        'ix_queries_grid_cell': ('grid_cell',),
+        },
+    'histories': {
+        'ix_histories_query_id': ('query_id',),
+        'ix_histories_create_ts': ('create_ts',),
+        },
+    }
+
+
+def _add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _create_monthly_partitions(connection, table: str):
+    """Партиции по месяцам от самой старой строки до MONTHS_AHEAD месяцев вперед и DEFAULT."""
+    today = date.today().replace(day=1)
+    oldest = connection.execute(
+        sa.text(f"SELECT date_trunc('month', min(create_ts))::date FROM {table}_old")
+        ).scalar()
+    month, last = min(oldest or today, today), _add_months(today, MONTHS_AHEAD)
+    while month <= last:
+        upper = _add_months(month, 1)
+        op.execute(
+            f'CREATE TABLE {table}_p{month:%Y_%m} PARTITION OF {table} '
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{upper.isoformat()}')"
+            )
+        month = upper
+    op.execute(f'CREATE TABLE {table}_default PARTITION OF {table} DEFAULT')
+
+
+def upgrade() -> None:
+    # Первичный ключ секционированной таблицы обязан включать ключ секционирования,
+    # поэтому queries.id перестает быть уникальным для СУБД и внешний ключ
+    # histories.query_id -> queries.id удаляется; id по-прежнему выдает одна последовательность
+    op.drop_constraint('histories_query_id_fkey', 'histories', type_='foreignkey')
+    connection = op.get_bind()
+
+    for table, indexes in TABLE_INDEXES.items():
+        op.rename_table(table, f'{table}_old')
+        op.execute(f'ALTER TABLE {table}_old RENAME CONSTRAINT {table}_pkey TO {table}_old_pkey')
+        for name in indexes:
+            op.drop_index(name, table_name=f'{table}_old')
+
+        op.execute(
+            f'CREATE TABLE {table} (LIKE {table}_old INCLUDING DEFAULTS) '
+            'PARTITION BY RANGE (create_ts)'
+            )
+        op.execute(f'ALTER TABLE {table} ADD CONSTRAINT {table}_pkey PRIMARY KEY (id, create_ts)')
+        _create_monthly_partitions(connection, table)
+
+        op.execute(f'INSERT INTO {table} SELECT * FROM {table}_old')
+        for name, columns in indexes.items():
+            op.create_index(name, table, list(columns), unique=False)
+
+        op.execute(f'ALTER SEQUENCE {table}_id_seq OWNED BY {table}.id')
+        op.drop_table(f'{table}_old')
+
+    # Функции сетки остаются; триггер пересоздается на секционированной таблице (PostgreSQL 13+)
+    op.execute(
+        'CREATE TRIGGER queries_grid_cell BEFORE INSERT OR UPDATE OF latitude, longitude '
+        'ON queries FOR EACH ROW EXECUTE FUNCTION queries_set_grid_cell()'
+        )
+    op.execute('ANALYZE queries')
+    op.execute('ANALYZE histories')
+
+
+def downgrade() -> None:
+    for table, indexes in TABLE_INDEXES.items():
+        op.rename_table(table, f'{table}_old')
+        op.execute(f'ALTER TABLE {table}_old RENAME CONSTRAINT {table}_pkey TO {table}_old_pkey')
+        for name in indexes:
+            op.drop_index(name, table_name=f'{table}_old')
+
+        op.execute(f'CREATE TABLE {table} (LIKE {table}_old INCLUDING DEFAULTS)')
+        op.execute(f'ALTER TABLE {table} ADD CONSTRAINT {table}_pkey PRIMARY KEY (id)')
+        op.execute(f'INSERT INTO {table} SELECT * FROM {table}_old')
+        for name, columns in indexes.items():
+            op.create_index(name, table, list(columns), unique=False)
+
+        op.execute(f'ALTER SEQUENCE {table}_id_seq OWNED BY {table}.id')
+        # Партиции удаляются вместе с родительской таблицей, включая DEFAULT
+        op.drop_table(f'{table}_old')
+
+    op.execute(
+        'CREATE TRIGGER queries_grid_cell BEFORE INSERT OR UPDATE OF latitude, longitude '
+        'ON queries FOR EACH ROW EXECUTE FUNCTION queries_set_grid_cell()'
+        )
+    op.create_foreign_key(
+        'histories_query_id_fkey', 'histories', 'queries', ['query_id'], ['id']
+        )
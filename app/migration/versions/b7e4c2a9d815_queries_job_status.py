@@ -0,0 +1,36 @@
+"""Queries job status
+
+Revision ID: b7e4c2a9d815
+Revises: a9d3e6f1c207
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e4c2a9d815'
+down_revision: Union[str, None] = 'a9d3e6f1c207'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Существующие строки остаются без состояния: фоновые задачи до миграции нельзя
+    # отличить от синхронных запросов и загруженных ingest.py, повторно они не ставятся
+    op.add_column('queries', sa.Column('job_status', sa.String(length=10), nullable=True))
+    op.add_column('queries', sa.Column('job_claimed_ts', sa.DateTime(), nullable=True))
+    # Индекс покрывает только незавершенные задачи и остается маленьким
+    op.create_index(
+        'ix_queries_job_status_id', 'queries', ['id'], unique=False,
+        postgresql_where=sa.text("job_status IN ('pending', 'running')")
+        )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_queries_job_status_id', table_name='queries')
+    op.drop_column('queries', 'job_claimed_ts')
+    op.drop_column('queries', 'job_status')
@@ -0,0 +1,38 @@
+"""Cadastral summaries
+
+Revision ID: c4a7e19b2d56
+Revises: 8d41c2f0b7e3
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4a7e19b2d56'
+down_revision: Union[str, None] = '8d41c2f0b7e3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Таблица создается пустой, существующая история переносится скриптом rebuild_summary.py
+    op.create_table('cadastral_summaries',
+    sa.Column('cadastral_number', sa.String(length=14), nullable=False),
+    sa.Column('last_result', sa.Boolean(), nullable=False),
+    sa.Column('last_checked_ts', sa.DateTime(), nullable=False),
+    sa.Column('total_count', sa.Integer(), nullable=False),
+    sa.Column('positive_count', sa.Integer(), nullable=False),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('create_ts', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+    sa.Column('update_ts', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('cadastral_number')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('cadastral_summaries')
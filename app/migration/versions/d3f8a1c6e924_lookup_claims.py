@@ -0,0 +1,35 @@
+"""Lookup claims
+
+Revision ID: d3f8a1c6e924
+Revises: b7e4c2a9d815
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd3f8a1c6e924'
+down_revision: Union[str, None] = 'b7e4c2a9d815'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('lookup_claims',
+    sa.Column('cadastral_number', sa.String(length=14), nullable=False),
+    sa.Column('owner', sa.String(length=32), nullable=False),
+    sa.Column('claimed_ts', sa.DateTime(), nullable=False),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('create_ts', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+    sa.Column('update_ts', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('cadastral_number')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('lookup_claims')
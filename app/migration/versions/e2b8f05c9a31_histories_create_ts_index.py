@@ -0,0 +1,27 @@
+"""Histories create_ts index
+
+Revision ID: e2b8f05c9a31
+Revises: c4a7e19b2d56
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2b8f05c9a31'
+down_revision: Union[str, None] = 'c4a7e19b2d56'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Результаты группируются по времени записи для аналитики по интервалам
+    op.create_index('ix_histories_create_ts', 'histories', ['create_ts'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_histories_create_ts', table_name='histories')
@@ -0,0 +1,36 @@
+"""Ingest progress
+
+Revision ID: e5c9b3d7a412
+Revises: d3f8a1c6e924
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5c9b3d7a412'
+down_revision: Union[str, None] = 'd3f8a1c6e924'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('ingest_progress',
+    sa.Column('source', sa.String(length=255), nullable=False),
+    sa.Column('processed', sa.Integer(), nullable=False),
+    sa.Column('loaded', sa.Integer(), nullable=False),
+    sa.Column('rejected', sa.Integer(), nullable=False),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('create_ts', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+    sa.Column('update_ts', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('source')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('ingest_progress')
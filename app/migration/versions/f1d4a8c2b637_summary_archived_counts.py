@@ -0,0 +1,40 @@
+"""Summary archived counts
+
+Revision ID: f1d4a8c2b637
+Revises: e5c9b3d7a412
+Create Date: 2026-10-20 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f1d4a8c2b637'
+down_revision: Union[str, None] = 'e5c9b3d7a412'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Проверки, архивированные до миграции, в этих колонках не учтены:
+    # пересборка сводки сохранит только их и проверки, оставшиеся в базе
+    op.add_column('cadastral_summaries', sa.Column(
+        'archived_count', sa.Integer(), server_default=sa.text('0'), nullable=False
+        ))
+    op.add_column('cadastral_summaries', sa.Column(
+        'archived_positive_count', sa.Integer(), server_default=sa.text('0'), nullable=False
+        ))
+    op.add_column('cadastral_summaries', sa.Column('archived_last_result', sa.Boolean(), nullable=True))
+    op.add_column('cadastral_summaries', sa.Column(
+        'archived_last_checked_ts', sa.DateTime(), nullable=True
+        ))
+
+
+def downgrade() -> None:
+    op.drop_column('cadastral_summaries', 'archived_last_checked_ts')
+    op.drop_column('cadastral_summaries', 'archived_last_result')
+    op.drop_column('cadastral_summaries', 'archived_positive_count')
+    op.drop_column('cadastral_summaries', 'archived_count')
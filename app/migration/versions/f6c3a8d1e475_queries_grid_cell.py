@@ -0,0 +1,76 @@
+"""Queries grid cell
+
+Revision ID: f6c3a8d1e475
+Revises: e2b8f05c9a31
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f6c3a8d1e475'
+down_revision: Union[str, None] = 'e2b8f05c9a31'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BACKFILL_BATCH_SIZE = 50000
+
+# Сетка 0.01° x 0.01°, формула совпадает с app/dao/geo_grid.py
+GRID_CELL_FUNCTION = """
+CREATE OR REPLACE FUNCTION query_grid_cell(latitude double precision, longitude double precision)
+RETURNS bigint LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$
+    SELECT greatest(least(floor((latitude + 90) / 0.01), 17999), 0)::bigint * 36000
+        + greatest(least(floor((longitude + 180) / 0.01), 35999), 0)::bigint
+$$
+"""
+
+GRID_CELL_TRIGGER_FUNCTION = """
+CREATE OR REPLACE FUNCTION queries_set_grid_cell() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    NEW.grid_cell := query_grid_cell(NEW.latitude, NEW.longitude);
+    RETURN NEW;
+END
+$$
+"""
+
+
+def upgrade() -> None:
+    op.add_column('queries', sa.Column('grid_cell', sa.BigInteger(), nullable=True))
+    op.execute(GRID_CELL_FUNCTION)
+    op.execute(GRID_CELL_TRIGGER_FUNCTION)
+    op.execute(
+        'CREATE TRIGGER queries_grid_cell BEFORE INSERT OR UPDATE OF latitude, longitude '
+        'ON queries FOR EACH ROW EXECUTE FUNCTION queries_set_grid_cell()'
+        )
+
+    # Новые строки уже заполняет триггер; существующие заполняются пачками по id,
+    # каждая пачка в своей транзакции, индекс строится без блокировки записи
+    with op.get_context().autocommit_block():
+        connection = op.get_bind()
+        min_id, max_id = connection.execute(
+            sa.text('SELECT min(id), max(id) FROM queries')
+            ).one()
+        if min_id is not None:
+            for start in range(min_id, max_id + 1, BACKFILL_BATCH_SIZE):
+                connection.execute(
+                    sa.text(
+                        'UPDATE queries SET grid_cell = query_grid_cell(latitude, longitude) '
+                        'WHERE id >= :start AND id < :end AND grid_cell IS NULL'
+                        ),
+                    {'start': start, 'end': start + BACKFILL_BATCH_SIZE}
+                    )
+        op.execute(
+            'CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_queries_grid_cell ON queries (grid_cell)'
+            )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_queries_grid_cell', table_name='queries')
+    op.execute('DROP TRIGGER IF EXISTS queries_grid_cell ON queries')
+    op.execute('DROP FUNCTION IF EXISTS queries_set_grid_cell()')
+    op.execute('DROP FUNCTION IF EXISTS query_grid_cell(double precision, double precision)')
+    op.drop_column('queries', 'grid_cell')
@@ -0,0 +1,98 @@
+from datetime import datetime, timedelta
+from typing import Optional, Sequence
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.dao.query_endpoints_dao import HistoryDAO, QueryDAO
+from app.exceptions import AnalyticsRangeTooLargeException
+from app.services.result_cache import CacheState, TTLCache
+
+
+BUCKET_STEPS = {
+    'minute': timedelta(minutes=1),
+    'hour': timedelta(hours=1),
+    'day': timedelta(days=1),
+    }
+
+# Закрытый интервал больше не меняется, поэтому его счетчики хранятся без TTL
+bucket_cache = TTLCache(maxsize=settings.ANALYTICS_CACHE_SIZE, ttl=None)
+
+
+def truncate(value: datetime, bucket: str) -> datetime:
+    """Начало интервала, в который попадает value; совпадает с date_trunc в Postgres."""
+    value = value.replace(second=0, microsecond=0)
+    if bucket in ('hour', 'day'):
+        value = value.replace(minute=0)
+    if bucket == 'day':
+        value = value.replace(hour=0)
+    return value
+
+
+def _merge_ranges(starts: Sequence[datetime], step: timedelta) -> list[tuple]:
+    """Склеивает подряд идущие интервалы в полуинтервалы [start, end)."""
+    ranges = []
+    for start in starts:
+        if ranges and ranges[-1][1] == start:
+            ranges[-1] = (ranges[-1][0], start + step)
+        else:
+            ranges.append((start, start + step))
+    return ranges
+
+
+async def get_bucket_counts(
+    session: AsyncSession,
+    bucket: str,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    prefixes: Sequence[str] = ()
+        ) -> list[dict]:
+    """
+    Количество запросов и положительных/отрицательных результатов по интервалам времени.
+    Запросы учитываются по времени создания, результаты — по времени записи.
+    Закрытые интервалы берутся из кэша и никогда не пересчитываются,
+    в базе считаются только отсутствующие в кэше и еще открытые интервалы.
+    По умолчанию возвращает ANALYTICS_DEFAULT_BUCKETS последних интервалов.
+    """
+    step = BUCKET_STEPS[bucket]
+    now = await session.scalar(select(func.localtimestamp()))
+    if date_to is None:
+        date_to = now
+    if date_from is None:
+        date_from = truncate(date_to, bucket) - step * (settings.ANALYTICS_DEFAULT_BUCKETS - 1)
+
+    starts = []
+    start = truncate(date_from, bucket)
+    while start < date_to:
+        if len(starts) >= settings.ANALYTICS_MAX_BUCKETS:
+            raise AnalyticsRangeTooLargeException
+        starts.append(start)
+        start += step
+
+    prefixes = tuple(sorted(set(prefixes)))
+    closed_before = now - timedelta(seconds=settings.ANALYTICS_CLOSE_GRACE)
+    counts, missing = {}, []
+    for start in starts:
+        if start + step <= closed_before:
+            cached, state = bucket_cache.get((bucket, prefixes, start))
+            if state is not CacheState.MISS:
+                counts[start] = cached
+                continue
+        missing.append(start)
+
+    if missing:
+        ranges = _merge_ranges(missing, step)
+        queries = await QueryDAO.count_by_bucket(session, bucket, ranges, prefixes)
+        results = await HistoryDAO.count_results_by_bucket(session, bucket, ranges, prefixes)
+        for start in missing:
+            positive, negative = results.get(start, (0, 0))
+            counts[start] = {
+                'queries': queries.get(start, 0),
+                'positive': positive,
+                'negative': negative,
+                }
+            if start + step <= closed_before:
+                bucket_cache.set((bucket, prefixes, start), counts[start])
+
+    return [{'bucket_start': start, **counts[start]} for start in starts]
@@ -0,0 +1,19 @@
+import hashlib
+from typing import Optional
+
+
+def make_etag(*parts) -> str:
+    """Сильный ETag из метаданных выборки и параметров запроса."""
+    raw = '|'.join(str(part) for part in parts)
+    return '"' + hashlib.sha256(raw.encode()).hexdigest()[:32] + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Проверяет If-None-Match: список ETag через запятую или *, W/ игнорируется."""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate == '*' or candidate.removeprefix('W/') == etag:
+            return True
+    return False
@@ -0,0 +1,80 @@
+import csv
+import io
+import json
+from datetime import datetime
+from typing import AsyncIterator, Optional
+
+from app.core.config import settings
+from app.dao.query_endpoints_dao import HistoryDAO
+from app.db.session import session_scope
+
+
+EXPORT_COLUMNS = (
+    'query_id',
+    'cadastral_number',
+    'latitude',
+    'longitude',
+    'query_ts',
+    'history_id',
+    'history',
+    'history_ts',
+    )
+
+EXPORT_MEDIA_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+    }
+
+
+def _format_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat(sep=' ', timespec='seconds')
+    return value
+
+
+def _ndjson_chunk(rows) -> str:
+    return ''.join(
+        json.dumps(
+            {column: _format_value(value) for column, value in zip(EXPORT_COLUMNS, row)},
+            ensure_ascii=False
+            ) + '\n'
+        for row in rows
+        )
+
+
+def _csv_chunk(rows, header: bool) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(EXPORT_COLUMNS)
+    writer.writerows([_format_value(value) for value in row] for row in rows)
+    return buffer.getvalue()
+
+
+async def export_histories(
+    export_format: str,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    cadastral_number: Optional[str] = None
+        ) -> AsyncIterator[str]:
+    """
+    Потоковая выгрузка запросов с результатами в NDJSON или CSV.
+    Сессия открывается внутри генератора и живет, пока клиент читает ответ;
+    в памяти держится только текущая пачка строк.
+    """
+    header = export_format == 'csv'
+    async with session_scope() as session:
+        async for rows in HistoryDAO.stream_with_queries(
+            session=session,
+            chunk_size=settings.EXPORT_CHUNK_SIZE,
+            date_from=date_from,
+            date_to=date_to,
+            cadastral_number=cadastral_number
+                ):
+            if export_format == 'csv':
+                yield _csv_chunk(rows, header)
+                header = False
+            else:
+                yield _ndjson_chunk(rows)
+        if header:
+            yield _csv_chunk([], header)
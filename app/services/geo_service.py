@@ -0,0 +1,57 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.dao.geo_grid import bbox_ranges, covered_distance, square_ranges
+from app.dao.query_endpoints_dao import QueryDAO
+from app.exceptions import InvalidBoundingBoxException
+
+
+async def find_queries_in_bbox(
+    session: AsyncSession,
+    min_latitude: float,
+    max_latitude: float,
+    min_longitude: float,
+    max_longitude: float,
+    limit: int
+        ):
+    """
+    Возвращает запросы внутри прямоугольника координат в порядке создания.
+    min_longitude > max_longitude означает прямоугольник через антимеридиан.
+    """
+    if min_latitude > max_latitude:
+        raise InvalidBoundingBoxException
+    ranges = bbox_ranges(
+        min_latitude, max_latitude, min_longitude, max_longitude,
+        settings.GEO_MAX_CELL_RANGES
+        )
+    return await QueryDAO.find_in_bbox(
+        session,
+        ranges,
+        min_latitude=min_latitude,
+        max_latitude=max_latitude,
+        min_longitude=min_longitude,
+        max_longitude=max_longitude,
+        limit=limit
+        )
+
+
+async def find_nearest_queries(
+    session: AsyncSession, latitude: float, longitude: float, k: int
+        ) -> list[dict]:
+    """
+    Возвращает k ближайших к точке запросов с расстоянием в метрах.
+    Поиск идет в квадрате ячеек вокруг точки, квадрат расширяется вдвое,
+    пока k-й найденный запрос не окажется гарантированно ближе границы квадрата.
+    Дальше GEO_KNN_MAX_RADIUS_CELLS ячеек поиск не расширяется,
+    и для удаленных от всех запросов точек результатов может быть меньше k.
+    """
+    radius = 1
+    while True:
+        ranges = square_ranges(latitude, longitude, radius, settings.GEO_MAX_CELL_RANGES)
+        nearest = await QueryDAO.find_nearest(session, ranges, latitude, longitude, k)
+        if len(nearest) == k and nearest[-1].distance <= covered_distance(latitude, radius):
+            break
+        if radius >= settings.GEO_KNN_MAX_RADIUS_CELLS:
+            break
+        radius = min(radius * 2, settings.GEO_KNN_MAX_RADIUS_CELLS)
+    return [{**query.column_values(), 'distance': distance} for query, distance in nearest]
@@ -0,0 +1,59 @@
+import asyncio
+import math
+from collections import deque
+from typing import Any, Awaitable, Callable, Optional
+
+
+class LatencyTracker:
+    """Скользящее окно задержек успешных ответов для расчета перцентилей."""
+
+    def __init__(self, window_size: int, min_samples: int):
+        self._samples = deque(maxlen=window_size)
+        self._min_samples = min_samples
+
+    def record(self, duration: float):
+        self._samples.append(duration)
+
+    def percentile(self, percent: float) -> Optional[float]:
+        """Возвращает перцентиль задержки или None, пока данных недостаточно."""
+        if len(self._samples) < self._min_samples:
+            return None
+        ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, math.ceil(percent / 100 * len(ordered)) - 1)
+        return ordered[max(index, 0)]
+
+
+async def hedged_call(
+    call: Callable[[float], Awaitable[Any]],
+    timeout: float,
+    hedge_delay: Optional[float]
+        ) -> tuple[Any, bool]:
+    """
+    Выполняет call(timeout); если ответа нет через hedge_delay, отправляет второй такой же
+    запрос и берет первый успешный ответ, второй отменяется.
+    Возвращает: (результат, был ли отправлен дублирующий запрос).
+    """
+    if hedge_delay is None or hedge_delay >= timeout:
+        return await call(timeout), False
+
+    primary = asyncio.create_task(call(timeout))
+    pending = {primary}
+    try:
+        done, pending = await asyncio.wait(pending, timeout=hedge_delay)
+        if done:
+            return primary.result(), False
+
+        pending.add(asyncio.create_task(call(timeout - hedge_delay)))
+        error = None
+        while pending:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+                )
+            for task in done:
+                if task.exception() is None:
+                    return task.result(), True
+                error = task.exception()
+        raise error
+    finally:
+        for task in pending:
+            task.cancel()
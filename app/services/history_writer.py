@@ -0,0 +1,81 @@
+import asyncio
+from typing import Awaitable, Callable, List, Optional, Sequence, Set, Tuple
+
+
+class HistoryBatchWriter:
+    """
+    Объединяет записи результатов из одновременных корутин в пачки.
+    Строки копятся, пока их не станет max_batch или не пройдет flush_interval секунд
+    с первой строки пачки; затем пачка пишется одним вызовом write_batch
+    (многострочный INSERT ... RETURNING), и каждый вызывающий получает id своей строки.
+    Ошибка записи пачки поднимается у всех ее вызывающих.
+    """
+
+    def __init__(
+        self,
+        write_batch: Callable[[Sequence[tuple]], Awaitable[Sequence[int]]],
+        max_batch: int,
+        flush_interval: float
+            ):
+        self._write_batch = write_batch
+        self._max_batch = max_batch
+        self._flush_interval = flush_interval
+        self._pending: List[Tuple[tuple, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._flushes: Set[asyncio.Task] = set()
+        self.batches = 0
+        self.rows = 0
+
+    async def write(self, row: tuple) -> int:
+        """
+        Добавляет строку в текущую пачку и ждет ее записи.
+        Отмена ожидания не отменяет запись: строка уже стоит в пачке.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((row, future))
+        if len(self._pending) >= self._max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self._flush_interval, self._flush)
+        return await asyncio.shield(future)
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.create_task(self._write(batch))
+            self._flushes.add(task)
+            task.add_done_callback(self._flushes.discard)
+
+    async def _write(self, batch: List[Tuple[tuple, asyncio.Future]]):
+        try:
+            ids = await self._write_batch([row for row, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+                    # Ошибку, которую некому прочитать (ожидание отменено), не логируем повторно
+                    future.exception()
+            return
+        self.batches += 1
+        self.rows += len(batch)
+        for (_, future), row_id in zip(batch, ids):
+            if not future.done():
+                future.set_result(row_id)
+
+    async def close(self):
+        """Записывает накопленную пачку и дожидается всех начатых записей."""
+        self._flush()
+        if self._flushes:
+            await asyncio.gather(*self._flushes, return_exceptions=True)
+
+    def stats(self) -> dict:
+        return {
+            'batches': self.batches,
+            'rows': self.rows,
+            'pending': len(self._pending),
+            'flushing': len(self._flushes),
+            }
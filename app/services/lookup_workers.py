@@ -0,0 +1,114 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, List
+
+from app.exceptions import LookupQueueFullException
+
+
+class LookupWorkerPool:
+    """
+    Ограниченный пул фоновых обработчиков запросов к внешнему сервису.
+    Задачи (ID запросов) складываются в очередь фиксированного размера,
+    фиксированное число корутин забирает их и вызывает handler.
+    Задача, на которой handler упал, ставится в очередь повторно с экспоненциальной
+    задержкой от retry_base_delay до retry_max_delay секунд.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[int], Awaitable[None]],
+        workers: int,
+        queue_size: int,
+        retry_base_delay: float = 1,
+        retry_max_delay: float = 300
+            ):
+        self._handler = handler
+        self._workers_count = workers
+        self._queue_size = queue_size
+        self._retry_base_delay = retry_base_delay
+        self._retry_max_delay = retry_max_delay
+        self._queue: asyncio.Queue | None = None
+        self._tasks: List[asyncio.Task] = []
+        # Число неудачных попыток по задачам, ждущим повтора, и таймеры повторов
+        self._failures: Dict[int, int] = {}
+        self._retries: Dict[int, asyncio.TimerHandle] = {}
+
+    @property
+    def is_running(self) -> bool:
+        return bool(self._tasks)
+
+    async def start(self):
+        """Запускает обработчики. Очередь создается в текущем event loop."""
+        if self.is_running:
+            return
+        self._queue = asyncio.Queue(maxsize=self._queue_size)
+        self._tasks = [
+            asyncio.create_task(self._worker(), name=f'lookup-worker-{i}')
+            for i in range(self._workers_count)
+            ]
+        logging.info(f'Запущено фоновых обработчиков: {self._workers_count}')
+
+    async def stop(self):
+        """
+        Останавливает обработчики и отменяет запланированные повторы. Незавершенные задачи
+        не теряются: запросы без результата будут поставлены в очередь при следующем старте.
+        """
+        for retry in self._retries.values():
+            retry.cancel()
+        self._retries.clear()
+        self._failures.clear()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+
+    def submit(self, query_id: int):
+        """Ставит запрос в очередь без ожидания, при переполнении отдает 503."""
+        if not self.is_running:
+            raise LookupQueueFullException
+        try:
+            self._queue.put_nowait(query_id)
+        except asyncio.QueueFull:
+            raise LookupQueueFullException
+
+    async def put(self, query_id: int):
+        """Ставит запрос в очередь, дожидаясь свободного места."""
+        await self._queue.put(query_id)
+
+    async def _worker(self):
+        while True:
+            query_id = await self._queue.get()
+            try:
+                await self._handler(query_id)
+                self._failures.pop(query_id, None)
+            except Exception as e:
+                logging.error(f'Ошибка фоновой обработки запроса {query_id}: {e}')
+                self._schedule_retry(query_id)
+            finally:
+                self._queue.task_done()
+
+    def _schedule_retry(self, query_id: int):
+        failures = self._failures.get(query_id, 0) + 1
+        self._failures[query_id] = failures
+        self._call_later(
+            query_id, min(self._retry_max_delay, self._retry_base_delay * 2 ** min(failures - 1, 30))
+            )
+
+    def _call_later(self, query_id: int, delay: float):
+        previous = self._retries.pop(query_id, None)
+        if previous is not None:
+            previous.cancel()
+        self._retries[query_id] = asyncio.get_running_loop().call_later(
+            delay, self._resubmit, query_id, delay
+            )
+
+    def _resubmit(self, query_id: int, delay: float):
+        self._retries.pop(query_id, None)
+        if not self.is_running:
+            return
+        try:
+            self._queue.put_nowait(query_id)
+        except asyncio.QueueFull:
+            # Очередь занята новыми задачами: повтор откладывается еще на ту же задержку
+            self._call_later(query_id, delay)
@@ -1,61 +1,614 @@
+import asyncio
 import logging
+import time
+import uuid
+from functools import partial
+from typing import Optional
+
 import httpx
 from fastapi import HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import SQLAlchemyError
 
-from app.dao.query_endpoints_dao import QueryDAO, HistoryDAO
+from app.core.config import settings
+from app.db.models.models import JobStatus, validate_cadastral_number
+from app.exceptions import BatchTooLargeException, DatabaseErrorException, \
+    DeadlineExceededException, InvalidCursorException, QueryNotFoundException, \
+    LookupOverloadedException, ResultServiceUnavailableException
+from app.dao.history_archive import HistoryArchive
+from app.dao.query_endpoints_dao import CadastralSummaryDAO, LookupClaimDAO, QueryDAO, \
+    HistoryDAO
+from app.db.session import session_scope
+from app.services.etag import make_etag
+from app.services.hedging import LatencyTracker, hedged_call
+from app.services.history_writer import HistoryBatchWriter
+from app.services.lookup_workers import LookupWorkerPool
+from app.services.resilience import AIMDLimiter, CircuitBreaker, \
+    CircuitOpenError, ConcurrencyLimitError
+from app.services.result_broker import ResultBroker
+from app.services.result_cache import CacheState, TTLCache
+from app.services.single_flight import SingleFlight
+
+
+breaker = CircuitBreaker(
+    window_size=settings.BREAKER_WINDOW_SIZE,
+    min_calls=settings.BREAKER_MIN_CALLS,
+    failure_rate=settings.BREAKER_FAILURE_RATE,
+    slow_call_seconds=settings.BREAKER_SLOW_CALL_SECONDS,
+    slow_call_rate=settings.BREAKER_SLOW_CALL_RATE,
+    open_seconds=settings.BREAKER_OPEN_SECONDS,
+    half_open_calls=settings.BREAKER_HALF_OPEN_CALLS
+    )
+limiter = AIMDLimiter(
+    initial_limit=settings.LIMITER_INITIAL,
+    min_limit=settings.LIMITER_MIN,
+    max_limit=settings.LIMITER_MAX,
+    latency_target=settings.LIMITER_LATENCY_TARGET,
+    backoff=settings.LIMITER_BACKOFF
+    )
+
+
+latency_tracker = LatencyTracker(
+    window_size=settings.LATENCY_WINDOW_SIZE,
+    min_samples=settings.HEDGE_MIN_SAMPLES
+    )
+hedge_stats = {'hedged': 0}
+
+history_archive = HistoryArchive(
+    directory=settings.ARCHIVE_DIR,
+    prefix_length=settings.ARCHIVE_INDEX_PREFIX_LENGTH,
+    bloom_bits_per_key=settings.ARCHIVE_BLOOM_BITS_PER_KEY
+    )
+
 
+def deadline_from_ms(deadline_ms: Optional[int]) -> Optional[float]:
+    """Переводит оставшийся бюджет запроса в миллисекундах в абсолютный дедлайн (time.monotonic)."""
+    if deadline_ms is None:
+        return None
+    return time.monotonic() + deadline_ms / 1000
 
-async def add_query_in_bd(session: AsyncSession, query):
-    """Добавляет запрос в базу данных и получает результат из внешнего сервиса."""
+
+def _remaining_timeout(deadline: Optional[float]) -> float:
+    """Таймаут внешнего вызова: не больше настроенного и не больше остатка бюджета запроса."""
+    if deadline is None:
+        return settings.RESULT_SERVICE_TIMEOUT
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise DeadlineExceededException
+    return min(settings.RESULT_SERVICE_TIMEOUT, remaining)
+
+
+async def _within_deadline(awaitable, deadline: Optional[float]):
+    """Ожидает результат не дольше дедлайна, по истечении отвечает 504."""
+    if deadline is None:
+        return await awaitable
     try:
-        new_query = await QueryDAO.add(
-            session=session, **query.dict()
+        return await asyncio.wait_for(
+            awaitable, timeout=max(0, deadline - time.monotonic())
             )
-        try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    'http://localhost:5000/history', timeout=60
+    except asyncio.TimeoutError:
+        raise DeadlineExceededException
+
+
+def _hedge_delay() -> Optional[float]:
+    """Задержка перед дублирующим запросом: заданный перцентиль недавних задержек."""
+    if not settings.HEDGE_ENABLED:
+        return None
+    delay = latency_tracker.percentile(settings.HEDGE_PERCENTILE)
+    if delay is None:
+        return None
+    return max(settings.HEDGE_MIN_DELAY, delay)
+
+
+async def _request_history(client: httpx.AsyncClient, timeout: float) -> bool:
+    started = time.monotonic()
+    response = await client.get(settings.RESULT_SERVICE_URL, timeout=timeout)
+    response.raise_for_status()
+    result_data = response.json()
+    latency_tracker.record(time.monotonic() - started)
+    return result_data['history']
+
+
+async def fetch_history_result(
+    client: httpx.AsyncClient, deadline: Optional[float] = None
+        ) -> bool:
+    """
+    Получает результат проверки из внешнего сервиса.
+    Таймаут вызова ограничен оставшимся бюджетом запроса (deadline).
+    В режиме хеджирования при долгом ответе отправляется второй запрос, берется первый ответ.
+    При разомкнутом выключателе или исчерпанном лимите сразу отвечает 503, не дожидаясь таймаута.
+    """
+    timeout = _remaining_timeout(deadline)
+    try:
+        limiter.acquire()
+    except ConcurrencyLimitError:
+        raise LookupOverloadedException
+    try:
+        breaker.before_call()
+    except CircuitOpenError:
+        limiter.cancel()
+        raise ResultServiceUnavailableException
+
+    started = time.monotonic()
+    success = False
+    try:
+        history, hedged = await hedged_call(
+            partial(_request_history, client), timeout, _hedge_delay()
+            )
+        if hedged:
+            hedge_stats['hedged'] += 1
+        success = True
+        return history
+    except httpx.HTTPError as e:
+        logging.error(f'Ошибка при выполнении HTTP-запроса: {e}')
+        if deadline is not None and time.monotonic() >= deadline:
+            raise DeadlineExceededException
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail='Сервис недоступен'
+        )
+    finally:
+        duration = time.monotonic() - started
+        limiter.release(success, duration)
+        breaker.record(success, duration)
+
+
+async def save_query(query, **values) -> int:
+    """
+    Сохраняет запрос в отдельной короткой транзакции и возвращает его ID.
+    values: Дополнительные колонки запроса (например, job_status фоновой задачи).
+    """
+    async with session_scope() as session:
+        new_query = await QueryDAO.add(session=session, **query.model_dump(), **values)
+        return new_query.id
+
+
+async def _write_histories(rows) -> list:
+    """
+    Записывает пачку результатов (query_id, history) и обновляет сводку по кадастровым
+    номерам в одной короткой транзакции. У запроса не больше одного результата:
+    повторная запись пропускается и в сводке не учитывается.
+    Возвращает: ID результатов в порядке строк.
+    """
+    async with session_scope() as session:
+        written = await HistoryDAO.add_results(session=session, rows=rows)
+        await CadastralSummaryDAO.apply_histories(
+            session=session,
+            rows=[row for row, (_, inserted) in zip(rows, written) if inserted]
+            )
+    return [history_id for history_id, _ in written]
+
+
+history_writer = HistoryBatchWriter(
+    write_batch=_write_histories,
+    max_batch=settings.HISTORY_BATCH_MAX_ROWS,
+    flush_interval=settings.HISTORY_BATCH_INTERVAL
+    )
+
+
+async def save_history(query_id: int, history: bool) -> int:
+    """
+    Записывает результат проверки вместе с одновременными результатами других запросов
+    одной пачкой, после коммита оповещает подписчиков этого запроса.
+    Возвращает: ID записанного результата.
+    """
+    history_id = await history_writer.write((query_id, history))
+    result_broker.publish(query_id, {'query_id': query_id, 'history': history})
+    return history_id
+
+
+lookup_flight = SingleFlight()
+result_cache = TTLCache(
+    maxsize=settings.RESULT_CACHE_SIZE,
+    ttl=settings.RESULT_CACHE_TTL,
+    stale_ttl=settings.RESULT_CACHE_STALE_TTL
+    )
+_refresh_tasks = set()
+result_broker = ResultBroker()
+
+
+async def _wait_for_claim(cadastral_number: str, owner: str):
+    """
+    Берет номер на проверку или дожидается результата другого процесса, который его проверяет.
+    Каждая попытка — короткая транзакция раз в LOOKUP_CLAIM_POLL_INTERVAL секунд: соединение
+    между попытками возвращается в пул. Ожидание ограничено сроком записи владельца
+    (LOOKUP_CLAIM_LEASE), после которого номер перехватывается; дедлайн каждого
+    ожидающего запроса проверяет resolve_query.
+    Возвращает: (взят ли номер, результат другого процесса или None).
+    """
+    since = None
+    while True:
+        async with session_scope() as session:
+            claimed, claimed_ts = await LookupClaimDAO.try_claim(
+                session=session,
+                cadastral_number=cadastral_number,
+                owner=owner,
+                lease=settings.LOOKUP_CLAIM_LEASE
+                )
+            if since is None and not claimed:
+                since = claimed_ts
+            history = None
+            if since is not None:
+                # Результат владельца записан после того, как он взял номер
+                latest = await HistoryDAO.find_latest_by_cadastral_number(
+                    session=session, cadastral_number=cadastral_number, since=since
                     )
-                response.raise_for_status()
-                result_data = response.json()
-                history = result_data['history']
-        except httpx.HTTPError as e:
-            logging.error(f'Ошибка при выполнении HTTP-запроса: {e}')
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail='Сервис недоступен'
+                history = latest.history if latest else None
+        if history is not None or claimed:
+            return claimed, history
+        await asyncio.sleep(settings.LOOKUP_CLAIM_POLL_INTERVAL)
+
+
+async def _release_claim(cadastral_number: str, owner: str):
+    async with session_scope() as session:
+        await LookupClaimDAO.release(
+            session=session, cadastral_number=cadastral_number, owner=owner
             )
-        await HistoryDAO.add(
-            session=session, query_id=new_query.id, history=history
+
+
+async def _lookup_and_save(client: httpx.AsyncClient, cadastral_number: str, query_id: int) -> bool:
+    """
+    Получает результат для кадастрового номера и записывает его для query_id.
+    Если номер уже проверяется другим процессом, дожидается его и берет записанный им результат.
+    Вызов общий для всех ожидающих (SingleFlight), поэтому ограничен таймаутом сервиса
+    результатов, а не дедлайном запроса, который его начал.
+    """
+    if not settings.LOOKUP_CLAIMS:
+        history = await fetch_history_result(client)
+        await save_history(query_id, history)
+        return history
+
+    owner = uuid.uuid4().hex
+    claimed, history = await _wait_for_claim(cadastral_number, owner)
+    try:
+        if history is None:
+            history = await fetch_history_result(client)
+        await save_history(query_id, history)
+        return history
+    finally:
+        if claimed:
+            await _release_claim(cadastral_number, owner)
+
+
+async def _refresh_cached_result(client: httpx.AsyncClient, cadastral_number: str):
+    """Обновляет устаревшую запись кэша в фоне."""
+    try:
+        history, _ = await lookup_flight.do(
+            cadastral_number, partial(fetch_history_result, client)
+            )
+        result_cache.set(cadastral_number, history)
+    except Exception as e:
+        logging.error(f'Ошибка фонового обновления кэша для {cadastral_number}: {e}')
+
+
+def _schedule_refresh(client: httpx.AsyncClient, cadastral_number: str):
+    task = asyncio.create_task(_refresh_cached_result(client, cadastral_number))
+    _refresh_tasks.add(task)
+    task.add_done_callback(_refresh_tasks.discard)
+
+
+async def resolve_query(
+    client: httpx.AsyncClient,
+    cadastral_number: str,
+    query_id: int,
+    use_cache: bool = True,
+    deadline: Optional[float] = None
+        ) -> bool:
+    """
+    Получает и записывает результат для сохраненного запроса.
+    Свежий результат берется из кэша, устаревший отдается сразу и обновляется в фоне.
+    Одновременные запросы по одному кадастровому номеру разделяют один внешний вызов,
+    каждый из ожидающих ждет его не дольше своего дедлайна.
+    use_cache=False пропускает чтение из кэша, но обновляет его полученным результатом.
+    """
+    if use_cache:
+        history, state = result_cache.get(cadastral_number)
+        if state is CacheState.STALE:
+            _schedule_refresh(client, cadastral_number)
+        if state is not CacheState.MISS:
+            await save_history(query_id, history)
+            return history
+
+    history, shared = await _within_deadline(
+        lookup_flight.do(
+            cadastral_number,
+            partial(_lookup_and_save, client, cadastral_number, query_id)
+            ),
+        deadline
+        )
+    result_cache.set(cadastral_number, history)
+    if shared:
+        await save_history(query_id, history)
+    return history
+
+
+async def add_query_in_bd(
+    client: httpx.AsyncClient,
+    query,
+    use_cache: bool = True,
+    deadline: Optional[float] = None
+        ):
+    """
+    Добавляет запрос в базу данных и получает результат из внешнего сервиса.
+    Запрос и результат пишутся в двух коротких транзакциях: на время ожидания
+    внешнего сервиса соединение с базой возвращается в пул.
+    """
+    try:
+        query_id = await save_query(query)
+        history = await resolve_query(
+            client, query.cadastral_number, query_id,
+            use_cache=use_cache, deadline=deadline
             )
         return {'history': history}
 
     except SQLAlchemyError as e:
         logging.error(f'Ошибка при добавлении запроса в таблицу: {e}')
-        await session.rollback()
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail='Ошибка базы данных')
+        raise DatabaseErrorException
+
+
+async def add_queries_batch(
+    client: httpx.AsyncClient,
+    queries: list,
+    use_cache: bool = True,
+    deadline: Optional[float] = None
+        ) -> list[dict]:
+    """
+    Сохраняет пакет запросов одним INSERT и получает результаты с ограниченной параллельностью.
+    Возвращает результаты в порядке входных элементов, с ошибкой для каждого неудачного.
+    """
+    if len(queries) > settings.BATCH_MAX_ITEMS:
+        raise BatchTooLargeException
+
+    results = [None] * len(queries)
+    valid_indexes = []
+    for index, query in enumerate(queries):
+        try:
+            validate_cadastral_number(query.cadastral_number)
+            valid_indexes.append(index)
+        except ValueError as e:
+            results[index] = {'query_id': None, 'history': None, 'error': str(e)}
+
+    try:
+        async with session_scope() as session:
+            query_ids = await QueryDAO.add_many(
+                session=session,
+                rows=[queries[index].model_dump() for index in valid_indexes]
+                )
+    except SQLAlchemyError as e:
+        logging.error(f'Ошибка при пакетном добавлении запросов: {e}')
+        raise DatabaseErrorException
+
+    semaphore = asyncio.Semaphore(settings.BATCH_CONCURRENCY)
+
+    async def resolve_item(index: int, query_id: int):
+        async with semaphore:
+            try:
+                history = await resolve_query(
+                    client, queries[index].cadastral_number, query_id,
+                    use_cache=use_cache, deadline=deadline
+                    )
+                results[index] = {'query_id': query_id, 'history': history, 'error': None}
+            except HTTPException as e:
+                results[index] = {'query_id': query_id, 'history': None, 'error': e.detail}
+            except SQLAlchemyError as e:
+                logging.error(f'Ошибка при записи результата запроса {query_id}: {e}')
+                results[index] = {
+                    'query_id': query_id, 'history': None, 'error': 'Ошибка базы данных'
+                    }
+
+    await asyncio.gather(*[
+        resolve_item(index, query_id)
+        for index, query_id in zip(valid_indexes, query_ids)
+        ])
+    return results
+
+
+async def _finish_job(query_id: int, status: JobStatus):
+    async with session_scope() as session:
+        await QueryDAO.finish_job(session=session, query_id=query_id, status=status)
+
+
+async def process_query(client: httpx.AsyncClient, query_id: int):
+    """
+    Фоновая обработка: берет задачу в обработку, получает результат и записывает его.
+    Задачу, которую уже взял другой обработчик (в этом или другом процессе), пропускает.
+    При ошибке или отмене (остановка пула) задача сразу возвращается в ожидание,
+    не дожидаясь LOOKUP_JOB_LEASE: после ошибки ее с задержкой повторит LookupWorkerPool,
+    после остановки — requeue_pending_queries при следующем запуске.
+    """
+    async with session_scope() as session:
+        cadastral_number = await QueryDAO.claim_job(
+            session=session, query_id=query_id, lease=settings.LOOKUP_JOB_LEASE
+            )
+        if cadastral_number is None:
+            return
+        result = await HistoryDAO.find_result(session=session, query_id=query_id)
+    if result is None:
+        try:
+            await resolve_query(client, cadastral_number, query_id)
+        except BaseException:
+            await _finish_job(query_id, JobStatus.PENDING)
+            raise
+    await _finish_job(query_id, JobStatus.DONE)
+
+
+def get_lookup_stats() -> dict:
+    """
+    Возвращает счетчики объединения запросов, кэша, записи результатов пачками,
+    состояние выключателя и текущий лимит.
+    """
+    return {
+        'coalescing': lookup_flight.stats(),
+        'cache': result_cache.stats(),
+        'circuit_breaker': breaker.stats(),
+        'concurrency_limit': limiter.stats(),
+        'subscriptions': result_broker.stats(),
+        'history_writer': history_writer.stats(),
+        'hedging': {
+            'enabled': settings.HEDGE_ENABLED,
+            'delay': _hedge_delay(),
+            'hedged': hedge_stats['hedged'],
+            },
+        }
+
+
+async def enqueue_query(lookup_pool: LookupWorkerPool, query):
+    """
+    Сохраняет запрос и ставит его в очередь фоновой обработки.
+    Возвращает ID запроса, результат доступен через get_status_result.
+    """
+    try:
+        query_id = await save_query(query, job_status=JobStatus.PENDING.value)
+    except SQLAlchemyError as e:
+        logging.error(f'Ошибка при добавлении запроса в таблицу: {e}')
+        raise DatabaseErrorException
+    lookup_pool.submit(query_id)
+    return {'query_id': query_id}
+
+
+async def ensure_query_exists(query_id: int):
+    """Проверяет, что запрос с таким ID существует, иначе 404."""
+    async with session_scope() as session:
+        query = await QueryDAO.find_one_or_none_by_id(session, id=query_id)
+    if query is None:
+        raise QueryNotFoundException
+
+
+async def _find_result(query_id: int) -> Optional[dict]:
+    async with session_scope() as session:
+        result = await HistoryDAO.find_result(session, query_id=query_id)
+        if result is None:
+            return None
+        return {'query_id': query_id, 'history': result.history}
+
+
+async def wait_query_result(query_id: int):
+    """
+    Асинхронный генератор для push-уведомлений о результате запроса.
+    Отдает None каждые RESULT_STREAM_HEARTBEAT секунд ожидания и словарь с результатом в конце.
+    Результат приходит из ResultBroker; раз в RESULT_STREAM_RECHECK секунд он перепроверяется
+    в базе, чтобы не пропустить результат, записанный другим процессом.
+    По истечении RESULT_STREAM_TIMEOUT генератор завершается без результата.
+    """
+    future = result_broker.subscribe(query_id)
+    try:
+        result = await _find_result(query_id)
+        started = last_check = time.monotonic()
+        while result is None:
+            done, _ = await asyncio.wait(
+                {future}, timeout=settings.RESULT_STREAM_HEARTBEAT
+                )
+            if done:
+                result = future.result()
+                break
+            now = time.monotonic()
+            if now - started >= settings.RESULT_STREAM_TIMEOUT:
+                return
+            if now - last_check >= settings.RESULT_STREAM_RECHECK:
+                last_check = now
+                result = await _find_result(query_id)
+                if result is not None:
+                    break
+            yield None
+        yield result
+    finally:
+        result_broker.unsubscribe(query_id)
+
 
+async def requeue_pending_queries(lookup_pool: LookupWorkerPool):
+    """
+    Ставит в очередь фоновые задачи, оставшиеся необработанными после прошлого запуска.
+    ID читаются страницами по размеру очереди. Задачу могут поставить в очередь несколько
+    процессов, но обработает ее только взявший ее первым (process_query).
+    """
+    after_id, requeued = 0, 0
+    while True:
+        async with session_scope() as session:
+            job_ids = await QueryDAO.find_job_ids(
+                session=session,
+                after_id=after_id,
+                limit=settings.LOOKUP_QUEUE_SIZE,
+                lease=settings.LOOKUP_JOB_LEASE
+                )
+        if not job_ids:
+            break
+        for query_id in job_ids:
+            await lookup_pool.put(query_id)
+        after_id = job_ids[-1]
+        requeued += len(job_ids)
+    if requeued:
+        logging.info(f'Повторно поставлено в очередь запросов: {requeued}')
 
-async def find_all_histories(session: AsyncSession):
-    """Возвращает всю историю запросов."""
-    result_all = await QueryDAO.find_all(session=session)
-    if not result_all:
+
+async def all_histories_etag(
+    session: AsyncSession, limit: int, cursor: Optional[str] = None
+        ) -> Optional[str]:
+    """
+    ETag страницы истории запросов по метаданным ее строк, без их загрузки.
+    Учитывается и первая строка следующей страницы, от которой зависит X-Next-Cursor.
+    Возвращает None для пустой страницы.
+    """
+    try:
+        query = QueryDAO.page_query(limit + 1, cursor)
+    except ValueError:
+        raise InvalidCursorException
+    fingerprint = await QueryDAO.fingerprint(session=session, query=query)
+    if fingerprint is None:
+        return None
+    return make_etag('history/all', limit, cursor, *fingerprint)
+
+
+async def find_all_histories(
+    session: AsyncSession, limit: int, cursor: Optional[str] = None
+        ):
+    """
+    Возвращает страницу истории запросов и курсор следующей страницы.
+    404 отдается только для пустой первой страницы.
+    """
+    try:
+        result_page, next_cursor = await QueryDAO.find_page_rows(
+            session=session, limit=limit, columns=QueryDAO.LIST_COLUMNS, cursor=cursor
+            )
+    except ValueError:
+        raise InvalidCursorException
+    if not result_page and cursor is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail='История всех запросов не найдена'
         )
-    return result_all
+    return result_page, next_cursor
+
+
+async def detail_histories_etag(session: AsyncSession, cadastral_number: str) -> Optional[str]:
+    """ETag детальной истории по кадастровому номеру; None, если истории нет."""
+    fingerprint = await HistoryDAO.fingerprint(
+        session=session,
+        query=HistoryDAO.histories_by_cadastral_number_query(cadastral_number)
+        )
+    if fingerprint is None:
+        return None
+    return make_etag('history/detail', cadastral_number, *fingerprint)
 
 
 async def find_detail_histories(session: AsyncSession, cadastral_number: str):
-    """Возвращает детальную историю запросов по кадастровому номеру."""
+    """
+    Возвращает детальную историю запросов по кадастровому номеру.
+    Если в базе ее нет, ищет в архиве старой истории (archive_history.py).
+    """
     result_detail = await HistoryDAO.find_histories_by_cadastral_number(
         session=session, cadastral_number=cadastral_number
         )
+    if not result_detail:
+        archived = await asyncio.to_thread(history_archive.find_histories, cadastral_number)
+        result_detail = [
+            {
+                'id': record['history_id'],
+                'query_id': record['query_id'],
+                'history': record['history'],
+                'create_ts': record['history_ts'],
+                }
+            for record in archived
+            ]
     if not result_detail:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -64,11 +617,22 @@ async def find_detail_histories(session: AsyncSession, cadastral_number: str):
     return result_detail
 
 
+async def get_cadastral_summary(session: AsyncSession, cadastral_number: str):
+    """Возвращает сводку по кадастровому номеру одним чтением по уникальному ключу."""
+    summary = await CadastralSummaryDAO.find_one_or_none(
+        session=session, cadastral_number=cadastral_number
+        )
+    if not summary:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail='Сводка по кадастровому номеру не найдена'
+        )
+    return summary
+
+
 async def get_status_result(session: AsyncSession, query_id: int):
     """Возвращает статус результата по ID запроса."""
-    result_query_id = await HistoryDAO.find_one_or_none_by_id(
-        session=session, query_id=query_id
-        )
+    result_query_id = await HistoryDAO.find_result(session=session, query_id=query_id)
     if not result_query_id:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -0,0 +1,166 @@
+import time
+from collections import deque
+from enum import Enum
+
+
+class CircuitState(str, Enum):
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+
+class CircuitOpenError(Exception):
+    """Вызов отклонен: автоматический выключатель разомкнут."""
+
+
+class ConcurrencyLimitError(Exception):
+    """Вызов отклонен: достигнут текущий лимит одновременных запросов."""
+
+
+class CircuitBreaker:
+    """
+    Автоматический выключатель для внешнего сервиса.
+    Размыкается, когда в скользящем окне последних вызовов доля ошибок или медленных
+    ответов превышает порог. Через open_seconds пропускает несколько пробных вызовов
+    (half-open): при их успехе замыкается, при первой ошибке снова размыкается.
+    """
+
+    def __init__(
+        self,
+        window_size: int,
+        min_calls: int,
+        failure_rate: float,
+        slow_call_seconds: float,
+        slow_call_rate: float,
+        open_seconds: float,
+        half_open_calls: int
+            ):
+        self._window = deque(maxlen=window_size)
+        self._min_calls = min_calls
+        self._failure_rate = failure_rate
+        self._slow_call_seconds = slow_call_seconds
+        self._slow_call_rate = slow_call_rate
+        self._open_seconds = open_seconds
+        self._half_open_calls = half_open_calls
+        self._state = CircuitState.CLOSED
+        self._opened_at = 0.0
+        self._probes_started = 0
+        self._probes_succeeded = 0
+        self.rejected = 0
+
+    @property
+    def state(self) -> CircuitState:
+        if (
+            self._state is CircuitState.OPEN
+            and time.monotonic() - self._opened_at >= self._open_seconds
+        ):
+            self._state = CircuitState.HALF_OPEN
+            self._probes_started = 0
+            self._probes_succeeded = 0
+        return self._state
+
+    def before_call(self):
+        """Проверяет, можно ли выполнить вызов, иначе поднимает CircuitOpenError."""
+        state = self.state
+        if state is CircuitState.OPEN:
+            self.rejected += 1
+            raise CircuitOpenError
+        if state is CircuitState.HALF_OPEN:
+            if self._probes_started >= self._half_open_calls:
+                self.rejected += 1
+                raise CircuitOpenError
+            self._probes_started += 1
+
+    def record(self, success: bool, duration: float):
+        """Учитывает результат вызова, разрешенного before_call."""
+        slow = duration >= self._slow_call_seconds
+        if self._state is CircuitState.HALF_OPEN:
+            if not success or slow:
+                self._open()
+                return
+            self._probes_succeeded += 1
+            if self._probes_succeeded >= self._half_open_calls:
+                self._state = CircuitState.CLOSED
+                self._window.clear()
+            return
+
+        if self._state is not CircuitState.CLOSED:
+            return
+        self._window.append((success, slow))
+        if len(self._window) < self._min_calls:
+            return
+        failures = sum(1 for ok, _ in self._window if not ok)
+        slow_calls = sum(1 for _, is_slow in self._window if is_slow)
+        if (
+            failures / len(self._window) >= self._failure_rate
+            or slow_calls / len(self._window) >= self._slow_call_rate
+        ):
+            self._open()
+
+    def _open(self):
+        self._state = CircuitState.OPEN
+        self._opened_at = time.monotonic()
+        self._window.clear()
+
+    def stats(self) -> dict:
+        return {
+            'state': self.state.value,
+            'window_calls': len(self._window),
+            'window_failures': sum(1 for ok, _ in self._window if not ok),
+            'rejected': self.rejected,
+            }
+
+
+class AIMDLimiter:
+    """
+    Адаптивный лимит одновременных вызовов (additive increase / multiplicative decrease).
+    Быстрый успешный ответ увеличивает лимит примерно на единицу за «окно» из limit вызовов,
+    ошибка или ответ медленнее latency_target уменьшает лимит в backoff раз.
+    Вызовы сверх лимита не ждут в очереди, а сразу отклоняются.
+    """
+
+    def __init__(
+        self,
+        initial_limit: int,
+        min_limit: int,
+        max_limit: int,
+        latency_target: float,
+        backoff: float
+            ):
+        self._limit = float(initial_limit)
+        self._min_limit = min_limit
+        self._max_limit = max_limit
+        self._latency_target = latency_target
+        self._backoff = backoff
+        self.in_flight = 0
+        self.rejected = 0
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    def acquire(self):
+        """Занимает слот или поднимает ConcurrencyLimitError."""
+        if self.in_flight >= self.limit:
+            self.rejected += 1
+            raise ConcurrencyLimitError
+        self.in_flight += 1
+
+    def cancel(self):
+        """Освобождает слот, не выполнив вызов, без изменения лимита."""
+        self.in_flight -= 1
+
+    def release(self, success: bool, duration: float):
+        """Освобождает слот и корректирует лимит по результату вызова."""
+        self.in_flight -= 1
+        if success and duration < self._latency_target:
+            self._limit = min(self._max_limit, self._limit + 1 / self._limit)
+        else:
+            self._limit = max(self._min_limit, self._limit * self._backoff)
+
+    def stats(self) -> dict:
+        return {
+            'limit': self.limit,
+            'in_flight': self.in_flight,
+            'rejected': self.rejected,
+            }
@@ -0,0 +1,42 @@
+import asyncio
+from typing import Any, Dict
+
+
+class ResultBroker:
+    """
+    Pub/sub в памяти процесса для результатов запросов.
+    На каждый query_id заводится один Future, общий для всех подписчиков:
+    одна публикация будит всех, а ожидающий подписчик не держит ничего, кроме ссылки на Future.
+    """
+
+    def __init__(self):
+        self._futures: Dict[int, asyncio.Future] = {}
+        self._subscribers: Dict[int, int] = {}
+
+    def subscribe(self, query_id: int) -> asyncio.Future:
+        future = self._futures.get(query_id)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            self._futures[query_id] = future
+        self._subscribers[query_id] = self._subscribers.get(query_id, 0) + 1
+        return future
+
+    def unsubscribe(self, query_id: int):
+        count = self._subscribers.get(query_id, 0) - 1
+        if count > 0:
+            self._subscribers[query_id] = count
+            return
+        self._subscribers.pop(query_id, None)
+        self._futures.pop(query_id, None)
+
+    def publish(self, query_id: int, payload: Any):
+        """Отдает результат всем текущим подписчикам; без подписчиков ничего не делает."""
+        future = self._futures.pop(query_id, None)
+        if future is not None and not future.done():
+            future.set_result(payload)
+
+    def stats(self) -> dict:
+        return {
+            'topics': len(self._futures),
+            'subscribers': sum(self._subscribers.values()),
+            }
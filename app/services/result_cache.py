@@ -0,0 +1,67 @@
+import time
+from collections import OrderedDict
+from enum import Enum
+from typing import Any, Hashable, Optional, Tuple
+
+
+class CacheState(str, Enum):
+    FRESH = 'fresh'
+    STALE = 'stale'
+    MISS = 'miss'
+
+
+class TTLCache:
+    """
+    Ограниченный по размеру кэш в памяти процесса с TTL и вытеснением LRU.
+    После истечения ttl запись еще stale_ttl секунд отдается как устаревшая (stale-while-revalidate).
+    ttl=None — записи не устаревают и вытесняются только по LRU.
+    """
+
+    def __init__(self, maxsize: int, ttl: Optional[float], stale_ttl: float = 0):
+        self._maxsize = maxsize
+        self._ttl = ttl
+        self._stale_ttl = stale_ttl
+        self._data: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Tuple[Any, CacheState]:
+        """Возвращает (значение, состояние); для промаха значение None."""
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return None, CacheState.MISS
+
+        value, stored_at = entry
+        age = time.monotonic() - stored_at
+        if self._ttl is None or age <= self._ttl:
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value, CacheState.FRESH
+        if age <= self._ttl + self._stale_ttl:
+            self._data.move_to_end(key)
+            self.stale_hits += 1
+            return value, CacheState.STALE
+
+        del self._data[key]
+        self.misses += 1
+        return None, CacheState.MISS
+
+    def set(self, key: Hashable, value: Any):
+        self._data[key] = (value, time.monotonic())
+        self._data.move_to_end(key)
+        while len(self._data) > self._maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        return {
+            'size': len(self._data),
+            'maxsize': self._maxsize,
+            'hits': self.hits,
+            'stale_hits': self.stale_hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            }
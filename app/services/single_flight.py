@@ -0,0 +1,47 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+
+class SingleFlight:
+    """
+    Объединяет одновременные вызовы с одинаковым ключом в один.
+    Первый вызов (лидер) запускает работу в отдельной задаче, остальные ждут ее результат.
+    Отмена ожидающего запроса не отменяет общую задачу.
+    """
+
+    def __init__(self):
+        self._in_flight: Dict[str, asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+
+    async def do(
+        self, key: str, func: Callable[[], Awaitable[Any]]
+            ) -> Tuple[Any, bool]:
+        """
+        Выполняет func для ключа или присоединяется к уже идущему выполнению.
+        Возвращает: (результат, shared) — shared=True, если результат получен от чужого вызова.
+        """
+        task = self._in_flight.get(key)
+        if task is not None:
+            self.hits += 1
+            return await asyncio.shield(task), True
+
+        self.misses += 1
+        task = asyncio.create_task(func())
+        self._in_flight[key] = task
+        task.add_done_callback(lambda done: self._forget(key, done))
+        return await asyncio.shield(task), False
+
+    def _forget(self, key: str, task: asyncio.Task):
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        if not task.cancelled():
+            # Помечаем исключение прочитанным, даже если все ожидающие отменены
+            task.exception()
+
+    def stats(self) -> dict:
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'in_flight': len(self._in_flight),
+            }
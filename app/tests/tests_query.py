@@ -0,0 +1,708 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from itertools import count
+from types import SimpleNamespace
+from typing import List
+
+import pytest
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+from fastapi.testclient import TestClient
+from httpx import ASGITransport, AsyncClient
+from pydantic import TypeAdapter
+
+from app.controller import query_endpoints_controller
+from app.core.fast_json import ListSerializer
+from app.dao.geo_grid import GRID_COLUMNS, bbox_ranges, grid_cell
+from app.dao import history_archive
+from app.dao.history_archive import INDEX_FILE, HistoryArchive
+from app.dao.pagination import decode_cursor, encode_cursor
+from app.db.session import get_read_db_session
+from app.dto.query_endpoints_dto import DATETIME_FORMAT, NearestQueryResponse, \
+    QueryCreate, QueryResponse, ResultResponse
+from app.db.models.models import Query
+from app.main import app
+from app.services import analytics_service, export_service, query_endpoints_service
+from app.services.hedging import hedged_call
+from app.services.history_writer import HistoryBatchWriter
+from app.services.lookup_workers import LookupWorkerPool
+from app.services.resilience import AIMDLimiter, CircuitBreaker, \
+    CircuitOpenError, CircuitState, ConcurrencyLimitError
+from app.services.result_cache import CacheState, TTLCache
+from app.services.single_flight import SingleFlight
+
+
+class LimitedPool:
+    """Имитация пула соединений БД фиксированного размера."""
+
+    def __init__(self, size: int):
+        self._semaphore = asyncio.Semaphore(size)
+        self.in_use = 0
+        self.max_in_use = 0
+
+    @asynccontextmanager
+    async def session_scope(self):
+        async with self._semaphore:
+            self.in_use += 1
+            self.max_in_use = max(self.max_in_use, self.in_use)
+            try:
+                yield SimpleNamespace()
+            finally:
+                self.in_use -= 1
+
+
+async def fake_add_histories(session, rows):
+    return [(history_id, True) for history_id in range(1, len(rows) + 1)]
+
+
+async def fake_apply_histories(session, rows):
+    pass
+
+
+async def fake_try_claim(session, cadastral_number, owner, lease):
+    return True, None
+
+
+async def fake_release(session, cadastral_number, owner):
+    pass
+
+
+class SlowResultClient:
+    """Имитация внешнего сервиса: отвечает, только когда все запросы в полете."""
+
+    def __init__(self, expected: int):
+        self._expected = expected
+        self._all_in_flight = asyncio.Event()
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def get(self, url, timeout=None):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        if self.in_flight == self._expected:
+            self._all_in_flight.set()
+        await self._all_in_flight.wait()
+        self.in_flight -= 1
+        return SimpleNamespace(
+            raise_for_status=lambda: None, json=lambda: {'history': True}
+            )
+
+
+@pytest.mark.asyncio
+async def test_lookup_pool_processes_jobs():
+    """Тест для обработки запросов фоновым пулом."""
+    processed = []
+
+    async def handler(query_id: int):
+        processed.append(query_id)
+
+    pool = LookupWorkerPool(handler=handler, workers=2, queue_size=10)
+    await pool.start()
+    for query_id in range(5):
+        pool.submit(query_id)
+    await pool._queue.join()
+    await pool.stop()
+
+    assert sorted(processed) == [0, 1, 2, 3, 4]
+
+
+@pytest.mark.asyncio
+async def test_lookup_pool_retries_failed_jobs_with_backoff():
+    """Тест: упавшая задача повторяется с растущей задержкой, пока не выполнится."""
+    attempts = []
+
+    async def handler(query_id: int):
+        attempts.append(time.monotonic())
+        if len(attempts) < 3:
+            raise RuntimeError('Сервис результатов недоступен')
+
+    pool = LookupWorkerPool(
+        handler=handler, workers=1, queue_size=10, retry_base_delay=0.05, retry_max_delay=1
+        )
+    await pool.start()
+    pool.submit(1)
+    for _ in range(100):
+        if len(attempts) == 3:
+            break
+        await asyncio.sleep(0.01)
+    await pool.stop()
+
+    assert len(attempts) == 3
+    assert attempts[2] - attempts[1] > attempts[1] - attempts[0] >= 0.05
+
+
+@pytest.mark.asyncio
+async def test_cancelled_job_is_released(monkeypatch):
+    """Тест: задача, прерванная остановкой пула, сразу возвращается в ожидание."""
+    started = asyncio.Event()
+    finished = []
+
+    async def fake_claim_job(session, query_id, lease):
+        return '1234567890123'
+
+    async def fake_find_result(session, query_id):
+        return None
+
+    async def fake_resolve_query(client, cadastral_number, query_id):
+        started.set()
+        await asyncio.sleep(60)
+
+    async def fake_finish_job(query_id, status):
+        finished.append((query_id, status))
+
+    monkeypatch.setattr(query_endpoints_service, 'session_scope', LimitedPool(1).session_scope)
+    monkeypatch.setattr(query_endpoints_service.QueryDAO, 'claim_job', fake_claim_job)
+    monkeypatch.setattr(query_endpoints_service.HistoryDAO, 'find_result', fake_find_result)
+    monkeypatch.setattr(query_endpoints_service, 'resolve_query', fake_resolve_query)
+    monkeypatch.setattr(query_endpoints_service, '_finish_job', fake_finish_job)
+
+    task = asyncio.create_task(query_endpoints_service.process_query(None, 7))
+    await started.wait()
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    assert finished == [(7, query_endpoints_service.JobStatus.PENDING)]
+
+
+@pytest.mark.asyncio
+async def test_lookup_pool_rejects_when_full():
+    """Тест для отказа 503 при переполненной очереди."""
+    release = asyncio.Event()
+
+    async def handler(query_id: int):
+        await release.wait()
+
+    pool = LookupWorkerPool(handler=handler, workers=1, queue_size=1)
+    await pool.start()
+    pool.submit(1)
+    await asyncio.sleep(0)
+    pool.submit(2)
+
+    with pytest.raises(HTTPException) as exc_info:
+        pool.submit(3)
+    assert exc_info.value.status_code == 503
+
+    release.set()
+    await pool.stop()
+
+
+@pytest.mark.asyncio
+async def test_lookups_do_not_hold_db_connections(monkeypatch):
+    """Тест: число одновременных внешних запросов не ограничено размером пула БД."""
+    lookups, pool_size = 50, 2
+    pool = LimitedPool(pool_size)
+    client = SlowResultClient(expected=lookups)
+    ids = count(1)
+
+    async def fake_add_query(session, **values):
+        return SimpleNamespace(id=next(ids))
+
+    monkeypatch.setattr(query_endpoints_service, 'session_scope', pool.session_scope)
+    monkeypatch.setattr(query_endpoints_service.QueryDAO, 'add', fake_add_query)
+    monkeypatch.setattr(query_endpoints_service.LookupClaimDAO, 'try_claim', fake_try_claim)
+    monkeypatch.setattr(query_endpoints_service.LookupClaimDAO, 'release', fake_release)
+    monkeypatch.setattr(
+        query_endpoints_service.HistoryDAO, 'add_results', fake_add_histories
+        )
+    monkeypatch.setattr(
+        query_endpoints_service.CadastralSummaryDAO, 'apply_histories', fake_apply_histories
+        )
+
+    queries = [
+        QueryCreate(cadastral_number=str(1234567890000 + i), latitude=55.7, longitude=37.6)
+        for i in range(lookups)
+        ]
+    results = await asyncio.wait_for(
+        asyncio.gather(*[
+            query_endpoints_service.add_query_in_bd(client=client, query=query)
+            for query in queries
+            ]),
+        timeout=5
+        )
+
+    assert results == [{'history': True}] * lookups
+    assert client.max_in_flight == lookups
+    assert pool.max_in_use <= pool_size
+
+
+@pytest.mark.asyncio
+async def test_single_flight_coalesces_same_key():
+    """Тест: одновременные вызовы с одним ключом выполняют работу один раз."""
+    flight = SingleFlight()
+    calls = 0
+    release = asyncio.Event()
+
+    async def lookup():
+        nonlocal calls
+        calls += 1
+        await release.wait()
+        return True
+
+    waiters = [asyncio.create_task(flight.do('1234567890123', lookup)) for _ in range(10)]
+    await asyncio.sleep(0)
+    release.set()
+    results = await asyncio.gather(*waiters)
+
+    assert calls == 1
+    assert [shared for _, shared in results].count(False) == 1
+    assert flight.stats() == {'hits': 9, 'misses': 1, 'in_flight': 0}
+
+
+def test_result_cache_ttl_and_lru(monkeypatch):
+    """Тест для устаревания и вытеснения записей кэша результатов."""
+    now = 1000.0
+    monkeypatch.setattr('app.services.result_cache.time.monotonic', lambda: now)
+    cache = TTLCache(maxsize=2, ttl=10, stale_ttl=5)
+
+    cache.set('a', True)
+    cache.set('b', False)
+    assert cache.get('a') == (True, CacheState.FRESH)
+
+    cache.set('c', True)
+    assert cache.get('b') == (None, CacheState.MISS)
+
+    now += 12
+    assert cache.get('a') == (True, CacheState.STALE)
+    now += 10
+    assert cache.get('a') == (None, CacheState.MISS)
+    assert cache.stats()['evictions'] == 1
+
+
+@pytest.mark.asyncio
+async def test_batch_keeps_input_order_and_item_errors(monkeypatch):
+    """Тест для пакетного запроса: порядок результатов и ошибки по элементам."""
+    pool = LimitedPool(2)
+    client = SlowResultClient(expected=2)
+    inserted = []
+
+    async def fake_add_many(session, rows):
+        inserted.append(rows)
+        return [100 + i for i in range(len(rows))]
+
+    monkeypatch.setattr(query_endpoints_service, 'session_scope', pool.session_scope)
+    monkeypatch.setattr(query_endpoints_service.LookupClaimDAO, 'try_claim', fake_try_claim)
+    monkeypatch.setattr(query_endpoints_service.LookupClaimDAO, 'release', fake_release)
+    monkeypatch.setattr(
+        query_endpoints_service.QueryDAO, 'add_many', fake_add_many
+        )
+    monkeypatch.setattr(
+        query_endpoints_service.HistoryDAO, 'add_results', fake_add_histories
+        )
+    monkeypatch.setattr(
+        query_endpoints_service.CadastralSummaryDAO, 'apply_histories', fake_apply_histories
+        )
+
+    queries = [
+        QueryCreate(cadastral_number='2234567890001', latitude=55.7, longitude=37.6),
+        QueryCreate(cadastral_number='bad', latitude=55.7, longitude=37.6),
+        QueryCreate(cadastral_number='2234567890002', latitude=55.7, longitude=37.6),
+        ]
+    results = await query_endpoints_service.add_queries_batch(
+        client=client, queries=queries, use_cache=False
+        )
+
+    assert len(inserted) == 1 and len(inserted[0]) == 2
+    assert results[0] == {'query_id': 100, 'history': True, 'error': None}
+    assert results[1]['query_id'] is None and results[1]['error']
+    assert results[2] == {'query_id': 101, 'history': True, 'error': None}
+
+
+def test_circuit_breaker_opens_and_recovers(monkeypatch):
+    """Тест для размыкания выключателя и пробных вызовов в half-open."""
+    now = 1000.0
+    monkeypatch.setattr('app.services.resilience.time.monotonic', lambda: now)
+    breaker = CircuitBreaker(
+        window_size=10, min_calls=4, failure_rate=0.5, slow_call_seconds=5,
+        slow_call_rate=1.0, open_seconds=30, half_open_calls=2
+        )
+
+    for success in (True, False, True, False):
+        breaker.before_call()
+        breaker.record(success, duration=0.1)
+    assert breaker.state is CircuitState.OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    now += 31
+    assert breaker.state is CircuitState.HALF_OPEN
+    breaker.before_call()
+    breaker.before_call()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.record(True, duration=0.1)
+    breaker.record(True, duration=0.1)
+    assert breaker.state is CircuitState.CLOSED
+
+
+def test_aimd_limiter_sheds_and_adapts():
+    """Тест для отказа сверх лимита и уменьшения лимита при медленных ответах."""
+    limiter = AIMDLimiter(
+        initial_limit=2, min_limit=1, max_limit=10, latency_target=1, backoff=0.5
+        )
+    limiter.acquire()
+    limiter.acquire()
+    with pytest.raises(ConcurrencyLimitError):
+        limiter.acquire()
+
+    limiter.release(success=True, duration=5)
+    assert limiter.limit == 1
+    limiter.release(success=True, duration=0.1)
+    assert limiter.stats() == {'limit': 2, 'in_flight': 0, 'rejected': 1}
+
+
+@pytest.mark.asyncio
+async def test_hedged_call_takes_first_answer():
+    """Тест: при медленном первом ответе берется ответ дублирующего запроса."""
+    delays = iter([5.0, 0.01])
+    cancelled = []
+
+    async def call(timeout: float):
+        delay = next(delays)
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            cancelled.append(delay)
+            raise
+        return delay
+
+    result, hedged = await asyncio.wait_for(hedged_call(call, timeout=10, hedge_delay=0.05), 1)
+
+    assert (result, hedged) == (0.01, True)
+    await asyncio.sleep(0)
+    assert cancelled == [5.0]
+
+
+@pytest.mark.asyncio
+async def test_expired_deadline_fails_fast():
+    """Тест: при исчерпанном бюджете внешний сервис не вызывается, ответ 504."""
+    with pytest.raises(HTTPException) as exc_info:
+        await query_endpoints_service.fetch_history_result(
+            client=None, deadline=query_endpoints_service.deadline_from_ms(0)
+            )
+    assert exc_info.value.status_code == 504
+
+
+@pytest.mark.asyncio
+async def test_shared_lookup_is_not_bound_by_leader_deadline(monkeypatch):
+    """Тест: короткий дедлайн первого запроса не обрывает общий вызов для остальных."""
+    async def fake_fetch(client, deadline=None):
+        await asyncio.sleep(0.2)
+        return True
+
+    async def fake_wait_for_claim(cadastral_number, owner):
+        return True, None
+
+    async def fake_release_claim(cadastral_number, owner):
+        pass
+
+    async def fake_save_history(query_id, history):
+        return query_id
+
+    monkeypatch.setattr(query_endpoints_service, 'fetch_history_result', fake_fetch)
+    monkeypatch.setattr(query_endpoints_service, '_wait_for_claim', fake_wait_for_claim)
+    monkeypatch.setattr(query_endpoints_service, '_release_claim', fake_release_claim)
+    monkeypatch.setattr(query_endpoints_service, 'save_history', fake_save_history)
+
+    def resolve(query_id, deadline_ms):
+        return query_endpoints_service.resolve_query(
+            None, '5550000000001', query_id, use_cache=False,
+            deadline=query_endpoints_service.deadline_from_ms(deadline_ms)
+            )
+
+    leader, follower = await asyncio.gather(
+        resolve(1, 50), resolve(2, 2000), return_exceptions=True
+        )
+
+    assert isinstance(leader, HTTPException) and leader.status_code == 504
+    assert follower is True
+
+
+@pytest.mark.asyncio
+async def test_result_is_pushed_to_all_subscribers(monkeypatch):
+    """Тест: одна публикация результата доставляется всем подписчикам запроса."""
+    async def no_result_yet(query_id: int):
+        return None
+
+    monkeypatch.setattr(query_endpoints_service, '_find_result', no_result_yet)
+
+    async def first_event(query_id: int):
+        async for result in query_endpoints_service.wait_query_result(query_id):
+            if result is not None:
+                return result
+
+    subscribers = [asyncio.create_task(first_event(42)) for _ in range(100)]
+    await asyncio.sleep(0.01)
+    assert query_endpoints_service.result_broker.stats() == {'topics': 1, 'subscribers': 100}
+
+    query_endpoints_service.result_broker.publish(42, {'query_id': 42, 'history': True})
+    results = await asyncio.wait_for(asyncio.gather(*subscribers), 1)
+
+    assert results == [{'query_id': 42, 'history': True}] * 100
+    assert query_endpoints_service.result_broker.stats() == {'topics': 0, 'subscribers': 0}
+
+
+def test_websocket_disconnect_drops_subscription(monkeypatch):
+    """Тест: отключение клиента WebSocket сразу снимает подписку на результат."""
+    async def query_exists(query_id: int):
+        pass
+
+    async def no_result_yet(query_id: int):
+        return None
+
+    monkeypatch.setattr(query_endpoints_controller, 'ensure_query_exists', query_exists)
+    monkeypatch.setattr(query_endpoints_service, '_find_result', no_result_yet)
+    broker = query_endpoints_service.result_broker
+
+    def wait_for_subscribers(expected: int):
+        for _ in range(100):
+            if broker.stats()['subscribers'] == expected:
+                return
+            time.sleep(0.01)
+
+    with TestClient(app).websocket_connect('/query/43/ws') as websocket:
+        wait_for_subscribers(1)
+        assert broker.stats() == {'topics': 1, 'subscribers': 1}
+        websocket.close()
+        wait_for_subscribers(0)
+        assert broker.stats() == {'topics': 0, 'subscribers': 0}
+
+
+def test_pagination_cursor_round_trip():
+    """Тест для упаковки и распаковки курсора пагинации."""
+    key = (datetime(2025, 2, 14, 20, 24, 1, 222149), 1234)
+    assert decode_cursor(encode_cursor(*key)) == key
+    with pytest.raises(ValueError):
+        decode_cursor('not-a-cursor')
+
+
+def test_bbox_ranges_cover_points_and_cross_antimeridian():
+    """Тест для диапазонов ячеек: точки прямоугольника покрыты, антимеридиан разбивается."""
+    ranges = bbox_ranges(55.5, 55.52, 37.5, 37.52, max_ranges=100)
+    assert len(ranges) == 3
+    assert any(first <= grid_cell(55.51, 37.515) <= last for first, last in ranges)
+
+    wrapped = bbox_ranges(0.0, 0.0, 179.985, -179.985, max_ranges=100)
+    row_start = grid_cell(0.0, -180.0)
+    assert wrapped == [(row_start + GRID_COLUMNS - 2, row_start + GRID_COLUMNS - 1),
+                       (row_start, row_start + 1)]
+
+    assert bbox_ranges(-90, 90, -180, 180, max_ranges=100) == [(0, 18000 * GRID_COLUMNS - 1)]
+
+
+@pytest.mark.asyncio
+async def test_export_streams_csv_in_chunks(monkeypatch):
+    """Тест для потоковой выгрузки в CSV: заголовок один раз, строки по пачкам."""
+    row = (1, '1234567890123', 55.7, 37.6, datetime(2025, 1, 1, 12, 0), 7, True,
+           datetime(2025, 1, 1, 12, 1))
+
+    async def fake_stream(session, chunk_size, **filters):
+        yield [row]
+        yield [row]
+
+    monkeypatch.setattr(export_service, 'session_scope', LimitedPool(1).session_scope)
+    monkeypatch.setattr(export_service.HistoryDAO, 'stream_with_queries', fake_stream)
+
+    chunks = [chunk async for chunk in export_service.export_histories('csv')]
+
+    assert len(chunks) == 2
+    assert chunks[0].startswith('query_id,cadastral_number,')
+    assert chunks[1] == '1,1234567890123,55.7,37.6,2025-01-01 12:00:00,7,True,2025-01-01 12:01:00\r\n'
+
+
+@pytest.mark.asyncio
+async def test_analytics_does_not_recompute_closed_buckets(monkeypatch):
+    """Тест для аналитики: закрытые интервалы считаются в базе один раз."""
+    now = datetime(2025, 1, 1, 12, 30, 15)
+    requested_ranges = []
+
+    async def fake_count_queries(session, bucket, ranges, prefixes):
+        requested_ranges.append(ranges)
+        return {datetime(2025, 1, 1, 12, 28): 3, datetime(2025, 1, 1, 12, 30): 1}
+
+    async def fake_count_results(session, bucket, ranges, prefixes):
+        return {datetime(2025, 1, 1, 12, 28): (2, 1)}
+
+    async def fake_scalar(query):
+        return now
+
+    monkeypatch.setattr(analytics_service, 'bucket_cache', TTLCache(maxsize=100, ttl=None))
+    monkeypatch.setattr(analytics_service.QueryDAO, 'count_by_bucket', fake_count_queries)
+    monkeypatch.setattr(
+        analytics_service.HistoryDAO, 'count_results_by_bucket', fake_count_results
+        )
+    session = SimpleNamespace(scalar=fake_scalar)
+
+    for _ in range(2):
+        buckets = await analytics_service.get_bucket_counts(
+            session, 'minute', date_from=now - timedelta(minutes=3)
+            )
+
+    assert [bucket['queries'] for bucket in buckets] == [0, 3, 0, 1]
+    assert buckets[1] == {
+        'bucket_start': datetime(2025, 1, 1, 12, 28), 'queries': 3, 'positive': 2, 'negative': 1
+        }
+    # Первый вызов считает все интервалы одним диапазоном, второй — только открытый
+    assert requested_ranges == [
+        [(datetime(2025, 1, 1, 12, 27), datetime(2025, 1, 1, 12, 31))],
+        [(datetime(2025, 1, 1, 12, 30), datetime(2025, 1, 1, 12, 31))],
+        ]
+
+
+@pytest.mark.asyncio
+async def test_detail_history_not_modified_skips_loading(monkeypatch):
+    """Тест для ETag: совпавший If-None-Match дает 304, строки истории не загружаются."""
+    loads = []
+
+    async def fake_etag(session, cadastral_number):
+        return '"abc"'
+
+    async def fake_find(session, cadastral_number):
+        loads.append(cadastral_number)
+        return [{'id': 1, 'history': True, 'create_ts': datetime(2025, 1, 1, 12, 0)}]
+
+    async def fake_session():
+        yield SimpleNamespace()
+
+    monkeypatch.setattr(query_endpoints_controller, 'detail_histories_etag', fake_etag)
+    monkeypatch.setattr(query_endpoints_controller, 'find_detail_histories', fake_find)
+    monkeypatch.setitem(app.dependency_overrides, get_read_db_session, fake_session)
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url='http://test') as client:
+        url = '/history/detail?cadastral_number=1234567890123'
+        first = await client.get(url)
+        cached = await client.get(url, headers={'If-None-Match': 'W/"old", "abc"'})
+
+    assert first.status_code == 200
+    assert first.headers['ETag'] == '"abc"'
+    assert cached.status_code == 304
+    assert cached.headers['ETag'] == '"abc"'
+    assert cached.content == b''
+    assert loads == ['1234567890123']
+
+
+@pytest.mark.parametrize('dto', [QueryResponse, ResultResponse, NearestQueryResponse])
+def test_list_serializer_matches_response_model_bytes(dto):
+    """Тест для быстрой сериализации: вывод побайтно совпадает с response_model."""
+    create_ts = datetime(2025, 2, 14, 20, 24, 1, 222149)
+    latitudes = [55.7558, 1e-05, -0.0, 37.0, 1e16]
+    objects = [
+        {
+            'id': index, 'history': bool(index % 2), 'cadastral_number': '1234567890123',
+            'latitude': latitude, 'longitude': 37.6173, 'create_ts': create_ts,
+            'distance': 12.5 * index,
+            }
+        for index, latitude in enumerate(latitudes)
+        ]
+    objects.append({**objects[0], 'latitude': 55.1, 'cadastral_number': 'кадастр'})
+    if dto is QueryResponse:
+        objects = [
+            Query(**{key: obj[key] for key in ('id', 'latitude', 'longitude', 'create_ts')},
+                  cadastral_number='1234567890123')
+            for obj in objects
+            ]
+    adapter = TypeAdapter(List[dto])
+    expected = JSONResponse(
+        adapter.dump_python(adapter.validate_python(objects, from_attributes=True), mode='json')
+        ).body
+
+    serializer = ListSerializer(dto, DATETIME_FORMAT)
+    assert serializer.dumps(objects) == expected
+    assert serializer.dumps(objects[:1] + objects[-1:]) == JSONResponse(
+        adapter.dump_python(
+            adapter.validate_python(objects[:1] + objects[-1:], from_attributes=True),
+            mode='json'
+            )
+        ).body
+
+
+@pytest.mark.asyncio
+async def test_detail_history_falls_back_to_archive(monkeypatch, tmp_path):
+    """Тест: история, которой нет в базе, читается из архива без повторов."""
+    def archive_row(query_id, cadastral_number, history_id, minute):
+        ts = datetime(2025, 1, 1, 12, minute)
+        return (query_id, cadastral_number, 55.7, 37.6, ts, history_id, True, ts)
+
+    archive = HistoryArchive(str(tmp_path), prefix_length=9)
+    archive.write_segment([
+        archive_row(1, '1234567890123', 10, 1), archive_row(2, '1234567890124', 11, 2)
+        ])
+    archive.write_segment([
+        archive_row(1, '1234567890123', 10, 1), archive_row(3, '1234567890123', 12, 3)
+        ])
+    archive.write_segment([archive_row(4, '9999999999999', 13, 4)])
+    with open(tmp_path / INDEX_FILE, 'ab') as index:
+        index.write(b'{"segment": "segment-000004.jsonl.gz", "ro')
+
+    async def fake_find(session, cadastral_number):
+        return []
+
+    monkeypatch.setattr(query_endpoints_service, 'history_archive', archive)
+    monkeypatch.setattr(
+        query_endpoints_service.HistoryDAO, 'find_histories_by_cadastral_number', fake_find
+        )
+
+    histories = await query_endpoints_service.find_detail_histories(None, '1234567890123')
+
+    assert len(archive.segments()) == 3
+    assert [history['id'] for history in histories] == [10, 12]
+    assert histories[1]['create_ts'] == datetime(2025, 1, 1, 12, 3)
+    with pytest.raises(HTTPException):
+        await query_endpoints_service.find_detail_histories(None, '1234567890125')
+
+    # Следующий сегмент отрезает недописанную строку индекса и получает свое имя
+    archive.write_segment([archive_row(5, '1234567890123', 14, 5)])
+    names = [entry['segment'] for entry in archive.segments()]
+    assert len(set(names)) == 4
+    histories = await query_endpoints_service.find_detail_histories(None, '1234567890123')
+    assert [history['id'] for history in histories] == [10, 12, 14]
+
+
+def test_archive_misses_skip_segments_by_bloom_filter(monkeypatch, tmp_path):
+    """Тест: номер с тем же префиксом, которого нет в архиве, почти не распаковывает сегменты."""
+    ts = datetime(2025, 1, 1, 12, 0)
+    archive = HistoryArchive(str(tmp_path), prefix_length=9)
+    for segment in range(20):
+        archive.write_segment([
+            (number, str(1234567890000 + number), 55.7, 37.6, ts, number, True, ts)
+            for number in range(segment * 100, segment * 100 + 100)
+            ])
+    opened = []
+    real_open = history_archive.gzip.open
+    monkeypatch.setattr(
+        history_archive.gzip, 'open', lambda path, mode: opened.append(path) or real_open(path, mode)
+        )
+
+    for number in range(5000, 5100):
+        assert archive.find_histories(str(1234567890000 + number)) == []
+    # 100 промахов по 20 сегментам с тем же префиксом: без фильтра 2000 распаковок
+    assert len(opened) < 100
+
+    opened.clear()
+    assert [record['history_id'] for record in archive.find_histories('1234567891234')] == [1234]
+    assert len(opened) >= 1
+
+
+@pytest.mark.asyncio
+async def test_history_writer_batches_concurrent_writes():
+    """Тест: одновременные записи уходят одной пачкой, каждый получает свой id."""
+    batches = []
+
+    async def write_batch(rows):
+        batches.append(list(rows))
+        if any(query_id < 0 for query_id, _ in rows):
+            raise RuntimeError('insert failed')
+        return [query_id * 10 for query_id, _ in rows]
+
+    writer = HistoryBatchWriter(write_batch=write_batch, max_batch=3, flush_interval=0.01)
+
+    ids = await asyncio.gather(*[writer.write((query_id, True)) for query_id in range(1, 6)])
+    assert ids == [10, 20, 30, 40, 50]
+    assert [len(batch) for batch in batches] == [3, 2]
+
+    with pytest.raises(RuntimeError):
+        await asyncio.gather(writer.write((7, True)), writer.write((-1, False)))
+    await writer.close()
+    assert writer.stats() == {'batches': 2, 'rows': 5, 'pending': 0, 'flushing': 0}
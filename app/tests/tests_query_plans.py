@@ -0,0 +1,201 @@
+import json
+from datetime import datetime, timedelta
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import select, text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app.core.config import settings
+from app.core.fast_json import ListSerializer
+from app.dao.geo_grid import bbox_ranges, grid_cell, square_ranges
+from app.dao.pagination import encode_cursor
+from app.dao.query_endpoints_dao import HistoryDAO, QueryDAO
+from app.db.models.models import History, Query
+from app.dto.query_endpoints_dto import DATETIME_FORMAT, QueryResponse
+from app.services.geo_service import find_nearest_queries
+
+
+# Сколько запросов засеять и с какого размера таблицы Seq Scan считается регрессией
+SEED_ROWS = 20000
+SEED_CADASTRAL_NUMBERS = 2000
+SEQ_SCAN_ROW_THRESHOLD = 1000
+
+CADASTRAL_NUMBER = '1000000000042'
+NOW = datetime.now()
+
+HOT_QUERIES = {
+    'history_detail': lambda: HistoryDAO.histories_by_cadastral_number_query(CADASTRAL_NUMBER),
+    'latest_result': lambda: HistoryDAO.latest_by_cadastral_number_query(
+        CADASTRAL_NUMBER, NOW - timedelta(days=1)
+        ),
+    'status_by_query_id': lambda: select(History).filter_by(query_id=42),
+    'query_by_id': lambda: select(Query).filter_by(id=42),
+    'history_first_page': lambda: QueryDAO.page_query(101),
+    'history_first_page_rows': lambda: QueryDAO.page_query(101, columns=QueryDAO.LIST_COLUMNS),
+    'history_deep_page': lambda: QueryDAO.page_query(
+        101, encode_cursor(NOW - timedelta(days=10), 1)
+        ),
+    'export_by_cadastral_number': lambda: HistoryDAO.export_query(
+        cadastral_number=CADASTRAL_NUMBER
+        ),
+    'analytics_queries_by_hour': lambda: QueryDAO.count_by_bucket_query(
+        'hour', [(NOW - timedelta(hours=3), NOW)], ('10000000000',)
+        ),
+    'analytics_results_by_hour': lambda: HistoryDAO.count_results_by_bucket_query(
+        'hour', [(NOW - timedelta(hours=3), NOW)]
+        ),
+    'queries_in_bbox': lambda: QueryDAO.in_bbox_query(
+        bbox_ranges(55.5, 55.52, 37.5, 37.52, 1000),
+        min_latitude=55.5, max_latitude=55.52, min_longitude=37.5, max_longitude=37.52,
+        limit=100
+        ),
+    'nearest_queries': lambda: QueryDAO.nearest_query(
+        square_ranges(55.5, 37.5, 2, 1000), 55.5, 37.5, 10
+        ),
+    'export_by_period': lambda: HistoryDAO.export_query(
+        date_from=NOW - timedelta(hours=2), date_to=NOW - timedelta(hours=1)
+        ),
+    }
+
+# Запросы HistoryDAO с ограничением по времени: партиции histories вне периода
+# отсекаются планировщиком
+PRUNED_QUERIES = ('latest_result', 'analytics_results_by_hour', 'export_by_period')
+EXPIRED_MONTH = '2001_01'
+
+
+@pytest_asyncio.fixture
+async def seeded_connection():
+    """
+    Фикстура: соединение с засеянными и проанализированными таблицами.
+    Все данные пишутся в транзакции, которая откатывается после теста.
+    """
+    engine = create_async_engine(settings.get_database_url(), poolclass=NullPool)
+    try:
+        connection = await engine.connect()
+    except (OSError, SQLAlchemyError) as e:
+        await engine.dispose()
+        pytest.skip(f'База данных недоступна: {e}')
+
+    transaction = await connection.begin()
+    await connection.execute(
+        text(
+            'INSERT INTO queries (cadastral_number, latitude, longitude, create_ts) '
+            'SELECT (1000000000000 + g % :numbers)::text, 55 + random(), 37 + random(), '
+            "localtimestamp - g * interval '1 minute' "
+            'FROM generate_series(1, :rows) AS g'
+            ),
+        {'rows': SEED_ROWS, 'numbers': SEED_CADASTRAL_NUMBERS}
+        )
+    await connection.execute(
+        text('INSERT INTO histories (query_id, history) SELECT id, random() > 0.5 FROM queries')
+        )
+    await connection.execute(text('ANALYZE queries'))
+    await connection.execute(text('ANALYZE histories'))
+    try:
+        yield connection
+    finally:
+        await transaction.rollback()
+        await connection.close()
+        await engine.dispose()
+
+
+def seq_scanned_relations(plan: dict):
+    """Возвращает имена таблиц, которые план читает последовательным сканированием."""
+    if plan.get('Node Type') == 'Seq Scan':
+        yield plan['Relation Name']
+    for child in plan.get('Plans', []):
+        yield from seq_scanned_relations(child)
+
+
+def scanned_relations(plan: dict):
+    """Возвращает имена всех таблиц и партиций, которые читает план."""
+    if 'Relation Name' in plan:
+        yield plan['Relation Name']
+    for child in plan.get('Plans', []):
+        yield from scanned_relations(child)
+
+
+async def explain(connection, statement) -> dict:
+    sql = str(statement.compile(
+        dialect=connection.dialect, compile_kwargs={'literal_binds': True}
+        ))
+    result = await connection.execute(text(f'EXPLAIN (FORMAT JSON) {sql}'))
+    plan = result.scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0]['Plan']
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('name', HOT_QUERIES)
+async def test_hot_query_avoids_seq_scan(seeded_connection, name: str):
+    """Тест: горячие запросы DAO не читают большие таблицы последовательным сканированием."""
+    plan = await explain(seeded_connection, HOT_QUERIES[name]())
+
+    for relation in set(seq_scanned_relations(plan)):
+        rows = await seeded_connection.scalar(text(f'SELECT count(*) FROM {relation}'))
+        assert rows <= SEQ_SCAN_ROW_THRESHOLD, (
+            f'{name}: Seq Scan по {relation} ({rows} строк)\n{json.dumps(plan, indent=2)}'
+            )
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('name', PRUNED_QUERIES)
+async def test_time_bounded_query_prunes_partitions(seeded_connection, name: str):
+    """Тест: запросы истории за период не читают партиции histories за другие месяцы."""
+    expired = f'histories_p{EXPIRED_MONTH}'
+    await seeded_connection.execute(
+        text(
+            f'CREATE TABLE {expired} PARTITION OF histories '
+            "FOR VALUES FROM ('2001-01-01') TO ('2001-02-01')"
+            )
+        )
+
+    plan = await explain(seeded_connection, HOT_QUERIES[name]())
+    relations = set(scanned_relations(plan))
+
+    assert any(relation.startswith('histories_') for relation in relations), relations
+    assert expired not in relations, (
+        f'{name}: не отсечены партиции\n{json.dumps(plan, indent=2)}'
+        )
+
+
+@pytest.mark.asyncio
+async def test_nearest_queries_match_full_scan(seeded_connection):
+    """Тест: поиск ближайших по сетке совпадает с сортировкой всех запросов по расстоянию."""
+    cells = await seeded_connection.execute(
+        text('SELECT latitude, longitude, grid_cell FROM queries LIMIT 100')
+        )
+    for latitude, longitude, cell in cells:
+        assert cell == grid_cell(latitude, longitude)
+
+    session = AsyncSession(bind=seeded_connection)
+    nearest = await find_nearest_queries(session, latitude=55.5, longitude=37.5, k=20)
+    expected = await seeded_connection.execute(
+        text(
+            'SELECT id FROM queries ORDER BY '
+            '2 * 6371008.8 * asin(least(1.0, sqrt('
+            'power(sin(radians(latitude - 55.5) / 2), 2) '
+            '+ cos(radians(55.5)) * cos(radians(latitude)) '
+            '* power(sin(radians(longitude - 37.5) / 2), 2)))), id LIMIT 20'
+            )
+        )
+    assert [query['id'] for query in nearest] == expected.scalars().all()
+
+
+@pytest.mark.asyncio
+async def test_projected_page_matches_orm_page(seeded_connection):
+    """Тест: страницы из строк проекции дают тот же JSON и те же курсоры, что и ORM-объекты."""
+    session = AsyncSession(bind=seeded_connection)
+    serializer = ListSerializer(QueryResponse, DATETIME_FORMAT)
+    orm_cursor = rows_cursor = None
+    for _ in range(3):
+        objects, orm_cursor = await QueryDAO.find_page(session, limit=50, cursor=orm_cursor)
+        rows, rows_cursor = await QueryDAO.find_page_rows(
+            session, limit=50, columns=QueryDAO.LIST_COLUMNS, cursor=rows_cursor
+            )
+        assert serializer.dumps(rows) == serializer.dumps(objects)
+        assert rows_cursor == orm_cursor
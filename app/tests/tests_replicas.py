@@ -0,0 +1,66 @@
+import time
+
+import pytest
+import pytest_asyncio
+from starlette.requests import Request
+
+from app.core.config import settings
+from app.db import session as db_session
+from app.db.replicas import ReplicaRouter
+
+
+UNREACHABLE_URL = 'postgresql+asyncpg://u:p@127.0.0.1:1/d'
+
+
+@pytest_asyncio.fixture
+async def router():
+    """Фикстура: недоступная реплика и рабочая (основная база в роли реплики)."""
+    router = ReplicaRouter(
+        urls=[UNREACHABLE_URL, settings.get_database_url()],
+        check_interval=60,
+        check_timeout=2,
+        max_lag=10
+        )
+    await router.check_all()
+    if not router.replicas[1].healthy:
+        await router.stop()
+        pytest.skip('База данных недоступна')
+    try:
+        yield router
+    finally:
+        await router.stop()
+
+
+def make_request(cookies: dict) -> Request:
+    cookie = '; '.join(f'{key}={value}' for key, value in cookies.items())
+    return Request({'type': 'http', 'headers': [(b'cookie', cookie.encode())]})
+
+
+async def read_session_bind(request: Request):
+    sessions = db_session.get_read_db_session(request)
+    session = await sessions.__anext__()
+    bind = session.bind
+    await sessions.aclose()
+    return bind
+
+
+@pytest.mark.asyncio
+async def test_router_skips_unreachable_replica(router):
+    """Тест: недоступная реплика исключается, чтения идут на исправную."""
+    assert [replica.healthy for replica in router.replicas] == [False, True]
+    assert {router.choose().url for _ in range(4)} == {settings.get_database_url()}
+
+
+@pytest.mark.asyncio
+async def test_read_session_routes_by_read_after_write_cookie(router, monkeypatch):
+    """Тест: без cookie чтение идет на реплику, после своей записи — в основную базу."""
+    monkeypatch.setattr(db_session, 'replica_router', router)
+    replica_engine = router.replicas[1].engine
+
+    assert await read_session_bind(make_request({})) is replica_engine
+
+    recent_write = {db_session.READ_AFTER_WRITE_COOKIE: time.time() + 5}
+    assert await read_session_bind(make_request(recent_write)) is db_session.engine
+
+    expired_write = {db_session.READ_AFTER_WRITE_COOKIE: time.time() - 1}
+    assert await read_session_bind(make_request(expired_write)) is replica_engine
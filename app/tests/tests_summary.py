@@ -0,0 +1,252 @@
+from datetime import datetime
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app.core.config import settings
+from app.dao.query_endpoints_dao import CadastralSummaryDAO, HistoryDAO, LookupClaimDAO, \
+    QueryDAO
+from app.db.models.models import CadastralSummary, History, JobStatus
+
+
+RESULTS = {
+    '2000000000001': [True, False, True],
+    '2000000000002': [False],
+    '2000000000003': [True, True],
+    }
+
+
+@pytest_asyncio.fixture
+async def session():
+    """Фикстура: сессия в транзакции, которая откатывается после теста."""
+    engine = create_async_engine(settings.get_database_url(), poolclass=NullPool)
+    try:
+        connection = await engine.connect()
+    except (OSError, SQLAlchemyError) as e:
+        await engine.dispose()
+        pytest.skip(f'База данных недоступна: {e}')
+
+    transaction = await connection.begin()
+    try:
+        yield AsyncSession(bind=connection, expire_on_commit=False)
+    finally:
+        await transaction.rollback()
+        await connection.close()
+        await engine.dispose()
+
+
+async def read_summaries(session: AsyncSession) -> dict:
+    result = await session.execute(
+        select(CadastralSummary).where(CadastralSummary.cadastral_number.in_(RESULTS))
+        )
+    return {
+        summary.cadastral_number: (
+            summary.last_result, summary.total_count, summary.positive_count
+            )
+        for summary in result.scalars()
+        }
+
+
+@pytest.mark.asyncio
+async def test_incremental_summary_matches_rebuild(session):
+    """Тест: сводка, обновляемая при каждой записи результатов, совпадает с пересобранной."""
+    rows = []
+    for cadastral_number, histories in RESULTS.items():
+        for history in histories:
+            query = await QueryDAO.add(
+                session, cadastral_number=cadastral_number, latitude=55.0, longitude=37.0
+                )
+            rows.append((query.id, history))
+
+    # Пачки пишутся так же, как в history_writer; повторный результат запроса не учитывается
+    repeated = (rows[0][0], not rows[0][1])
+    for batch in (rows[:2], rows[2:] + [repeated]):
+        written = await HistoryDAO.add_results(session, batch)
+        await CadastralSummaryDAO.apply_histories(
+            session, [row for row, (_, inserted) in zip(batch, written) if inserted]
+            )
+
+    expected = {
+        cadastral_number: (histories[-1], len(histories), sum(histories))
+        for cadastral_number, histories in RESULTS.items()
+        }
+    assert await read_summaries(session) == expected
+
+    await session.execute(
+        CadastralSummary.__table__.update()
+        .where(CadastralSummary.cadastral_number.in_(RESULTS))
+        .values(total_count=0, positive_count=0)
+        )
+    last = None
+    while True:
+        last = await CadastralSummaryDAO.rebuild_batch(session, after=last, batch_size=2)
+        if last is None:
+            break
+    session.expire_all()
+    assert await read_summaries(session) == expected
+
+
+@pytest.mark.asyncio
+async def test_rebuild_keeps_archived_checks(session):
+    """Тест: пересборка сводки сохраняет проверки, перенесенные в архив."""
+    histories = {}
+    for cadastral_number, results in RESULTS.items():
+        query = await QueryDAO.add(
+            session, cadastral_number=cadastral_number, latitude=55.0, longitude=37.0
+            )
+        for history in results:
+            histories.setdefault(cadastral_number, []).append(
+                await HistoryDAO.add(session, query_id=query.id, history=history)
+                )
+            await CadastralSummaryDAO.apply_histories(session, [(query.id, history)])
+    expected = await read_summaries(session)
+
+    # Из первого номера архивируется часть проверок, второй номер архивируется целиком
+    numbers = list(RESULTS)
+    archived = [(numbers[0], row) for row in histories[numbers[0]][:2]] \
+        + [(numbers[1], row) for row in histories[numbers[1]]]
+    deleted = await HistoryDAO.delete_archived(
+        session,
+        query_ids={row.query_id for _, row in archived},
+        history_ids=[row.id for _, row in archived],
+        before=datetime(2100, 1, 1)
+        )
+    assert deleted == {row.id for _, row in archived}
+    await CadastralSummaryDAO.apply_archived(
+        session, [(number, row.history, row.create_ts) for number, row in archived]
+        )
+
+    last = None
+    while True:
+        last = await CadastralSummaryDAO.rebuild_batch(session, after=last, batch_size=2)
+        if last is None:
+            break
+    session.expire_all()
+    assert await read_summaries(session) == expected
+
+
+@pytest.mark.asyncio
+async def test_batched_summary_matches_per_row_updates(session):
+    """Тест: сводка по пачке результатов совпадает со сводкой по результатам по одному."""
+    query_ids = {}
+    for cadastral_number in RESULTS:
+        query = await QueryDAO.add(
+            session, cadastral_number=cadastral_number, latitude=55.0, longitude=37.0
+            )
+        query_ids[cadastral_number] = query.id
+
+    # Результаты разных номеров перемешаны, порядок внутри номера сохранен
+    interleaved = sorted(
+        (
+            (position, query_ids[cadastral_number], history)
+            for cadastral_number, histories in RESULTS.items()
+            for position, history in enumerate(histories)
+            ),
+        key=lambda row: row[0]
+        )
+    first, *rest = [(query_id, history) for _, query_id, history in interleaved]
+    await CadastralSummaryDAO.apply_histories(session, [first])
+    await CadastralSummaryDAO.apply_histories(session, rest)
+
+    assert await read_summaries(session) == {
+        cadastral_number: (histories[-1], len(histories), sum(histories))
+        for cadastral_number, histories in RESULTS.items()
+        }
+
+
+@pytest.mark.asyncio
+async def test_upsert_many_inserts_updates_and_merges_duplicates(session):
+    """Тест: upsert_many вставляет новые строки, обновляет существующие и склеивает повторы."""
+    def summary(cadastral_number, total_count):
+        return {
+            'cadastral_number': cadastral_number, 'last_result': True,
+            'last_checked_ts': datetime(2025, 1, 1), 'total_count': total_count,
+            'positive_count': 0,
+            }
+
+    numbers = list(RESULTS)
+    inserted = await CadastralSummaryDAO.upsert_many(
+        session, [summary(numbers[0], 1), summary(numbers[1], 1)],
+        conflict_cols=['cadastral_number'], update_cols=['total_count']
+        )
+    upserted = await CadastralSummaryDAO.upsert_many(
+        session,
+        [summary(numbers[1], 5), summary(numbers[2], 1), summary(numbers[1], 7)],
+        conflict_cols=['cadastral_number'], update_cols=['total_count'], chunk_size=1
+        )
+
+    assert upserted == [inserted[1], upserted[1], inserted[1]]
+    assert upserted[1] not in inserted
+    assert {number: total for number, (_, total, _) in (await read_summaries(session)).items()} \
+        == {numbers[0]: 1, numbers[1]: 7, numbers[2]: 1}
+
+
+@pytest.mark.asyncio
+async def test_update_runs_in_caller_transaction(session):
+    """Тест: update пишет в уже открытой транзакции вызывающего кода и не коммитит ее."""
+    query = await QueryDAO.add(
+        session, cadastral_number=list(RESULTS)[0], latitude=55.0, longitude=37.0
+        )
+
+    updated = await QueryDAO.update(session, {'id': query.id}, latitude=56.0)
+
+    assert updated == 1
+    assert query.latitude == 56.0
+    assert session.in_transaction()
+
+
+@pytest.mark.asyncio
+async def test_results_are_written_once_and_jobs_claimed_once(session):
+    """Тест: повторный результат запроса не пишется, фоновую задачу берет один обработчик."""
+    numbers = list(RESULTS)
+    job = await QueryDAO.add(
+        session, cadastral_number=numbers[0], latitude=55.0, longitude=37.0,
+        job_status=JobStatus.PENDING.value
+        )
+    plain = await QueryDAO.add(
+        session, cadastral_number=numbers[1], latitude=55.0, longitude=37.0
+        )
+
+    job_ids = await QueryDAO.find_job_ids(session, after_id=job.id - 1, limit=10, lease=60)
+    assert job_ids == [job.id]
+    assert await QueryDAO.claim_job(session, query_id=job.id, lease=60) == numbers[0]
+    assert await QueryDAO.claim_job(session, query_id=job.id, lease=60) is None
+    assert await QueryDAO.claim_job(session, query_id=plain.id, lease=60) is None
+    assert await QueryDAO.find_job_ids(session, after_id=job.id - 1, limit=10, lease=60) == []
+
+    first = await HistoryDAO.add_results(
+        session, [(job.id, True), (plain.id, False), (job.id, False)]
+        )
+    again = await HistoryDAO.add_results(session, [(plain.id, True)])
+
+    assert [inserted for _, inserted in first] == [True, True, False]
+    assert first[2][0] == first[0][0]
+    assert again == [(first[1][0], False)]
+    result = await session.execute(
+        select(History.query_id, History.history)
+        .where(History.query_id.in_([job.id, plain.id]))
+        .order_by(History.query_id)
+        )
+    assert result.all() == [(job.id, True), (plain.id, False)]
+
+
+@pytest.mark.asyncio
+async def test_lookup_claim_is_exclusive_until_released_or_expired(session):
+    """Тест: номер проверяет один владелец, пока не снимет запись или не истечет ее срок."""
+    number = list(RESULTS)[0]
+
+    claimed, claimed_ts = await LookupClaimDAO.try_claim(session, number, 'first', lease=60)
+    assert claimed
+    assert await LookupClaimDAO.try_claim(session, number, 'second', lease=60) == \
+        (False, claimed_ts)
+
+    await LookupClaimDAO.release(session, number, 'second')
+    assert not (await LookupClaimDAO.try_claim(session, number, 'second', lease=60))[0]
+    assert (await LookupClaimDAO.try_claim(session, number, 'second', lease=-1))[0]
+
+    await LookupClaimDAO.release(session, number, 'second')
+    assert (await LookupClaimDAO.try_claim(session, number, 'third', lease=60))[0]
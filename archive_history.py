@@ -0,0 +1,82 @@
+import argparse
+import asyncio
+import logging
+from datetime import timedelta
+
+from sqlalchemy import func, select
+
+from app.core.config import settings
+from app.dao.history_archive import HistoryArchive
+from app.dao.query_endpoints_dao import CadastralSummaryDAO, HistoryDAO
+from app.db.session import engine, session_scope
+
+
+logging.basicConfig(
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    level=logging.INFO
+)
+logger = logging.getLogger(__name__)
+
+
+async def archive_history(older_than_days: int, chunk_size: int):
+    """
+    Переносит запросы старше older_than_days дней вместе с результатами в архив
+    (settings.ARCHIVE_DIR) и удаляет их из базы.
+    Каждые chunk_size запросов пишутся отдельным сегментом, удаляются в своей транзакции
+    и только после записи сегмента на диск. Сбой между записью и удалением приводит
+    лишь к повторной архивации тех же строк, при чтении архива они отдаются один раз.
+    Сводка cadastral_summaries по-прежнему учитывает архивные проверки: в транзакции
+    удаления их итоги добавляются в колонки archived_*, которые сохраняет пересборка сводки.
+    """
+    archive = HistoryArchive(
+        settings.ARCHIVE_DIR,
+        settings.ARCHIVE_INDEX_PREFIX_LENGTH,
+        settings.ARCHIVE_BLOOM_BITS_PER_KEY
+        )
+    segments, archived = 0, 0
+    try:
+        async with session_scope() as session:
+            now = await session.scalar(select(func.localtimestamp()))
+        before = now - timedelta(days=older_than_days)
+
+        while True:
+            async with session_scope() as session:
+                rows = await HistoryDAO.find_archive_batch(
+                    session=session, before=before, limit=chunk_size
+                    )
+                if not rows:
+                    break
+                segment = await asyncio.to_thread(archive.write_segment, rows)
+                deleted = await HistoryDAO.delete_archived(
+                    session=session,
+                    query_ids={row.query_id for row in rows},
+                    history_ids=[row.history_id for row in rows if row.history_id is not None],
+                    before=before
+                    )
+                await CadastralSummaryDAO.apply_archived(
+                    session=session,
+                    rows=[
+                        (row.cadastral_number, row.history, row.history_ts)
+                        for row in rows if row.history_id in deleted
+                        ]
+                    )
+            segments += 1
+            archived += len(rows)
+            logger.info(f'Сегмент {segment}: {len(rows)} строк')
+    finally:
+        await engine.dispose()
+    logger.info(f'Архивировано строк: {archived}, сегментов: {segments}, граница: {before}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Архивация старой истории запросов')
+    parser.add_argument(
+        '--older-than-days', type=int, default=settings.ARCHIVE_AFTER_DAYS,
+        help='Архивировать запросы старше этого числа дней'
+        )
+    parser.add_argument(
+        '--chunk-size', type=int, default=settings.ARCHIVE_CHUNK_SIZE,
+        help='Количество запросов в одном сегменте и одной транзакции'
+        )
+    args = parser.parse_args()
+    asyncio.run(archive_history(args.older_than_days, args.chunk_size))
@@ -0,0 +1,98 @@
+"""
+Вставка запросов в базу: прежние BaseDAO.add (flush + refresh) и add_many (ORM-объекты,
+add_all + flush) против новых add (один INSERT ... RETURNING) и add_many (Core-вставка
+пачками). Нужна запущенная база с миграциями; все вставки откатываются.
+
+    python -m benchmarks.bench_add_many --rows 100000 --single-rows 1000
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app.core.config import settings
+from app.dao.query_endpoints_dao import QueryDAO
+from app.db.models.models import Query
+
+
+def make_rows(count: int) -> list[dict]:
+    return [
+        {
+            'cadastral_number': str(1000000000000 + index),
+            'latitude': 55 + random.random(),
+            'longitude': 37 + random.random(),
+            }
+        for index in range(count)
+        ]
+
+
+async def add_with_refresh(session: AsyncSession, rows: list[dict]):
+    """Прежний BaseDAO.add: flush и повторное чтение строки на каждую запись."""
+    for values in rows:
+        instance = Query(**values)
+        session.add(instance)
+        await session.flush()
+        await session.refresh(instance)
+
+
+async def add_with_returning(session: AsyncSession, rows: list[dict]):
+    for values in rows:
+        await QueryDAO.add(session, **values)
+
+
+async def add_many_orm(session: AsyncSession, rows: list[dict]):
+    """Прежний BaseDAO.add_many: ORM-объект на каждую строку, add_all и flush."""
+    instances = [Query(**values) for values in rows]
+    session.add_all(instances)
+    await session.flush()
+    return [instance.id for instance in instances]
+
+
+async def add_many_core(session: AsyncSession, rows: list[dict]):
+    return await QueryDAO.add_many(session, rows)
+
+
+async def measure(engine, func, rows: list[dict]) -> float:
+    """Время вставки в транзакции, которая затем откатывается."""
+    async with engine.connect() as connection:
+        transaction = await connection.begin()
+        session = AsyncSession(bind=connection)
+        started = time.perf_counter()
+        await func(session, rows)
+        elapsed = time.perf_counter() - started
+        await session.close()
+        await transaction.rollback()
+    return elapsed
+
+
+async def main(args):
+    engine = create_async_engine(settings.get_database_url(), poolclass=NullPool)
+    cases = [
+        ('add: flush + refresh', add_with_refresh, make_rows(args.single_rows)),
+        ('add: INSERT ... RETURNING', add_with_returning, make_rows(args.single_rows)),
+        ('add_many: ORM add_all', add_many_orm, make_rows(args.rows)),
+        ('add_many: Core пачками', add_many_core, make_rows(args.rows)),
+        ]
+    try:
+        for index in range(0, len(cases), 2):
+            (slow_name, slow, slow_rows), (fast_name, fast, fast_rows) = cases[index:index + 2]
+            slow_time = await measure(engine, slow, slow_rows)
+            fast_time = await measure(engine, fast, fast_rows)
+            slow_rate, fast_rate = len(slow_rows) / slow_time, len(fast_rows) / fast_time
+            print(f'{slow_name:28} {len(slow_rows):7} строк {slow_rate:9.0f} строк/с')
+            print(
+                f'{fast_name:28} {len(fast_rows):7} строк {fast_rate:9.0f} строк/с'
+                f'  (x{fast_rate / slow_rate:.1f})'
+                )
+    finally:
+        await engine.dispose()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--single-rows', type=int, default=1000)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,68 @@
+"""
+Сравнение пакетного POST /query/batch с одиночными POST /query на запущенном приложении.
+
+    python -m benchmarks.bench_batch --base-url http://127.0.0.1:5000 --items 1000
+"""
+import argparse
+import asyncio
+import random
+import time
+
+import httpx
+
+
+def make_items(count: int) -> list[dict]:
+    """Генерирует уникальные кадастровые номера, чтобы не попадать в кэш результатов."""
+    prefix = random.randint(10, 99)
+    return [
+        {
+            'cadastral_number': f'{prefix}{i:011d}',
+            'latitude': 55.7558,
+            'longitude': 37.6173,
+        }
+        for i in range(count)
+    ]
+
+
+async def run_single(client: httpx.AsyncClient, items: list[dict], concurrency: int) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def post(item: dict):
+        async with semaphore:
+            response = await client.post('/query', json=item)
+            response.raise_for_status()
+
+    started = time.perf_counter()
+    await asyncio.gather(*[post(item) for item in items])
+    return time.perf_counter() - started
+
+
+async def run_batch(client: httpx.AsyncClient, items: list[dict], batch_size: int) -> float:
+    started = time.perf_counter()
+    for offset in range(0, len(items), batch_size):
+        response = await client.post('/query/batch', json=items[offset:offset + batch_size])
+        response.raise_for_status()
+    return time.perf_counter() - started
+
+
+async def main(args):
+    headers = {'Cache-Control': 'no-cache'}
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(
+        base_url=args.base_url, headers=headers, limits=limits, timeout=None
+            ) as client:
+        single = await run_single(client, make_items(args.items), args.concurrency)
+        batch = await run_batch(client, make_items(args.items), args.batch_size)
+
+    print(f'{args.items} одиночных запросов: {single:.2f} c, {args.items / single:.1f} запросов/с')
+    print(f'{args.items} в пакетах по {args.batch_size}: {batch:.2f} c, {args.items / batch:.1f} запросов/с')
+    print(f'Ускорение: x{single / batch:.2f}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--base-url', default='http://127.0.0.1:5000')
+    parser.add_argument('--items', type=int, default=1000)
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--concurrency', type=int, default=50)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,75 @@
+"""
+p50/p99 задержки fetch_history_result с хеджированием и без, на локальной заглушке /history.
+
+Заглушка отвечает быстро, но с «тяжелым хвостом»: доля ответов задерживается в десятки раз,
+как у реального сервиса результатов. Запускается без сети и базы данных:
+
+    python -m benchmarks.bench_hedging --requests 2000
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+import httpx
+from fastapi import FastAPI
+
+from app.services import query_endpoints_service as service
+
+
+def make_stub(fast: float, slow: float, slow_share: float) -> FastAPI:
+    stub = FastAPI()
+
+    @stub.get('/history')
+    async def history():
+        delay = slow if random.random() < slow_share else fast * random.uniform(0.5, 1.5)
+        await asyncio.sleep(delay)
+        return {'history': True}
+
+    return stub
+
+
+def percentile(samples: list[float], percent: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * percent / 100))]
+
+
+async def run(requests: int, concurrency: int, hedge: bool, args) -> list[float]:
+    service.settings.HEDGE_ENABLED = hedge
+    service.settings.RESULT_SERVICE_URL = 'http://stub/history'
+    service.latency_tracker._samples.clear()
+    transport = httpx.ASGITransport(app=make_stub(args.fast, args.slow, args.slow_share))
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async with httpx.AsyncClient(transport=transport) as client:
+        async def one():
+            async with semaphore:
+                started = time.perf_counter()
+                await service.fetch_history_result(client)
+                latencies.append(time.perf_counter() - started)
+
+        await asyncio.gather(*[one() for _ in range(requests)])
+    return latencies
+
+
+async def main(args):
+    for hedge in (False, True):
+        latencies = await run(args.requests, args.concurrency, hedge, args)
+        mode = 'с хеджированием' if hedge else 'без хеджирования'
+        print(
+            f'{mode:>17}: p50={statistics.median(latencies) * 1000:.0f} мс, '
+            f'p99={percentile(latencies, 99) * 1000:.0f} мс, '
+            f'дублирующих запросов: {service.hedge_stats["hedged"]}'
+            )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=20)
+    parser.add_argument('--fast', type=float, default=0.02, help='обычная задержка, с')
+    parser.add_argument('--slow', type=float, default=1.0, help='задержка хвоста, с')
+    parser.add_argument('--slow-share', type=float, default=0.03, help='доля медленных ответов')
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,85 @@
+"""
+Чтение списка запросов: ORM-объекты (find_all, identity map сессии) против строк проекции
+(find_all_rows по QueryDAO.LIST_COLUMNS) вместе с сериализацией в JSON ответа.
+Память — пик tracemalloc за чтение и сериализацию, пропускная способность — строк в секунду.
+Нужна запущенная база с миграциями; засеянные строки откатываются.
+
+    python -m benchmarks.bench_projection --rows 100000
+"""
+import argparse
+import asyncio
+import gc
+import time
+import tracemalloc
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app.core.config import settings
+from app.core.fast_json import ListSerializer
+from app.dao.query_endpoints_dao import QueryDAO
+from app.dto.query_endpoints_dto import DATETIME_FORMAT, QueryResponse
+
+
+SEED_NUMBER_PREFIX = '99'
+
+
+async def read_orm(session: AsyncSession) -> list:
+    return await QueryDAO.find_all(session)
+
+
+async def read_rows(session: AsyncSession) -> list:
+    return await QueryDAO.find_all_rows(session, QueryDAO.LIST_COLUMNS)
+
+
+async def measure(connection, read, serializer: ListSerializer) -> tuple:
+    """Возвращает (секунды, пик памяти в МБ, строк) для чтения и сериализации."""
+    session = AsyncSession(bind=connection)
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    items = await read(session)
+    body = serializer.dumps(items)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    count = len(items)
+    del items, body
+    await session.close()
+    return elapsed, peak / 2 ** 20, count
+
+
+async def main(args):
+    engine = create_async_engine(settings.get_database_url(), poolclass=NullPool)
+    serializer = ListSerializer(QueryResponse, DATETIME_FORMAT)
+    try:
+        async with engine.connect() as connection:
+            transaction = await connection.begin()
+            await connection.execute(
+                text(
+                    'INSERT INTO queries (cadastral_number, latitude, longitude) '
+                    "SELECT :prefix || lpad(g::text, 11, '0'), 55 + random(), 37 + random() "
+                    'FROM generate_series(1, :rows) AS g'
+                    ),
+                {'rows': args.rows, 'prefix': SEED_NUMBER_PREFIX}
+                )
+            cases = [('ORM-объекты (find_all)', read_orm), ('строки проекции', read_rows)]
+            results = [await measure(connection, read, serializer) for _, read in cases]
+            await transaction.rollback()
+    finally:
+        await engine.dispose()
+
+    base_time, base_memory, _ = results[0]
+    print(f'Строк в таблице: {results[0][2]}')
+    for (name, _), (elapsed, memory, count) in zip(cases, results):
+        print(
+            f'{name:26} {count / elapsed:9.0f} строк/с  x{base_time / elapsed:.1f}  '
+            f'пик памяти {memory:7.1f} МБ  x{base_memory / memory:.1f}'
+            )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=100000)
+    asyncio.run(main(parser.parse_args()))
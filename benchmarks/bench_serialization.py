@@ -0,0 +1,73 @@
+"""
+Сериализация страницы истории запросов: response_model (валидация pydantic + json.dumps,
+как в FastAPI) против ListSerializer (план полей + orjson).
+Запускается без сети и базы данных:
+
+    python -m benchmarks.bench_serialization --rows 1000 --repeat 50
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+from typing import List
+
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+
+from app.core.fast_json import ListSerializer
+from app.db.models.models import Query
+from app.dto.query_endpoints_dto import DATETIME_FORMAT, QueryResponse
+
+
+def make_page(rows: int) -> list[Query]:
+    started = datetime(2025, 1, 1)
+    return [
+        Query(
+            id=index,
+            cadastral_number=str(1000000000000 + index),
+            latitude=55 + random.random(),
+            longitude=37 + random.random(),
+            create_ts=started + timedelta(seconds=index),
+            update_ts=started + timedelta(seconds=index),
+            grid_cell=index,
+            )
+        for index in range(rows)
+        ]
+
+
+def response_model_path(adapter: TypeAdapter, page: list) -> bytes:
+    return JSONResponse(
+        adapter.dump_python(adapter.validate_python(page, from_attributes=True), mode='json')
+        ).body
+
+
+def measure(func, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - started) / repeat
+
+
+def main(args):
+    page = make_page(args.rows)
+    adapter = TypeAdapter(List[QueryResponse])
+    serializer = ListSerializer(QueryResponse, DATETIME_FORMAT)
+    assert serializer.dumps(page) == response_model_path(adapter, page)
+
+    cases = [
+        ('response_model + json.dumps', lambda: response_model_path(adapter, page)),
+        ('ListSerializer + orjson', lambda: serializer.dumps(page)),
+        ]
+    print(f'Строк на странице: {args.rows}, повторов: {args.repeat}')
+    for index in range(0, len(cases), 2):
+        (slow_name, slow), (fast_name, fast) = cases[index:index + 2]
+        slow_time, fast_time = measure(slow, args.repeat), measure(fast, args.repeat)
+        print(f'{slow_name:30} {slow_time * 1000:8.2f} мс')
+        print(f'{fast_name:30} {fast_time * 1000:8.2f} мс  (x{slow_time / fast_time:.1f})')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=50)
+    main(parser.parse_args())
@@ -0,0 +1,188 @@
+import argparse
+import asyncio
+import csv
+import json
+import logging
+import math
+import os
+import time
+from datetime import datetime, timedelta, timezone, tzinfo
+from itertools import islice
+from typing import Iterator, Union
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+import asyncpg
+
+from app.core.config import settings
+from app.db.models.models import validate_cadastral_number
+
+
+logging.basicConfig(
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    level=logging.INFO
+)
+logger = logging.getLogger(__name__)
+
+# job_status не загружается и остается NULL: загруженные запросы не считаются фоновыми
+# задачами и не ставятся повторно в очередь при запуске приложения
+COPY_COLUMNS = ('cadastral_number', 'latitude', 'longitude', 'create_ts')
+
+
+def read_records(path: str, file_format: str) -> Iterator[Union[dict, str]]:
+    """
+    Построчно читает записи CSV (с заголовком) или JSONL, не загружая файл целиком.
+    Строки JSONL отдаются как есть и разбираются в parse_record, чтобы одна битая строка
+    отклонялась, а не прерывала загрузку.
+    """
+    with open(path, newline='', encoding='utf-8') as file:
+        if file_format == 'csv':
+            yield from csv.DictReader(file)
+            return
+        for line in file:
+            line = line.strip()
+            if line:
+                yield line
+
+
+def parse_record(record: Union[dict, str], default_ts: datetime, database_tz: tzinfo) -> tuple:
+    """
+    Проверяет запись по тем же правилам, что и модель Query, и возвращает строку для COPY.
+    create_ts необязателен (ISO 8601), без него берется время начала загрузки.
+    create_ts со смещением переводится в часовой пояс базы: create_ts хранится без пояса,
+    в том же локальном времени базы, что и localtimestamp у остальных запросов.
+    """
+    if isinstance(record, str):
+        record = json.loads(record)
+    cadastral_number = validate_cadastral_number(str(record['cadastral_number']).strip())
+    latitude, longitude = float(record['latitude']), float(record['longitude'])
+    if not math.isfinite(latitude) or not math.isfinite(longitude):
+        raise ValueError('Координаты должны быть конечными числами')
+    create_ts = record.get('create_ts')
+    create_ts = datetime.fromisoformat(create_ts) if create_ts else default_ts
+    if create_ts.tzinfo is not None:
+        create_ts = create_ts.astimezone(database_tz).replace(tzinfo=None)
+    return cadastral_number, latitude, longitude, create_ts
+
+
+async def database_timezone(connection: asyncpg.Connection) -> tzinfo:
+    """Часовой пояс сессии базы; если Python его не знает — текущее смещение пояса."""
+    name = await connection.fetchval("SELECT current_setting('TimeZone')")
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        offset = await connection.fetchval('SELECT extract(timezone FROM now())')
+        return timezone(timedelta(seconds=int(offset)))
+
+
+async def load_progress(connection: asyncpg.Connection, source: str) -> dict:
+    row = await connection.fetchrow(
+        'SELECT processed, loaded, rejected FROM ingest_progress WHERE source = $1', source
+        )
+    return dict(row) if row else {'processed': 0, 'loaded': 0, 'rejected': 0}
+
+
+async def save_progress(connection: asyncpg.Connection, source: str, progress: dict):
+    """Записывает прогресс в ingest_progress; вызывается в транзакции COPY пачки."""
+    await connection.execute(
+        """
+        INSERT INTO ingest_progress (source, processed, loaded, rejected)
+        VALUES ($1, $2, $3, $4)
+        ON CONFLICT (source) DO UPDATE SET
+            processed = excluded.processed,
+            loaded = excluded.loaded,
+            rejected = excluded.rejected,
+            update_ts = now()
+        """,
+        source, progress['processed'], progress['loaded'], progress['rejected']
+        )
+
+
+async def ingest(path: str, file_format: str, chunk_size: int, source: str):
+    """
+    Загружает запросы из файла в queries через COPY пачками по chunk_size записей.
+    Каждая пачка — одна команда COPY в одной транзакции с записью прогресса
+    в ingest_progress под ключом source: пачка либо загружена и учтена, либо нет,
+    и повторный запуск продолжает ровно с первой незагруженной пачки.
+    Записи, не прошедшие проверку, пропускаются и пишутся в <файл>.rejected.
+    """
+    dsn = settings.get_database_url().replace('postgresql+asyncpg:', 'postgresql:')
+    connection = await asyncpg.connect(dsn)
+    started, loaded_now = time.monotonic(), 0
+    try:
+        progress = await load_progress(connection, source)
+        if progress['processed']:
+            logger.info(f"Продолжение с записи {progress['processed'] + 1}")
+
+        default_ts = await connection.fetchval('SELECT localtimestamp')
+        database_tz = await database_timezone(connection)
+        records = enumerate(read_records(path, file_format), start=1)
+        for _ in islice(records, progress['processed']):
+            pass
+
+        with open(path + '.rejected', 'a', encoding='utf-8') as rejected_file:
+            while True:
+                chunk = list(islice(records, chunk_size))
+                if not chunk:
+                    break
+                rows = []
+                for number, record in chunk:
+                    try:
+                        rows.append(parse_record(record, default_ts, database_tz))
+                    except (KeyError, TypeError, ValueError) as e:
+                        rejected_file.write(json.dumps(
+                            {'record': number, 'error': str(e), 'data': record},
+                            ensure_ascii=False, default=str
+                            ) + '\n')
+                rejected_file.flush()
+
+                chunk_progress = {
+                    'processed': chunk[-1][0],
+                    'loaded': progress['loaded'] + len(rows),
+                    'rejected': progress['rejected'] + len(chunk) - len(rows),
+                    }
+                async with connection.transaction():
+                    if rows:
+                        await connection.copy_records_to_table(
+                            'queries', records=rows, columns=COPY_COLUMNS
+                            )
+                    await save_progress(connection, source, chunk_progress)
+                progress = chunk_progress
+
+                loaded_now += len(rows)
+                elapsed = time.monotonic() - started
+                logger.info(
+                    f"Обработано {progress['processed']}, загружено {progress['loaded']}, "
+                    f"отклонено {progress['rejected']}, {loaded_now / elapsed:.0f} строк/с"
+                    )
+    finally:
+        await connection.close()
+
+    elapsed = time.monotonic() - started
+    logger.info(
+        f"Готово: загружено {progress['loaded']}, отклонено {progress['rejected']}; "
+        f'за этот запуск {loaded_now} строк за {elapsed:.1f} с '
+        f'({loaded_now / elapsed if elapsed else 0:.0f} строк/с)'
+        )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Массовая загрузка запросов из CSV/JSONL')
+    parser.add_argument('path', help='Файл с колонками cadastral_number, latitude, longitude')
+    parser.add_argument(
+        '--format', choices=('csv', 'jsonl'),
+        help='Формат файла; по умолчанию определяется по расширению'
+        )
+    parser.add_argument(
+        '--chunk-size', type=int, default=settings.INGEST_CHUNK_SIZE,
+        help='Количество записей в одной команде COPY'
+        )
+    parser.add_argument(
+        '--source',
+        help='Ключ прогресса в ingest_progress для продолжения после сбоя; '
+             'по умолчанию абсолютный путь к файлу'
+        )
+    args = parser.parse_args()
+    file_format = args.format or ('csv' if args.path.endswith('.csv') else 'jsonl')
+    asyncio.run(ingest(
+        args.path, file_format, args.chunk_size, args.source or os.path.abspath(args.path)
+        ))
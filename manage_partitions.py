@@ -0,0 +1,58 @@
+import argparse
+import asyncio
+import logging
+
+from sqlalchemy import func, select
+
+from app.core.config import settings
+from app.db.partitions import PARTITIONED_TABLES, ensure_partitions, expire_partitions
+from app.db.session import engine
+
+
+logging.basicConfig(
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    level=logging.INFO
+)
+logger = logging.getLogger(__name__)
+
+
+async def manage_partitions(months_ahead: int, retention_months, drop: bool):
+    """
+    Обслуживает помесячные партиции queries и histories: заранее создает партиции
+    на months_ahead месяцев вперед и отсоединяет (или удаляет) партиции старше срока хранения.
+    Каждая таблица обрабатывается в своей транзакции. Запускать по расписанию, например раз в сутки.
+    """
+    try:
+        for table in PARTITIONED_TABLES:
+            async with engine.begin() as connection:
+                today = await connection.scalar(select(func.current_date()))
+                created = await ensure_partitions(connection, table, today, months_ahead)
+                expired = []
+                if retention_months is not None:
+                    expired = await expire_partitions(
+                        connection, table, today, retention_months, drop
+                        )
+            logger.info(
+                f'{table}: создано партиций {len(created)} {created}, '
+                f"{'удалено' if drop else 'отсоединено'} {len(expired)} {expired}"
+                )
+    finally:
+        await engine.dispose()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Обслуживание помесячных партиций')
+    parser.add_argument(
+        '--months-ahead', type=int, default=settings.PARTITION_MONTHS_AHEAD,
+        help='На сколько месяцев вперед создавать партиции'
+        )
+    parser.add_argument(
+        '--retention-months', type=int, default=settings.PARTITION_RETENTION_MONTHS,
+        help='Сколько прошедших месяцев хранить; по умолчанию хранить все'
+        )
+    parser.add_argument(
+        '--drop', action='store_true',
+        help='Удалять устаревшие партиции, а не только отсоединять'
+        )
+    args = parser.parse_args()
+    asyncio.run(manage_partitions(args.months_ahead, args.retention_months, args.drop))
@@ -0,0 +1,46 @@
+import argparse
+import asyncio
+import logging
+
+from app.core.config import settings
+from app.dao.query_endpoints_dao import CadastralSummaryDAO
+from app.db.session import engine, session_scope
+
+
+logging.basicConfig(
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    level=logging.INFO
+)
+logger = logging.getLogger(__name__)
+
+
+async def rebuild_summary(batch_size: int):
+    """
+    Пересобирает сводку по кадастровым номерам с нуля.
+    Номера обрабатываются пачками по batch_size, каждая пачка в своей короткой транзакции,
+    поэтому скрипт можно запускать на работающем сервисе.
+    """
+    last, batches = None, 0
+    try:
+        while True:
+            async with session_scope() as session:
+                last = await CadastralSummaryDAO.rebuild_batch(
+                    session=session, after=last, batch_size=batch_size
+                    )
+            if last is None:
+                break
+            batches += 1
+            logger.info(f'Пачка {batches}: обработаны номера до {last}')
+    finally:
+        await engine.dispose()
+    logger.info(f'Сводка пересобрана, пачек: {batches}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Пересборка сводки по кадастровым номерам')
+    parser.add_argument(
+        '--batch-size', type=int, default=settings.SUMMARY_REBUILD_BATCH_SIZE,
+        help='Количество кадастровых номеров в одной транзакции'
+        )
+    args = parser.parse_args()
+    asyncio.run(rebuild_summary(args.batch_size))